@@ -0,0 +1,97 @@
+'''
+Yue Yu
+CS 5001, Fall 2023
+Final Project -- admin
+
+This program represents the hidden admin page of MusicMustard web application.
+It is not linked from any page, and is only enabled when MUSICMUSTARD_ADMIN_TOKEN is set: open the home page with ?admin=<token>.
+It shows where quiz generation time goes, MusicBrainz call metrics, and cache, pool and scheduler stats.
+'''
+
+import hmac
+import os
+import streamlit as st
+from helpers import display_header, display_page_title, get_metrics
+from models.metrics import HTTP_REQUEST_DURATION, HTTP_RESPONSE_BYTES, QUIZ_STAGE_DURATION, DISTRACTOR_LOOKUPS, DEFAULT_METRICS_PORT
+
+
+def is_admin_request() -> bool:
+    """
+    Check whether the page was opened with the admin query parameter.
+
+    Returns:
+    - bool: True if MUSICMUSTARD_ADMIN_TOKEN is set and ?admin matches it.
+    """
+    token = os.environ.get("MUSICMUSTARD_ADMIN_TOKEN")
+    if not token:
+        return False
+    value = st.experimental_get_query_params().get("admin", [None])[0]
+    return value is not None and hmac.compare_digest(value, token)
+
+
+def display_quiz_stages(metrics):
+    """
+    Display the time spent in each quiz generation stage.
+
+    Parameters:
+    - metrics (MetricsRegistry): The metrics registry.
+    """
+    st.markdown("### ⏱️ Quiz Generation Stages")
+    stages = metrics.summarize(QUIZ_STAGE_DURATION)
+    if stages:
+        st.table(stages)
+    else:
+        st.caption("No quiz has been generated yet.")
+
+    lookups = metrics.snapshot()["counters"].get(DISTRACTOR_LOOKUPS, {})
+    if lookups:
+        st.caption("Distractor lookups: " + ", ".join(f"{dict(key)['outcome']} {value:g}" for key, value in sorted(lookups.items())))
+
+
+def display_http_calls(metrics):
+    """
+    Display MusicBrainz call counts, latency and bytes by endpoint and status.
+
+    Parameters:
+    - metrics (MetricsRegistry): The metrics registry.
+    """
+    st.markdown("### 🌐 MusicBrainz Calls")
+    calls = metrics.summarize(HTTP_REQUEST_DURATION)
+    if not calls:
+        st.caption("No MusicBrainz call has been made yet.")
+        return
+    response_bytes = metrics.snapshot()["counters"].get(HTTP_RESPONSE_BYTES, {})
+    for call in calls:
+        call["bytes"] = response_bytes.get((("endpoint", call["endpoint"]), ("status", call["status"])), 0)
+    st.table(calls)
+
+
+def display_component_stats(metrics):
+    """
+    Display the cache, pool, scheduler and circuit breaker gauges.
+
+    Parameters:
+    - metrics (MetricsRegistry): The metrics registry.
+    """
+    st.markdown("### 📦 Caches, Pools and Scheduler")
+    rows = [{"metric": name, "labels": ", ".join(f"{key}={value}" for key, value in labels.items()), "value": value}
+            for name, labels, value in metrics.gauges()]
+    st.table(rows)
+
+
+def admin_page():
+    """
+    This is the main function of the admin page.
+    """
+    display_header(page_title="MusicMustard Admin", page_icon="🛠️")
+    display_page_title(title_text="Metrics 🛠️")
+    metrics = get_metrics()
+
+    display_quiz_stages(metrics)
+    display_http_calls(metrics)
+    display_component_stats(metrics)
+
+    with st.expander("Prometheus text format"):
+        if DEFAULT_METRICS_PORT:
+            st.caption(f"Also served at http://127.0.0.1:{DEFAULT_METRICS_PORT}/metrics")
+        st.code(metrics.render(), language="text")
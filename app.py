@@ -8,7 +8,9 @@ It contains a key feature: Explore Artists.
 '''
 
 import streamlit as st
-from helpers import display_header, display_animation, display_page_title, redirect_link_button, display_link
+from helpers import display_header, display_animation, render_pending_animations, display_page_title, display_link, get_artist_info, escape_markdown
+from admin import is_admin_request, admin_page
+from models.profiling import profile_run
 
 
 # 1. Initialize the Page:
@@ -39,18 +41,95 @@ def explore_artists():
 
 def explore_artist_links(artist_name: str, selected_filters: list):
     """
-    Redirect to links based on the selected filters.
+    Display the artist's information for the selected filters.
+    The artist is resolved once and every filter is rendered from a single MusicBrainz lookup.
 
     Parameters:
     - artist_name (str): The name of the artist to explore.
     - selected_filters (list): List of selected filters.
     """
-    if artist_name:
-        for search_content in selected_filters:
-            search_content_lower = search_content.lower()
-            redirect_link_button(artist_name, search_content_lower)
-    else:
+    if not artist_name:
         st.warning("Please enter the artist's name.")
+        return
+
+    # Imported here rather than at the top, so a page run that explores no artist does not load requests
+    from models.artist_info import build_artist_link
+
+    artist_info = get_artist_info()
+    artist_id = artist_info.fetch_artist_id(artist_name)
+    artist_details = artist_info.fetch_artist_details(artist_id) if artist_id else None
+
+    if not artist_details:
+        st.error(f"Unable to fetch information for the artist: {escape_markdown(artist_name)}. Please check your spelling and retry with a valid artist name.")
+        return
+
+    display_functions = {
+        "profile": display_artist_profile,
+        "works": display_artist_works,
+        "genre": display_artist_genre,
+        "events": display_artist_events,
+    }
+    for search_content in selected_filters:
+        search_content_lower = search_content.lower()
+        st.markdown(f"#### {search_content}")
+        display_functions[search_content_lower](artist_details)
+        display_link(build_artist_link(artist_details["id"], search_content_lower), "🔗 More on MusicBrainz")
+
+
+def display_artist_profile(artist_details: dict):
+    """
+    Display the artist's profile.
+
+    Parameters:
+    - artist_details (dict): The artist's details from ArtistInfo.fetch_artist_details.
+    """
+    st.write(f"**{escape_markdown(artist_details['name'])}**" + (f" ({escape_markdown(artist_details['disambiguation'])})" if artist_details["disambiguation"] else ""))
+    if artist_details["type"]:
+        st.write(f"Type: {artist_details['type']}")
+    if artist_details["country"]:
+        st.write(f"Country: {artist_details['country']}")
+    if artist_details["begin"]:
+        st.write(f"Active: {artist_details['begin']} – {artist_details['end'] or 'present'}")
+
+
+def display_artist_works(artist_details: dict):
+    """
+    Display the artist's works.
+
+    Parameters:
+    - artist_details (dict): The artist's details from ArtistInfo.fetch_artist_details.
+    """
+    if artist_details["works"]:
+        st.write(", ".join(escape_markdown(work) for work in artist_details["works"]))
+    else:
+        st.caption("No works found.")
+
+
+def display_artist_genre(artist_details: dict):
+    """
+    Display the artist's genres, falling back to the most popular tags.
+
+    Parameters:
+    - artist_details (dict): The artist's details from ArtistInfo.fetch_artist_details.
+    """
+    genres = artist_details["genres"] or artist_details["tags"][:10]
+    if genres:
+        st.write(", ".join(escape_markdown(genre) for genre in genres))
+    else:
+        st.caption("No genres found.")
+
+
+def display_artist_events(artist_details: dict):
+    """
+    Display the artist's events.
+
+    Parameters:
+    - artist_details (dict): The artist's details from ArtistInfo.fetch_artist_details.
+    """
+    if not artist_details["events"]:
+        st.caption("No events found.")
+    for event in artist_details["events"]:
+        st.write(f"{event['date'] or 'Unknown date'} — {escape_markdown(event['name'])}")
 
 
 # 3. Navigate to Other Pages
@@ -69,9 +148,16 @@ def app():
     """
     This is the main function of app.
     """
-    initialize_page()
-    explore_artists()
-    navigate_to_other_pages()
+    # The admin page is not linked anywhere; it is reached with ?admin=<MUSICMUSTARD_ADMIN_TOKEN>
+    if is_admin_request():
+        admin_page()
+        return
+
+    with profile_run("app"):
+        initialize_page()
+        explore_artists()
+        navigate_to_other_pages()
+        render_pending_animations()
 
 
 app()
@@ -0,0 +1,218 @@
+"""
+Yue Yu
+CS 5001, Fall 2023
+Final Project -- benchmarks.fake_musicbrainz
+
+This program contains a local stand-in for the MusicBrainz web service, used by the benchmarks.
+It answers the artist search, works browse and artist lookup endpoints that ArtistInfo calls,
+with configurable latency, jitter and error rate, and counts the requests and bytes it serves.
+"""
+
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+from models.artist_catalog import get_shared_catalog
+
+ARTIST_PHRASE = re.compile(r'artist:"((?:[^"\\]|\\.)*)"')
+
+
+def fake_artist_id(artist_name: str) -> str:
+    """
+    A stable MBID-shaped id for a fake artist.
+
+    Parameters:
+    - artist_name (str): The artist's name.
+
+    Returns:
+    - str: A UUID derived from the name.
+    """
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"musicmustard-fake/{artist_name}"))
+
+
+class FakeMusicBrainz:
+    """
+    This FakeMusicBrainz class represents a local HTTP server that imitates MusicBrainz.
+
+    Attributes:
+    - artists (dict): Artist id mapped to the artist's name.
+    - works_per_artist (int): Number of works every artist has.
+    - latency (float): Base delay in seconds added to every response.
+    - jitter (float): Maximum random delay in seconds added to or removed from the base delay.
+    - error_rate (float): Fraction of requests answered with 503.
+    - base_url (str): The server's base URL, in the same form as ArtistInfo.BASE_URL.
+
+    Methods:
+    - start(self) -> FakeMusicBrainz: Start serving on a free local port.
+    - stop(self): Stop the server.
+    - stats(self) -> dict: Return request, error and byte counters.
+    - reset_stats(self): Reset the counters.
+    """
+
+    def __init__(self, artists: list = None, works_per_artist: int = 40, latency: float = 0.0,
+                 jitter: float = 0.0, error_rate: float = 0.0, seed: int = None):
+        """
+        Constructor method.
+
+        Parameters:
+        - artists (list): The artists' names. Defaults to the artist catalog, served under its pre-resolved MBIDs.
+        - works_per_artist (int): Number of works every artist has.
+        - latency (float): Base delay in seconds.
+        - jitter (float): Maximum random delay in seconds added to or removed from the base delay.
+        - error_rate (float): Fraction of requests answered with 503.
+        - seed (int): Seed for the latency and error draws.
+        """
+        if artists is None:
+            catalog = get_shared_catalog()
+            self.artists = {catalog.artist_id(name) or fake_artist_id(name): name for name in catalog.names}
+        else:
+            self.artists = {fake_artist_id(name): name for name in artists}
+        self.works_per_artist = works_per_artist
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+        self.reset_stats()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/ws/2/"
+
+    def start(self):
+        """
+        Start serving on a free local port, on a background thread.
+
+        Returns:
+        - FakeMusicBrainz: This server, so it can be used as a context manager.
+        """
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, like the real service
+            disable_nagle_algorithm = True  # headers and body are written separately
+
+            def do_GET(self):
+                status, body = fake._respond(self.path)
+                payload = json.dumps(body).encode("utf-8")
+                # Counted before sending, so the counters are up to date once the client has the response
+                fake._record(status, len(payload))
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-musicbrainz", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stop the server.
+        """
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def stats(self) -> dict:
+        """
+        Return the request counters.
+
+        Returns:
+        - dict: requests, errors and bytes served.
+        """
+        with self._lock:
+            return {"requests": self._requests, "errors": self._errors, "bytes": self._bytes}
+
+    def reset_stats(self):
+        """
+        Reset the request counters.
+        """
+        with self._lock:
+            self._requests = 0
+            self._errors = 0
+            self._bytes = 0
+
+    def _record(self, status: int, size: int):
+        with self._lock:
+            self._requests += 1
+            self._bytes += size
+            if status >= 400:
+                self._errors += 1
+
+    def _respond(self, path: str) -> tuple:
+        """
+        Build the response for a request path, after the configured delay.
+
+        Parameters:
+        - path (str): The request path with its query string.
+
+        Returns:
+        - tuple: (status code, JSON body)
+        """
+        with self._lock:
+            delay = max(0.0, self.latency + self._rng.uniform(-self.jitter, self.jitter))
+            failed = self._rng.random() < self.error_rate
+        time.sleep(delay)
+        if failed:
+            return 503, {"error": "Service temporarily unavailable"}
+
+        parts = urlsplit(path)
+        params = {key: values[0] for key, values in parse_qs(parts.query).items()}
+        segments = [segment for segment in parts.path.split("/") if segment]  # ["ws", "2", "artist", ...]
+        resource = segments[2] if len(segments) > 2 else ""
+
+        if resource == "artist" and len(segments) > 3:
+            return self._lookup_artist(segments[3])
+        if resource == "artist":
+            return 200, self._search_artists(params.get("query", ""))
+        if resource == "work":
+            return 200, self._browse_works(params.get("artist"), int(params.get("limit", 25)), int(params.get("offset", 0)))
+        return 404, {"error": "Not Found"}
+
+    def _search_artists(self, query: str) -> dict:
+        names = [re.sub(r"\\(.)", r"\1", phrase) for phrase in ARTIST_PHRASE.findall(query)]
+        by_name = {name.lower(): artist_id for artist_id, name in self.artists.items()}
+        artists = []
+        for name in names:
+            artist_id = by_name.get(name.lower())
+            if artist_id is not None:
+                artists.append({"id": artist_id, "name": self.artists[artist_id], "sort-name": self.artists[artist_id], "score": 100})
+        return {"count": len(artists), "offset": 0, "artists": artists}
+
+    def _browse_works(self, artist_id: str, limit: int, offset: int) -> dict:
+        name = self.artists.get(artist_id)
+        if name is None:
+            return {"work-count": 0, "work-offset": offset, "works": []}
+        titles = [f"{name} Work {number}" for number in range(offset + 1, min(offset + limit, self.works_per_artist) + 1)]
+        works = [{"id": fake_artist_id(title), "title": title, "type": "Song"} for title in titles]
+        return {"work-count": self.works_per_artist, "work-offset": offset, "works": works}
+
+    def _lookup_artist(self, artist_id: str) -> tuple:
+        name = self.artists.get(artist_id)
+        if name is None:
+            return 404, {"error": "Not Found"}
+        works = self._browse_works(artist_id, 25, 0)["works"]
+        return 200, {"id": artist_id, "name": name, "type": "Group", "country": "GB", "disambiguation": "",
+                     "life-span": {"begin": "1990", "end": None}, "genres": [{"name": "rock", "count": 1}],
+                     "tags": [{"name": "rock", "count": 1}], "works": works, "relations": []}
@@ -0,0 +1,182 @@
+"""
+Yue Yu
+CS 5001, Fall 2023
+Final Project -- benchmarks.import_benchmark
+
+This program benchmarks the app's cold start: how long a fresh Python process takes to import each page dependency.
+Streamlit is imported first, as the server has already loaded it before the first page runs, so only the cost
+the app adds on top is measured. Every target is imported in several fresh processes with -X importtime;
+the medians of the wall time and of every module's import time are reported as JSON and compared with a stored baseline.
+
+Usage: python -m benchmarks.import_benchmark --output results.json --baseline benchmarks/import_baseline.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from benchmarks.quiz_benchmark import compare_results, format_comparison
+
+DEFAULT_TARGETS = ("helpers", "admin", "models.artist_info", "models.quiz_builder")
+PRELOADED = ("streamlit",)
+# Modules every page imports must not pull these in; they are loaded by the code that needs them
+LAZY_MODULES = ("requests", "webbrowser", "streamlit_lottie", "models.artist_info", "models.artist_quiz", "models.quiz_builder")
+COMPARED_METRICS = ("wall_ms", "imported_modules")
+MARKER = "--musicmustard-import-benchmark--"
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def parse_importtime(stderr: str) -> dict:
+    """
+    Parse the -X importtime report printed after the marker line.
+
+    Parameters:
+    - stderr (str): The process's standard error.
+
+    Returns:
+    - dict: Module name mapped to (self microseconds, cumulative microseconds).
+    """
+    modules = {}
+    measuring = False
+    for line in stderr.splitlines():
+        if line.strip() == MARKER:
+            measuring = True
+            continue
+        if not measuring or not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # the column header
+        modules[fields[2].strip()] = (int(fields[0]), int(fields[1]))
+    return modules
+
+
+def import_once(target: str, python: str = sys.executable) -> tuple:
+    """
+    Import a module in a fresh process, after the preloaded modules.
+
+    Parameters:
+    - target (str): The module to import, e.g. "helpers".
+    - python (str): The Python interpreter.
+
+    Returns:
+    - tuple: (wall seconds, {module: (self us, cumulative us)})
+
+    Raises:
+    - RuntimeError: If the import fails.
+    """
+    script = "; ".join([
+        "import sys, time",
+        *(f"import {module}" for module in PRELOADED),
+        f"sys.stderr.write({MARKER!r} + '\\n')",
+        "start = time.perf_counter()",
+        f"import {target}",
+        "print(time.perf_counter() - start)",
+    ])
+    completed = subprocess.run([python, "-X", "importtime", "-c", script], cwd=REPO_ROOT,
+                               capture_output=True, text=True, env=dict(os.environ, PYTHONDONTWRITEBYTECODE="1"))
+    if completed.returncode != 0:
+        raise RuntimeError(f"Importing {target} failed:\n{completed.stderr[-2000:]}")
+    return float(completed.stdout.strip().splitlines()[-1]), parse_importtime(completed.stderr)
+
+
+def measure_import(target: str, repeats: int = 5, top: int = 15, python: str = sys.executable) -> dict:
+    """
+    Import a module in several fresh processes and summarize the medians.
+
+    Parameters:
+    - target (str): The module to import.
+    - repeats (int): Number of fresh processes.
+    - top (int): Number of slowest modules to list.
+    - python (str): The Python interpreter.
+
+    Returns:
+    - dict: wall_ms, imported_modules, lazy_modules_imported and the slowest modules by cumulative time.
+    """
+    walls = []
+    self_times = {}
+    cumulative_times = {}
+    for _ in range(repeats):
+        wall, modules = import_once(target, python)
+        walls.append(wall)
+        for module, (self_us, cumulative_us) in modules.items():
+            self_times.setdefault(module, []).append(self_us)
+            cumulative_times.setdefault(module, []).append(cumulative_us)
+
+    slowest = sorted(cumulative_times, key=lambda module: -statistics.median(cumulative_times[module]))[:top]
+    return {
+        "repeats": repeats,
+        "wall_ms": round(statistics.median(walls) * 1000, 3),
+        "imported_modules": len(cumulative_times),
+        "lazy_modules_imported": [module for module in LAZY_MODULES if module in cumulative_times and module != target],
+        "slowest_modules": [{"module": module,
+                             "self_ms": round(statistics.median(self_times[module]) / 1000, 3),
+                             "cumulative_ms": round(statistics.median(cumulative_times[module]) / 1000, 3)}
+                            for module in slowest],
+    }
+
+
+def run_benchmarks(targets: tuple = DEFAULT_TARGETS, repeats: int = 5, top: int = 15) -> dict:
+    """
+    Measure the import time of every target.
+
+    Parameters:
+    - targets (tuple): The modules to import.
+    - repeats (int): Fresh processes per target.
+    - top (int): Number of slowest modules to list per target.
+
+    Returns:
+    - dict: {"config": {...}, "environment": {...}, "results": {target: summary}}
+    """
+    config = {"targets": list(targets), "repeats": repeats, "preloaded": list(PRELOADED)}
+    results = {target: measure_import(target, repeats, top) for target in targets}
+    environment = {"python": platform.python_version(), "platform": platform.platform(), "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S")}
+    return {"config": config, "environment": environment, "results": results}
+
+
+def main():
+    """
+    Command-line entry point that runs the benchmark.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the app's cold-start import time.")
+    parser.add_argument("targets", nargs="*", default=list(DEFAULT_TARGETS), help="modules to import")
+    parser.add_argument("--repeats", type=int, default=5, help="fresh processes per target")
+    parser.add_argument("--top", type=int, default=15, help="slowest modules listed per target")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare with the results in this JSON file")
+    parser.add_argument("--max-regression", type=float, default=0.3, help="allowed relative increase before failing")
+    args = parser.parse_args()
+
+    results = run_benchmarks(tuple(args.targets), args.repeats, args.top)
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            output_file.write(output + "\n")
+    else:
+        print(output)
+
+    failed = False
+    for target, summary in results["results"].items():
+        if summary["lazy_modules_imported"] and target in ("helpers", "admin"):
+            print(f"{target} imports {', '.join(summary['lazy_modules_imported'])} at load")
+            failed = True
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as baseline_file:
+            baseline = json.load(baseline_file)
+        rows, regressions = compare_results(results, baseline, args.max_regression, COMPARED_METRICS)
+        print(format_comparison(rows))
+        if regressions:
+            print(f"{len(regressions)} metric(s) regressed by more than {args.max_regression:.0%}")
+            failed = True
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+"""
+Yue Yu
+CS 5001, Fall 2023
+Final Project -- benchmarks.quiz_benchmark
+
+This program benchmarks quiz generation against the local fake MusicBrainz server.
+It measures p50/p95/p99 latency, HTTP calls and bytes per operation for random mode questions,
+personal mode questions and full three-question quizzes, writes the results as JSON and
+compares them with a stored baseline.
+
+Usage: python -m benchmarks.quiz_benchmark --output results.json --baseline benchmarks/baseline.json
+"""
+
+import argparse
+import json
+import math
+import platform
+import sys
+import time
+from models.artist_info import ArtistInfo
+from models.artist_quiz import ArtistQuiz
+from models.artist_cache import TwoTierCache
+from models.http_session import create_session
+from benchmarks.fake_musicbrainz import FakeMusicBrainz
+
+DEFAULT_BASELINE_PATH = "benchmarks/baseline.json"
+COMPARED_METRICS = ("p50_ms", "p95_ms", "p99_ms", "http_calls_per_op", "bytes_per_op")
+
+
+def percentile(values: list, q: float) -> float:
+    """
+    The q-th percentile of values, by the nearest-rank method.
+
+    Parameters:
+    - values (list): The samples.
+    - q (float): The percentile, between 0 and 100.
+
+    Returns:
+    - float: The percentile, or None if there are no samples.
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(q / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(latencies: list, errors: int, http_calls: int, http_bytes: int, iterations: int) -> dict:
+    """
+    Summarize one operation's measurements.
+
+    Parameters:
+    - latencies (list): Latencies of the successful runs, in seconds.
+    - errors (int): Number of runs that raised.
+    - http_calls (int): Requests the server answered during the runs.
+    - http_bytes (int): Response bytes the server sent during the runs.
+    - iterations (int): Number of runs.
+
+    Returns:
+    - dict: Percentiles and mean in milliseconds, error count, and HTTP calls and bytes per run.
+    """
+    def to_ms(value):
+        return round(value * 1000, 3) if value is not None else None
+
+    return {
+        "iterations": iterations,
+        "errors": errors,
+        "p50_ms": to_ms(percentile(latencies, 50)),
+        "p95_ms": to_ms(percentile(latencies, 95)),
+        "p99_ms": to_ms(percentile(latencies, 99)),
+        "mean_ms": to_ms(sum(latencies) / len(latencies) if latencies else None),
+        "http_calls_per_op": round(http_calls / iterations, 3),
+        "bytes_per_op": round(http_bytes / iterations, 1),
+    }
+
+
+def measure(operation, server: FakeMusicBrainz, iterations: int, warmup: int = 0) -> dict:
+    """
+    Run an operation repeatedly and summarize its latency and HTTP usage.
+
+    Parameters:
+    - operation (callable): The operation to run, taking no arguments.
+    - server (FakeMusicBrainz): The server the operation talks to.
+    - iterations (int): Number of measured runs.
+    - warmup (int): Number of unmeasured runs first.
+
+    Returns:
+    - dict: See summarize().
+    """
+    for _ in range(warmup):
+        try:
+            operation()
+        except Exception:
+            pass
+
+    server.reset_stats()
+    latencies = []
+    errors = 0
+    for _ in range(iterations):
+        start = time.perf_counter()
+        try:
+            operation()
+        except Exception:
+            errors += 1
+            continue
+        latencies.append(time.perf_counter() - start)
+
+    stats = server.stats()
+    return summarize(latencies, errors, stats["requests"], stats["bytes"], iterations)
+
+
+def run_benchmarks(iterations: int = 30, warmup: int = 2, latency: float = 0.05, jitter: float = 0.02,
+                   error_rate: float = 0.0, works_per_artist: int = 40, personal_artist: str = "Radiohead",
+                   use_cache: bool = False, seed: int = 0) -> dict:
+    """
+    Run every benchmark against a fresh fake MusicBrainz server.
+
+    Parameters:
+    - iterations (int): Measured runs per operation.
+    - warmup (int): Unmeasured runs per operation.
+    - latency (float): Server base delay in seconds.
+    - jitter (float): Server delay jitter in seconds.
+    - error_rate (float): Fraction of requests the server fails with 503.
+    - works_per_artist (int): Works every fake artist has.
+    - personal_artist (str): The artist personal mode questions are about.
+    - use_cache (bool): Give ArtistInfo an in-memory cache, measuring warm rather than cold lookups.
+    - seed (int): Seed for the server's latency and error draws.
+
+    Returns:
+    - dict: {"config": {...}, "environment": {...}, "results": {operation: summary}}
+    """
+    config = {"iterations": iterations, "warmup": warmup, "latency": latency, "jitter": jitter, "error_rate": error_rate,
+              "works_per_artist": works_per_artist, "personal_artist": personal_artist, "use_cache": use_cache, "seed": seed}
+
+    with FakeMusicBrainz(works_per_artist=works_per_artist, latency=latency, jitter=jitter, error_rate=error_rate, seed=seed) as server:
+        session = create_session()
+        session.trust_env = False  # never send local traffic through a proxy
+        artist_info = ArtistInfo(base_url=server.base_url, session=session, cache=TwoTierCache() if use_cache else None)
+        artist_quiz = ArtistQuiz(base_url=server.base_url, artist_info=artist_info)
+
+        operations = {
+            "generate_question_random_mode": artist_quiz.generate_question_random_mode,
+            "generate_question_personal_mode": lambda: artist_quiz.generate_question_personal_mode(personal_artist),
+            "generate_quiz_random_mode": lambda: artist_quiz.generate_quiz_random_mode(3),
+        }
+        results = {name: measure(operation, server, iterations, warmup) for name, operation in operations.items()}
+        session.close()
+
+    environment = {"python": platform.python_version(), "platform": platform.platform(), "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S")}
+    return {"config": config, "environment": environment, "results": results}
+
+
+def compare_results(current: dict, baseline: dict, max_regression: float = 0.2, metrics: tuple = COMPARED_METRICS) -> tuple:
+    """
+    Compare benchmark results with a baseline.
+
+    Parameters:
+    - current (dict): Results from run_benchmarks().
+    - baseline (dict): Earlier results in the same format.
+    - max_regression (float): Allowed relative increase of any metric, e.g. 0.2 for 20 %.
+    - metrics (tuple): The summary keys to compare.
+
+    Returns:
+    - tuple: (rows, regressions), each row being (operation, metric, baseline value, current value, relative change).
+    """
+    rows = []
+    regressions = []
+    for operation, summary in current["results"].items():
+        baseline_summary = baseline.get("results", {}).get(operation)
+        if baseline_summary is None:
+            continue
+        for metric in metrics:
+            before, after = baseline_summary.get(metric), summary.get(metric)
+            if before is None or after is None:
+                continue
+            change = (after - before) / before if before else 0.0
+            row = (operation, metric, before, after, change)
+            rows.append(row)
+            if change > max_regression:
+                regressions.append(row)
+    return rows, regressions
+
+
+def format_comparison(rows: list) -> str:
+    """
+    Format comparison rows as a text table.
+
+    Parameters:
+    - rows (list): Rows from compare_results().
+
+    Returns:
+    - str: The table.
+    """
+    lines = [f"{'operation':<34}{'metric':<20}{'baseline':>12}{'current':>12}{'change':>9}"]
+    for operation, metric, before, after, change in rows:
+        lines.append(f"{operation:<34}{metric:<20}{before:>12.1f}{after:>12.1f}{change:>+9.1%}")
+    return "\n".join(lines)
+
+
+def main():
+    """
+    Command-line entry point that runs the benchmarks.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark quiz generation against a local fake MusicBrainz server.")
+    parser.add_argument("--iterations", type=int, default=30, help="measured runs per operation")
+    parser.add_argument("--warmup", type=int, default=2, help="unmeasured runs per operation")
+    parser.add_argument("--latency-ms", type=float, default=50, help="server base delay")
+    parser.add_argument("--jitter-ms", type=float, default=20, help="server delay jitter")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests failed with 503")
+    parser.add_argument("--works-per-artist", type=int, default=40, help="works every fake artist has")
+    parser.add_argument("--cache", action="store_true", help="give ArtistInfo an in-memory cache")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the server's latency and error draws")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare with the results in this JSON file")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="allowed relative increase before failing")
+    args = parser.parse_args()
+
+    results = run_benchmarks(iterations=args.iterations, warmup=args.warmup, latency=args.latency_ms / 1000,
+                             jitter=args.jitter_ms / 1000, error_rate=args.error_rate, works_per_artist=args.works_per_artist,
+                             use_cache=args.cache, seed=args.seed)
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            output_file.write(output + "\n")
+    else:
+        print(output)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as baseline_file:
+            baseline = json.load(baseline_file)
+        rows, regressions = compare_results(results, baseline, args.max_regression)
+        print(format_comparison(rows))
+        if regressions:
+            print(f"{len(regressions)} metric(s) regressed by more than {args.max_regression:.0%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
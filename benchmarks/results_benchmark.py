@@ -0,0 +1,109 @@
+"""
+Yue Yu
+CS 5001, Fall 2023
+Final Project -- benchmarks.results_benchmark
+
+This program benchmarks the quiz results store: it fills a database with random results through the
+background writer, then measures p50/p95/p99 latency of leaderboard and player history reads.
+It exits non-zero if a read's p99 is above the limit (10 ms by default).
+
+Usage: python -m benchmarks.results_benchmark --rows 2000000 --players 200000
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from benchmarks.quiz_benchmark import percentile
+from models.metrics import MetricsRegistry
+from models.results_store import ResultsStore
+
+FILL_CHUNK = 50000  # results queued before waiting for the writer
+
+
+def fill_results(results_store: ResultsStore, rows: int, players: int, seed: int = 0) -> float:
+    """
+    Record random three-question results for random players, each for its own quiz.
+
+    Parameters:
+    - results_store (ResultsStore): The store to fill.
+    - rows (int): Number of results.
+    - players (int): Number of distinct players.
+    - seed (int): Seed for the players and scores.
+
+    Returns:
+    - float: Results written per second.
+    """
+    rng = random.Random(seed)
+    started = time.perf_counter()
+    for start in range(0, rows, FILL_CHUNK):
+        for index in range(start, min(start + FILL_CHUNK, rows)):
+            results_store.record(f"Player {rng.randrange(players)}", rng.randrange(4), 3, quiz=f"quiz-{index}")
+        results_store.flush()
+    elapsed = time.perf_counter() - started
+    return rows / elapsed if elapsed > 0 else None
+
+
+def measure_reads(results_store: ResultsStore, players: int, iterations: int, seed: int = 0) -> dict:
+    """
+    Time leaderboard and player history reads.
+
+    Parameters:
+    - results_store (ResultsStore): The filled store.
+    - players (int): Number of distinct players, to pick histories from.
+    - iterations (int): Reads of each kind.
+    - seed (int): Seed for the players whose history is read.
+
+    Returns:
+    - dict: p50/p95/p99 milliseconds of each read.
+    """
+    rng = random.Random(seed)
+    reads = {
+        "leaderboard": lambda: results_store.leaderboard(limit=10),
+        "history": lambda: results_store.history(f"Player {rng.randrange(players)}", limit=20),
+    }
+    results = {}
+    for name, read in reads.items():
+        latencies = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            read()
+            latencies.append((time.perf_counter() - started) * 1000)
+        results[name] = {f"p{q}_ms": round(percentile(latencies, q), 3) for q in (50, 95, 99)}
+    return results
+
+
+def main():
+    """
+    Command-line entry point that runs the benchmark.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark leaderboard and history reads of the quiz results store.")
+    parser.add_argument("--rows", type=int, default=1000000, help="results to fill the database with")
+    parser.add_argument("--players", type=int, default=100000, help="distinct players")
+    parser.add_argument("--iterations", type=int, default=1000, help="measured reads of each kind")
+    parser.add_argument("--path", help="database file (default: a temporary file, deleted afterwards)")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the players and scores")
+    parser.add_argument("--max-ms", type=float, default=10, help="fail if a read's p99 is above this")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        results_store = ResultsStore(args.path or os.path.join(directory, "results.sqlite3"), batch_size=5000,
+                                     queue_size=2 * FILL_CHUNK, metrics=MetricsRegistry())
+        writes_per_second = fill_results(results_store, args.rows, args.players, args.seed)
+        reads = measure_reads(results_store, args.players, args.iterations, args.seed)
+        stats = results_store.stats()
+        results_store.close()
+
+    print(json.dumps({"rows": args.rows, "players": args.players, "writes_per_second": round(writes_per_second or 0),
+                      "writer": stats, "reads": reads}, indent=2))
+    slow = [name for name, read in reads.items() if read["p99_ms"] > args.max_ms]
+    if slow:
+        print(f"p99 above {args.max_ms} ms: {', '.join(slow)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
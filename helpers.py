@@ -6,11 +6,136 @@ Final Project -- helpers
 This program contains helper functions that help implement the webapp.
 '''
 
+import os
+import time
+from contextlib import contextmanager
+from concurrent.futures import TimeoutError as FutureTimeoutError
 import streamlit as st
-import streamlit_lottie as st_lottie
-import requests
-import webbrowser
-from models.artist_info import ArtistInfo
+from models.asset_cache import get_shared_asset_cache
+from models.metrics import get_shared_metrics, start_metrics_server, DEFAULT_METRICS_PORT
+
+# Every page imports this module, so it only imports what every page needs on every run.
+# The MusicBrainz client (ArtistInfo and requests), the quiz models and streamlit_lottie are
+# imported by the functions that use them; see benchmarks/import_benchmark.py.
+
+ANIMATION_WAIT = 3  # seconds the end of a page waits for an animation still downloading
+SHOW_TIMINGS = os.environ.get("MUSICMUSTARD_SHOW_TIMINGS", "0") == "1"
+MARKDOWN_CHARACTERS = set("\\`*_{}[]()<>#+-.!|~$:")
+
+
+@st.cache_resource
+def get_artist_info():
+    """
+    Get the ArtistInfo shared by every session, backed by the process-wide transport (the pooled HTTP session,
+    or a recording when MUSICMUSTARD_REPLAY is set), two-tier cache, rate-limiting request scheduler and circuit breaker.
+
+    Returns:
+    - ArtistInfo: The shared ArtistInfo instance.
+    """
+    from models.artist_info import ArtistInfo
+    from models.transport import get_shared_transport
+    from models.artist_cache import get_shared_cache
+    from models.artist_catalog import get_shared_catalog
+
+    transport = get_shared_transport()
+    cache = get_shared_cache()
+    metrics = get_metrics()
+    metrics.add_stats("cache", cache.stats)
+    metrics.add_stats("catalog", get_shared_catalog().stats)
+    # Replayed recordings are served locally, so they skip the rate limiter and circuit breaker
+    if not transport.remote:
+        return ArtistInfo(transport=transport, cache=cache)
+
+    from models.request_scheduler import get_shared_scheduler
+    from models.circuit_breaker import get_shared_circuit_breaker
+
+    scheduler = get_shared_scheduler()
+    circuit_breaker = get_shared_circuit_breaker()
+    metrics.add_stats("scheduler", scheduler.stats)
+    metrics.add_stats("circuit_breaker", circuit_breaker.stats)
+    return ArtistInfo(transport=transport, cache=cache, scheduler=scheduler, circuit_breaker=circuit_breaker)
+
+
+@st.cache_resource
+def get_artist_quiz():
+    """
+    Get the ArtistQuiz shared by every session, injected with the shared ArtistInfo.
+
+    Returns:
+    - ArtistQuiz: The shared ArtistQuiz instance.
+    """
+    from models.artist_quiz import ArtistQuiz
+
+    artist_quiz = ArtistQuiz(artist_info=get_artist_info())
+    get_metrics().add_stats("distractor_negative_cache", artist_quiz.distractor_engine.stats)
+    return artist_quiz
+
+
+@st.cache_resource
+def get_quiz_builder():
+    """
+    Get the QuizBuilder shared by every session, so all sessions share one bounded thread pool.
+    Random mode uses the offline question bank when it has been built, and the warm question pool otherwise.
+
+    Returns:
+    - QuizBuilder: The shared QuizBuilder instance.
+    """
+    from models.quiz_builder import QuizBuilder
+    from models.question_bank import load_question_bank
+
+    question_bank = load_question_bank()
+    question_pool = get_question_pool() if question_bank is None else None
+    return QuizBuilder(artist_quiz=get_artist_quiz(), question_bank=question_bank, question_pool=question_pool)
+
+
+@st.cache_resource
+def get_question_pool():
+    """
+    Get the warm pool of pre-generated random mode questions shared by every session, starting it on first use.
+
+    Returns:
+    - QuestionPool: The shared, running QuestionPool instance.
+    """
+    from models.question_pool import QuestionPool
+
+    question_pool = QuestionPool(artist_quiz=get_artist_quiz())
+    question_pool.start()
+    get_metrics().add_stats("question_pool", question_pool.stats)
+    return question_pool
+
+
+@st.cache_resource
+def get_results_store():
+    """
+    Get the quiz results store shared by every session, with its background writer thread.
+
+    Returns:
+    - ResultsStore: The shared ResultsStore instance.
+    """
+    from models.results_store import get_shared_results_store
+
+    results_store = get_shared_results_store()
+    get_metrics().add_stats("results_store", results_store.stats)
+    return results_store
+
+
+@st.cache_resource
+def get_metrics():
+    """
+    Get the process-wide metrics registry and start serving it in the Prometheus text format
+    on MUSICMUSTARD_METRICS_PORT (0 disables it).
+    The shared components register their stats when they are created, so creating the registry imports none of them.
+
+    Returns:
+    - MetricsRegistry: The shared registry.
+    """
+    metrics = get_shared_metrics()
+    if DEFAULT_METRICS_PORT:
+        try:
+            start_metrics_server(metrics, DEFAULT_METRICS_PORT)
+        except OSError:
+            pass  # the port is taken, e.g. by another app process
+    return metrics
 
 
 def display_header(page_title: str, page_icon: str):
@@ -22,35 +147,95 @@ def display_header(page_title: str, page_icon: str):
     - page_icon (str): The icon for the page.
     """
     st.set_page_config(page_title, page_icon, initial_sidebar_state="collapsed")
+    # Start collecting and serving metrics on the first page view (after set_page_config, which must come first)
+    get_metrics()
+
+
+@st.cache_resource
+def get_asset_cache():
+    """
+    Get the asset cache shared by every session, holding the Lottie animations in memory once loaded.
+
+    Returns:
+    - AssetCache: The shared AssetCache instance.
+    """
+    asset_cache = get_shared_asset_cache()
+    get_metrics().add_stats("assets", asset_cache.stats)
+    return asset_cache
+
+
+def draw_lottie(lottie_json: dict, animation_height: int, lottie_key: str):
+    """
+    Draw a Lottie animation, importing streamlit_lottie on first use.
+
+    Parameters:
+    - lottie_json (dict): The Lottie animation JSON data.
+    - animation_height (int): The height of the animation.
+    - lottie_key (str): The key for the Lottie animation.
+    """
+    from streamlit_lottie import st_lottie
+
+    st_lottie(lottie_json, height=animation_height, key=lottie_key)
 
 
 def load_lottieurl(url: str):
     """
-    Load Lottie animation JSON data from a given URL.
+    Load Lottie animation JSON data from the asset cache, without touching the network.
+    If the animation has not been downloaded yet, a background download is started.
 
     Parameters:
-    - url (str): The URL to fetch the Lottie animation JSON.
+    - url (str): The URL of the Lottie animation JSON.
 
     Returns:
-    - dict or None: The Lottie animation JSON data if successful, None otherwise.
+    - dict or None: The Lottie animation JSON data if cached, None otherwise.
     """
-    r = requests.get(url)
-    if r.status_code != 200:
-        return None
-    return r.json()
+    asset_cache = get_asset_cache()
+    lottie_json = asset_cache.get(url)
+    if lottie_json is None:
+        asset_cache.load(url)
+    return lottie_json
 
 
 def display_animation(lottie_url: str, animation_height: int, lottie_key: str):
     """
     Display a Lottie animation.
 
+    If the animation is not cached yet, its place is kept empty and the rest of the page renders first;
+    render_pending_animations() fills it in at the end of the page.
+
     Parameters:
     - lottie_url (str): The URL of the Lottie animation.
     - animation_height (int): The height of the animation.
     - lottie_key (str): The key for the Lottie animation.
     """
-    lottie_json = load_lottieurl(lottie_url)
-    st_lottie.st_lottie(lottie_json, height=animation_height, key=lottie_key)
+    lottie_json = get_asset_cache().get(lottie_url)
+    if lottie_json is not None:
+        draw_lottie(lottie_json, animation_height, lottie_key)
+        return
+
+    if "pending_animations" not in st.session_state:
+        st.session_state.pending_animations = {}
+    st.session_state.pending_animations[lottie_key] = (st.empty(), get_asset_cache().load(lottie_url), animation_height)
+
+
+def render_pending_animations(timeout: float = ANIMATION_WAIT):
+    """
+    Fill in the animations that were still downloading when display_animation() was called.
+    Call it at the end of a page, once everything else has rendered.
+
+    Parameters:
+    - timeout (float): Seconds to wait for the downloads, shared by all pending animations.
+    """
+    pending_animations = st.session_state.pop("pending_animations", {})
+    deadline = time.monotonic() + timeout
+    for lottie_key, (placeholder, future, animation_height) in pending_animations.items():
+        try:
+            lottie_json = future.result(timeout=max(0, deadline - time.monotonic()))
+        except FutureTimeoutError:
+            lottie_json = None
+        if lottie_json is not None:
+            with placeholder.container():
+                draw_lottie(lottie_json, animation_height, lottie_key)
 
 
 def display_page_title(title_text: str):
@@ -64,26 +249,36 @@ def display_page_title(title_text: str):
     st.write("---")
 
 
-def redirect_link_button(artist_name: str, search_content: str):
+@contextmanager
+def rerun_timer(label: str):
     """
-    Redirect to a link based on the selected search content.
+    Time the code inside the with block and record it in st.session_state.rerun_timings.
+    With MUSICMUSTARD_SHOW_TIMINGS=1 the time is also shown on the page.
 
     Parameters:
-    - artist_name (str): The name of the artist.
-    - search_content (str): The type of information to search for (profile, works, genre, events).
+    - label (str): The name of the timed part, e.g. the page.
     """
-    artist_info = ArtistInfo()
-    artist_id = artist_info.fetch_artist_id(artist_name)
+    start = time.perf_counter()
+    yield
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    if "rerun_timings" not in st.session_state:
+        st.session_state.rerun_timings = {}
+    st.session_state.rerun_timings[label] = elapsed_ms
+    if SHOW_TIMINGS:
+        st.caption(f"⏱️ {label} rendered in {elapsed_ms:.1f} ms")
 
-    if artist_id:
-        musicbrainz_link = artist_info.generate_artist_link(artist_name, search_content)
 
-        if musicbrainz_link:
-            webbrowser.open(musicbrainz_link)
-        else:
-            st.error(f"Unable to fetch information for the artist: {artist_name}. Please check your spelling and retry with a valid artist name.")
-    else:
-        st.error(f"Unable to fetch information for the artist: {artist_name}. Please retry with a valid artist name.")
+def escape_markdown(text: str) -> str:
+    """
+    Escape Markdown in text from MusicBrainz (e.g. a work title such as "*69" or "[Untitled]"), so Streamlit shows it as typed.
+
+    Parameters:
+    - text (str): The text to show.
+
+    Returns:
+    - str: The text with every Markdown character, and ":" (Streamlit's emoji and color syntax), backslash-escaped.
+    """
+    return "".join(f"\\{char}" if char in MARKDOWN_CHARACTERS else char for char in str(text))
 
 
 def display_link(url: str, text: str):
@@ -0,0 +1,465 @@
+"""
+Yue Yu
+CS 5001, Fall 2023
+Final Project -- models.artist_cache
+
+This program contains a two-tier cache for MusicBrainz lookups: a bounded in-memory LRU in front of a persistent SQLite store.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_MEMORY_SIZE = 1024
+DEFAULT_DISK_SIZE = 100000
+DEFAULT_TTL = 24 * 60 * 60  # one day, in seconds
+ACCESS_FLUSH_SIZE = 256  # read hits whose access times are written together
+ACCESS_FLUSH_INTERVAL = 5.0  # seconds a read hit's access time may wait to be written
+DEFAULT_CACHE_PATH = os.environ.get("MUSICMUSTARD_CACHE_PATH", os.path.join(".cache", "musicmustard.sqlite3"))
+
+_shared_cache = None
+_shared_cache_lock = threading.Lock()
+
+
+class LRUCache:
+    """
+    This LRUCache class represents a bounded, thread-safe in-memory cache with per-entry TTLs.
+
+    Attributes:
+    - maxsize (int): Maximum number of entries kept before the least recently used one is evicted.
+    - default_ttl (float): TTL in seconds used when set() is not given one.
+    - hits (int): Number of successful lookups.
+    - misses (int): Number of failed or expired lookups.
+    - evictions (int): Number of entries dropped to respect maxsize.
+
+    Methods:
+    - get(self, key) -> tuple: Look up a key, returning (found, value).
+    - set(self, key, value, ttl=None): Store a value.
+    - delete(self, key): Remove a key if present.
+    - clear(self): Remove every entry.
+    - stats(self) -> dict: Return hit/miss/size counters.
+    """
+
+    def __init__(self, maxsize: int = DEFAULT_MEMORY_SIZE, default_ttl: float = DEFAULT_TTL):
+        """
+        Constructor method.
+
+        Parameters:
+        - maxsize (int): Maximum number of entries.
+        - default_ttl (float): Default TTL in seconds.
+        """
+        self.maxsize = maxsize
+        self.default_ttl = default_ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> tuple:
+        """
+        Look up a key.
+
+        Parameters:
+        - key (str): The cache key.
+
+        Returns:
+        - tuple: (True, value) on a hit, (False, None) on a miss or an expired entry.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return False, None
+            expires_at, value = entry
+            if expires_at < time.time():
+                del self._entries[key]
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, value
+
+    def set(self, key: str, value, ttl: float = None):
+        """
+        Store a value, evicting the least recently used entries if the cache is full.
+
+        Parameters:
+        - key (str): The cache key.
+        - value (object): The value to store.
+        - ttl (float): TTL in seconds. Defaults to default_ttl.
+        """
+        ttl = self.default_ttl if ttl is None else ttl
+        with self._lock:
+            self._entries[key] = (time.time() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: str):
+        """
+        Remove a key if present.
+
+        Parameters:
+        - key (str): The cache key.
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        """
+        Remove every entry.
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """
+        Return the cache counters.
+
+        Returns:
+        - dict: hits, misses, evictions and current size.
+        """
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions, "size": len(self._entries)}
+
+    def __len__(self):
+        """
+        Returns the number of entries, including ones that have expired but not been looked up yet.
+        """
+        return len(self._entries)
+
+
+class SQLiteCache:
+    """
+    This SQLiteCache class represents a persistent cache stored in a SQLite file, so entries survive restarts.
+
+    Values are stored as JSON. When the table grows past max_entries the least recently used rows are deleted.
+    The row count is tracked in memory rather than counted on every write, and the access times of read hits
+    are written in batches rather than one commit per hit.
+
+    Attributes:
+    - path (str): The SQLite database path.
+    - max_entries (int): Maximum number of rows kept.
+    - default_ttl (float): TTL in seconds used when set() is not given one.
+    - hits (int): Number of successful lookups.
+    - misses (int): Number of failed or expired lookups.
+
+    Methods:
+    - get(self, key, allow_stale=False) -> tuple: Look up a key, returning (found, value).
+    - get_entry(self, key, allow_stale=False) -> tuple: Look up a key, returning (found, value, expires_at).
+    - set(self, key, value, ttl=None): Store a value.
+    - delete(self, key): Remove a key if present.
+    - flush_access_times(self): Write the pending access times of read hits.
+    - purge_expired(self): Remove every expired row.
+    - clear(self): Remove every row.
+    - stats(self) -> dict: Return hit/miss/size counters.
+    - close(self): Close the database connection.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_entries: int = DEFAULT_DISK_SIZE, default_ttl: float = DEFAULT_TTL):
+        """
+        Constructor method.
+
+        Parameters:
+        - path (str): The SQLite database path. Use ":memory:" for a throwaway store.
+        - max_entries (int): Maximum number of rows kept.
+        - default_ttl (float): Default TTL in seconds.
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._pending_access = {}  # key -> access time not written yet
+        self._pending_since = 0.0
+
+        directory = os.path.dirname(path)
+        if path != ":memory:" and directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS cache_accessed_at ON cache (accessed_at)")
+        self._conn.commit()
+        self._count = self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+    def get(self, key: str, allow_stale: bool = False) -> tuple:
+        """
+        Look up a key.
+
+        Expired rows are kept (until evicted for space) so they can still be served with allow_stale
+        when MusicBrainz cannot be reached.
+
+        Parameters:
+        - key (str): The cache key.
+        - allow_stale (bool): Return the value even if it has expired.
+
+        Returns:
+        - tuple: (True, value) on a hit, (False, None) on a miss or an expired entry.
+        """
+        found, value, _ = self.get_entry(key, allow_stale)
+        return found, value
+
+    def get_entry(self, key: str, allow_stale: bool = False) -> tuple:
+        """
+        Look up a key, with the time its value expires.
+
+        Parameters:
+        - key (str): The cache key.
+        - allow_stale (bool): Return the value even if it has expired.
+
+        Returns:
+        - tuple: (True, value, expires_at) on a hit, (False, None, None) on a miss or an expired entry.
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, expires_at FROM cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return False, None, None
+            value, expires_at = row
+            if expires_at < now and not allow_stale:
+                self.misses += 1
+                return False, None, None
+            if not self._pending_access:
+                self._pending_since = now
+            self._pending_access[key] = now
+            if len(self._pending_access) >= ACCESS_FLUSH_SIZE or now - self._pending_since >= ACCESS_FLUSH_INTERVAL:
+                self._write_access_times()
+            self.hits += 1
+            return True, json.loads(value), expires_at
+
+    def set(self, key: str, value, ttl: float = None):
+        """
+        Store a value, deleting the least recently used rows if the store is full.
+
+        Parameters:
+        - key (str): The cache key.
+        - value (object): A JSON-serializable value.
+        - ttl (float): TTL in seconds. Defaults to default_ttl.
+        """
+        ttl = self.default_ttl if ttl is None else ttl
+        now = time.time()
+        with self._lock:
+            exists = self._conn.execute("SELECT 1 FROM cache WHERE key = ?", (key,)).fetchone() is not None
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now + ttl, now),
+            )
+            self._pending_access.pop(key, None)
+            if not exists:
+                self._count += 1
+            if self._count > self.max_entries:
+                # Access times decide what is evicted, so write the pending ones first;
+                # the count is taken again, as other processes may share the file
+                self._write_access_times(commit=False)
+                self._count = self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+                if self._count > self.max_entries:
+                    self._conn.execute(
+                        "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY accessed_at LIMIT ?)",
+                        (self._count - self.max_entries,),
+                    )
+                    self._count = self.max_entries
+            self._conn.commit()
+
+    def delete(self, key: str):
+        """
+        Remove a key if present.
+
+        Parameters:
+        - key (str): The cache key.
+        """
+        with self._lock:
+            self._count -= self._conn.execute("DELETE FROM cache WHERE key = ?", (key,)).rowcount
+            self._pending_access.pop(key, None)
+            self._conn.commit()
+
+    def flush_access_times(self):
+        """
+        Write the pending access times of read hits.
+        """
+        with self._lock:
+            self._write_access_times()
+
+    def _write_access_times(self, commit: bool = True):
+        """
+        Write the pending access times in one statement. The caller holds the lock.
+
+        Parameters:
+        - commit (bool): Commit afterwards; False when the caller commits.
+        """
+        if not self._pending_access:
+            return
+        self._conn.executemany("UPDATE cache SET accessed_at = ? WHERE key = ?",
+                               [(accessed_at, key) for key, accessed_at in self._pending_access.items()])
+        self._pending_access.clear()
+        if commit:
+            self._conn.commit()
+
+    def purge_expired(self):
+        """
+        Remove every expired row.
+        """
+        with self._lock:
+            self._count -= self._conn.execute("DELETE FROM cache WHERE expires_at < ?", (time.time(),)).rowcount
+            self._conn.commit()
+
+    def clear(self):
+        """
+        Remove every row.
+        """
+        with self._lock:
+            self._conn.execute("DELETE FROM cache")
+            self._pending_access.clear()
+            self._count = 0
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        """
+        Return the cache counters.
+
+        Returns:
+        - dict: hits, misses and current size.
+        """
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": self._count}
+
+    def close(self):
+        """
+        Write the pending access times and close the database connection.
+        """
+        with self._lock:
+            self._write_access_times()
+            self._conn.close()
+
+
+class TwoTierCache:
+    """
+    This TwoTierCache class represents an in-memory LRU backed by a persistent SQLite store.
+
+    Lookups try memory first, then disk; disk hits are promoted into memory.
+
+    Attributes:
+    - memory (LRUCache): The in-memory tier.
+    - disk (SQLiteCache): The on-disk tier, or None for memory only.
+
+    Methods:
+    - get(self, key) -> tuple: Look up a key, returning (found, value).
+    - get_stale(self, key) -> tuple: Look up a key, accepting an expired on-disk value.
+    - set(self, key, value, ttl=None): Store a value in both tiers.
+    - delete(self, key): Remove a key from both tiers.
+    - clear(self): Remove every entry from both tiers.
+    - stats(self) -> dict: Return the counters of both tiers.
+    """
+
+    def __init__(self, memory: LRUCache = None, disk: SQLiteCache = None):
+        """
+        Constructor method.
+
+        Parameters:
+        - memory (LRUCache): The in-memory tier. Defaults to a new LRUCache.
+        - disk (SQLiteCache): The on-disk tier. None keeps the cache in memory only.
+        """
+        self.memory = memory if memory is not None else LRUCache()
+        self.disk = disk
+
+    def get(self, key: str) -> tuple:
+        """
+        Look up a key in memory, then on disk.
+
+        Parameters:
+        - key (str): The cache key.
+
+        Returns:
+        - tuple: (True, value) on a hit, (False, None) on a miss.
+        """
+        found, value = self.memory.get(key)
+        if found or self.disk is None:
+            return found, value
+
+        found, value, expires_at = self.disk.get_entry(key)
+        if found:
+            # Promoted with the time the entry has left, so a short TTL (e.g. of a negative result) is kept
+            self.memory.set(key, value, ttl=expires_at - time.time())
+        return found, value
+
+    def get_stale(self, key: str) -> tuple:
+        """
+        Look up a key, accepting an expired on-disk value. Used as a fallback when MusicBrainz is unavailable.
+
+        Parameters:
+        - key (str): The cache key.
+
+        Returns:
+        - tuple: (True, value) if any value is stored, (False, None) otherwise.
+        """
+        found, value = self.memory.get(key)
+        if found or self.disk is None:
+            return found, value
+        return self.disk.get(key, allow_stale=True)
+
+    def set(self, key: str, value, ttl: float = None):
+        """
+        Store a value in both tiers.
+
+        Parameters:
+        - key (str): The cache key.
+        - value (object): A JSON-serializable value.
+        - ttl (float): TTL in seconds.
+        """
+        self.memory.set(key, value, ttl)
+        if self.disk is not None:
+            self.disk.set(key, value, ttl)
+
+    def delete(self, key: str):
+        """
+        Remove a key from both tiers.
+
+        Parameters:
+        - key (str): The cache key.
+        """
+        self.memory.delete(key)
+        if self.disk is not None:
+            self.disk.delete(key)
+
+    def clear(self):
+        """
+        Remove every entry from both tiers.
+        """
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+    def stats(self) -> dict:
+        """
+        Return the counters of both tiers.
+
+        Returns:
+        - dict: {"memory": {...}, "disk": {...}}
+        """
+        return {
+            "memory": self.memory.stats(),
+            "disk": self.disk.stats() if self.disk is not None else None,
+        }
+
+
+def get_shared_cache() -> TwoTierCache:
+    """
+    Get the process-wide two-tier cache, creating it on first use.
+
+    Returns:
+    - TwoTierCache: The shared cache, persisted at DEFAULT_CACHE_PATH.
+    """
+    global _shared_cache
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            _shared_cache = TwoTierCache(LRUCache(), SQLiteCache(DEFAULT_CACHE_PATH))
+        return _shared_cache
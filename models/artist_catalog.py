@@ -0,0 +1,566 @@
+"""
+Yue Yu
+CS 5001, Fall 2023
+Final Project -- models.artist_catalog
+
+This program contains the artist catalog random mode draws its artists from.
+
+The catalog is a tab-separated UTF-8 file with one artist per line: name, pre-resolved MBID, sampling weight and
+comma-separated tags. Lines starting with # are comments, and an empty MBID is resolved through MusicBrainz when needed.
+Artists are sampled in O(1), uniformly or by weight (Walker's alias method), with the current artist excluded,
+and a changed file is picked up without restarting the app.
+
+Build or refresh it with:
+    python -m models.artist_catalog --output data/artist_catalog.tsv
+    python -m models.artist_catalog --output data/artist_catalog.tsv --tag shoegaze --limit 2000
+"""
+
+import argparse
+import math
+import os
+import random
+import threading
+import time
+import zlib
+from models.random_mode_artists import random_mode_artists
+
+DEFAULT_CATALOG_PATH = os.environ.get("MUSICMUSTARD_ARTIST_CATALOG", os.path.join("data", "artist_catalog.tsv"))
+DEFAULT_RELOAD_INTERVAL = 5.0  # seconds between checks of the file for changes
+CATALOG_HEADER = "# name\tmbid\tweight\ttags"
+MAX_WEIGHTED_REJECTIONS = 32
+
+_shared_catalog = None
+_shared_catalog_lock = threading.Lock()
+
+
+class CatalogEntry:
+    """
+    This CatalogEntry class represents one artist in the catalog.
+
+    Attributes:
+    - name (str): The artist's name.
+    - mbid (str): The artist's MusicBrainz id, or None if it has not been resolved.
+    - weight (float): The artist's relative chance of being drawn by weighted sampling.
+    - tags (tuple): The artist's tags, e.g. ("rock", "britpop").
+    """
+
+    __slots__ = ("name", "mbid", "weight", "tags")
+
+    def __init__(self, name: str, mbid: str = None, weight: float = 1.0, tags: tuple = ()):
+        """
+        Constructor method.
+
+        Parameters:
+        - name (str): The artist's name.
+        - mbid (str): The artist's MusicBrainz id, or None.
+        - weight (float): The artist's sampling weight.
+        - tags (tuple): The artist's tags.
+
+        Raises:
+        - ValueError: If the name is empty or the weight is not positive.
+        """
+        if not name:
+            raise ValueError("A catalog entry needs a name")
+        if not weight > 0 or math.isinf(weight):
+            raise ValueError(f"The weight of {name} must be a positive number, not {weight}")
+        self.name = name
+        self.mbid = mbid or None
+        self.weight = float(weight)
+        self.tags = tuple(tags)
+
+    def __eq__(self, other):
+        if not isinstance(other, CatalogEntry):
+            return NotImplemented
+        return (self.name, self.mbid, self.weight, self.tags) == (other.name, other.mbid, other.weight, other.tags)
+
+    def __repr__(self):
+        return f"CatalogEntry({self.name!r}, {self.mbid!r}, {self.weight!r}, {self.tags!r})"
+
+
+class _Snapshot:
+    """
+    The immutable, indexed contents of one version of the catalog. A reload swaps in a new snapshot,
+    so a caller that reads the snapshot once always sees consistent names, ids and alias tables.
+    """
+
+    def __init__(self, entries: list, version: int):
+        self.entries = entries
+        self.version = version
+        self.names = tuple(entry.name for entry in entries)
+        self.index = {}
+        for position, entry in enumerate(entries):
+            self.index.setdefault(entry.name, position)
+        self.by_tag = {}
+        for position, entry in enumerate(entries):
+            for tag in entry.tags:
+                self.by_tag.setdefault(tag, []).append(position)
+        self.probability, self.alias = build_alias_table([entry.weight for entry in entries])
+
+
+class ArtistCatalog:
+    """
+    This ArtistCatalog class represents an indexed, hot-reloadable catalog of artists.
+
+    Attributes:
+    - path (str): The catalog file, or None for an in-memory catalog.
+    - reload_interval (float): Seconds between checks of the file for changes.
+    - version (int): Checksum identifying the catalog's contents.
+    - names (tuple): Every artist's name, in file order.
+
+    Methods:
+    - artist_id(self, name) -> str or None: Get an artist's pre-resolved MBID.
+    - tags(self, name) -> tuple: Get an artist's tags.
+    - with_tag(self, tag) -> list: Get the artists with a tag.
+    - choice(self, rng=None, exclude=None, weighted=False) -> str: Draw one artist in O(1).
+    - sample(self, k, rng=None, exclude=(), weighted=False) -> list: Draw k distinct artists.
+    - reload(self) -> bool: Re-read the file if it changed.
+    - stats(self) -> dict: Return catalog counters.
+    """
+
+    def __init__(self, entries: list, path: str = None, reload_interval: float = DEFAULT_RELOAD_INTERVAL):
+        """
+        Constructor method.
+
+        Parameters:
+        - entries (list): The catalog's CatalogEntry objects.
+        - path (str): The file the entries were read from, watched for changes. None for an in-memory catalog.
+        - reload_interval (float): Seconds between checks of the file for changes.
+
+        Raises:
+        - ValueError: If there are no entries.
+        """
+        if not entries:
+            raise ValueError("An artist catalog needs at least one artist")
+        self.path = path
+        self.reload_interval = reload_interval
+        self._snapshot = _Snapshot(list(entries), catalog_version(entries))
+        self._file_signature = _signature(path) if path else None
+        self._next_check = time.monotonic() + reload_interval
+        self._reloads = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_CATALOG_PATH, reload_interval: float = DEFAULT_RELOAD_INTERVAL):
+        """
+        Read a catalog file.
+
+        Parameters:
+        - path (str): The catalog file.
+        - reload_interval (float): Seconds between checks of the file for changes.
+
+        Returns:
+        - ArtistCatalog: The catalog.
+
+        Raises:
+        - OSError: If the file cannot be read.
+        - ValueError: If the file is not a valid catalog.
+        """
+        return cls(read_catalog(path), path=path, reload_interval=reload_interval)
+
+    @classmethod
+    def from_names(cls, names: list):
+        """
+        Build an in-memory catalog of equally weighted, unresolved artists.
+
+        Parameters:
+        - names (list): The artists' names.
+
+        Returns:
+        - ArtistCatalog: The catalog.
+        """
+        return cls([CatalogEntry(name) for name in dict.fromkeys(names)])
+
+    def _current(self) -> _Snapshot:
+        """
+        Get the current snapshot, first re-reading the file if the reload interval has passed and it changed.
+        """
+        if self.path is not None and time.monotonic() >= self._next_check:
+            self.reload()
+        return self._snapshot
+
+    @property
+    def version(self) -> int:
+        return self._current().version
+
+    @property
+    def names(self) -> tuple:
+        return self._current().names
+
+    def __len__(self):
+        return len(self._current().entries)
+
+    def __contains__(self, name):
+        return name in self._current().index
+
+    def artist_id(self, name: str) -> str or None:
+        """
+        Get an artist's pre-resolved MBID.
+
+        Parameters:
+        - name (str): The artist's name.
+
+        Returns:
+        - str: The MBID.
+        - None: If the artist is not in the catalog or has no MBID yet.
+        """
+        snapshot = self._current()
+        position = snapshot.index.get(name)
+        return snapshot.entries[position].mbid if position is not None else None
+
+    def tags(self, name: str) -> tuple:
+        """
+        Get an artist's tags.
+
+        Parameters:
+        - name (str): The artist's name.
+
+        Returns:
+        - tuple: The tags, empty if the artist is not in the catalog.
+        """
+        snapshot = self._current()
+        position = snapshot.index.get(name)
+        return snapshot.entries[position].tags if position is not None else ()
+
+    def with_tag(self, tag: str) -> list:
+        """
+        Get the artists with a tag.
+
+        Parameters:
+        - tag (str): The tag.
+
+        Returns:
+        - list: The artists' names, in file order.
+        """
+        snapshot = self._current()
+        return [snapshot.names[position] for position in snapshot.by_tag.get(tag, [])]
+
+    def choice(self, rng: random.Random = None, exclude: str = None, weighted: bool = False) -> str:
+        """
+        Draw one artist in O(1), never the excluded one.
+
+        Parameters:
+        - rng (random.Random): Random number generator. Defaults to the random module.
+        - exclude (str): An artist that must not be drawn, e.g. the question's artist.
+        - weighted (bool): Draw by weight rather than uniformly.
+
+        Returns:
+        - str: The artist's name.
+
+        Raises:
+        - ValueError: If the excluded artist is the only one.
+        """
+        return self.sample(1, rng, () if exclude is None else (exclude,), weighted)[0]
+
+    def sample(self, k: int, rng: random.Random = None, exclude=(), weighted: bool = False) -> list:
+        """
+        Draw k distinct artists, none of them excluded.
+
+        Each draw is O(1): uniform draws skip over a single excluded artist by index, and other collisions
+        are redrawn, which stays cheap while k and the excluded artists are few compared to the catalog.
+
+        Parameters:
+        - k (int): Number of artists.
+        - rng (random.Random): Random number generator. Defaults to the random module.
+        - exclude (iterable): Artists that must not be drawn.
+        - weighted (bool): Draw by weight rather than uniformly.
+
+        Returns:
+        - list: k distinct artists' names.
+
+        Raises:
+        - ValueError: If fewer than k artists are left after the exclusions.
+        """
+        rng = rng if rng is not None else random
+        snapshot = self._current()
+        size = len(snapshot.entries)
+        taken = {snapshot.index[name] for name in exclude if name in snapshot.index}
+        if size - len(taken) < k:
+            raise ValueError(f"Cannot draw {k} artists from a catalog of {size} with {len(taken)} excluded")
+
+        # With exactly one exclusion, a uniform index over the other size - 1 artists needs no redraw
+        skipped = next(iter(taken)) if len(taken) == 1 else None
+        chosen = []
+        while len(chosen) < k:
+            if weighted:
+                position = self._draw_weighted(snapshot, rng, taken)
+            elif skipped is not None and not chosen:
+                position = rng.randrange(size - 1)
+                position += position >= skipped
+            else:
+                position = rng.randrange(size)
+            if position in taken:
+                continue
+            taken.add(position)
+            chosen.append(snapshot.names[position])
+        return chosen
+
+    @staticmethod
+    def _draw_weighted(snapshot: _Snapshot, rng, taken: set) -> int:
+        """
+        Draw an index with Walker's alias method, redrawing taken ones a bounded number of times.
+        If the taken artists hold most of the weight, fall back to a uniform draw among the rest.
+        """
+        size = len(snapshot.entries)
+        for _ in range(MAX_WEIGHTED_REJECTIONS):
+            position = rng.randrange(size)
+            if rng.random() >= snapshot.probability[position]:
+                position = snapshot.alias[position]
+            if position not in taken:
+                return position
+        return rng.choice([position for position in range(size) if position not in taken])
+
+    def reload(self) -> bool:
+        """
+        Re-read the catalog file if it changed since it was last read. A file that cannot be read
+        or is not a valid catalog is ignored, so the app keeps serving the previous version.
+
+        Returns:
+        - bool: True if a new version was loaded.
+        """
+        if self.path is None:
+            return False
+        with self._lock:
+            self._next_check = time.monotonic() + self.reload_interval
+            signature = _signature(self.path)
+            if signature is None or signature == self._file_signature:
+                return False
+            try:
+                entries = read_catalog(self.path)
+            except (OSError, ValueError):
+                return False
+            self._file_signature = signature
+            if not entries or catalog_version(entries) == self._snapshot.version:
+                return False
+            self._snapshot = _Snapshot(entries, catalog_version(entries))
+            self._reloads += 1
+            return True
+
+    def stats(self) -> dict:
+        """
+        Return the catalog counters.
+
+        Returns:
+        - dict: Number of artists, how many have a pre-resolved MBID, the reload count and the version.
+        """
+        snapshot = self._current()
+        return {
+            "artists": len(snapshot.entries),
+            "pre_resolved": sum(entry.mbid is not None for entry in snapshot.entries),
+            "reloads": self._reloads,
+            "version": f"{snapshot.version:08x}",
+        }
+
+    def __str__(self):
+        """
+        Returns a string representation of the ArtistCatalog instance.
+
+        Returns:
+        - str: A string representation of the ArtistCatalog instance.
+        """
+        snapshot = self._current()
+        return f"ArtistCatalog({len(snapshot.entries)} artists, version {snapshot.version:08x}, path {self.path})"
+
+
+def build_alias_table(weights: list) -> tuple:
+    """
+    Build the tables of Walker's alias method (Vose's variant), which draws index i with
+    probability weights[i] / sum(weights) using one uniform index and one coin flip.
+
+    Parameters:
+    - weights (list): Positive weights.
+
+    Returns:
+    - tuple: (probability list, alias list)
+    """
+    size = len(weights)
+    total = sum(weights)
+    scaled = [weight * size / total for weight in weights]
+    probability = [1.0] * size
+    alias = list(range(size))
+    small = [i for i, value in enumerate(scaled) if value < 1.0]
+    large = [i for i, value in enumerate(scaled) if value >= 1.0]
+
+    while small and large:
+        less, more = small.pop(), large.pop()
+        probability[less] = scaled[less]
+        alias[less] = more
+        scaled[more] -= 1.0 - scaled[less]
+        (small if scaled[more] < 1.0 else large).append(more)
+    # Whatever is left is 1 up to rounding error
+    return probability, alias
+
+
+def catalog_version(entries: list) -> int:
+    """
+    Compute the checksum identifying a catalog's contents.
+
+    Parameters:
+    - entries (list): The catalog's CatalogEntry objects.
+
+    Returns:
+    - int: A CRC-32 of the serialized entries.
+    """
+    return zlib.crc32("\n".join(_format_entry(entry) for entry in entries).encode("utf-8"))
+
+
+def _format_entry(entry: CatalogEntry) -> str:
+    # Tabs and newlines separate fields and lines, and commas separate tags
+    name = " ".join(entry.name.split())
+    tags = ",".join(" ".join(tag.replace(",", " ").split()) for tag in entry.tags)
+    return "\t".join([name, entry.mbid or "", f"{entry.weight:g}", tags])
+
+
+def _signature(path: str) -> tuple or None:
+    try:
+        status = os.stat(path)
+    except OSError:
+        return None
+    return status.st_mtime_ns, status.st_size
+
+
+def read_catalog(path: str) -> list:
+    """
+    Read a catalog file.
+
+    Parameters:
+    - path (str): The catalog file.
+
+    Returns:
+    - list: The CatalogEntry objects, in file order.
+
+    Raises:
+    - OSError: If the file cannot be read.
+    - ValueError: If a line is malformed.
+    """
+    entries = []
+    with open(path, encoding="utf-8") as catalog_file:
+        for line_number, line in enumerate(catalog_file, start=1):
+            line = line.rstrip("\n")
+            if not line.strip() or line.startswith("#"):
+                continue
+            fields = line.split("\t")
+            if len(fields) != 4:
+                raise ValueError(f"{path}:{line_number}: expected 4 tab-separated fields, found {len(fields)}")
+            name, mbid, weight, tags = fields
+            try:
+                entries.append(CatalogEntry(name, mbid, float(weight or 1), [tag for tag in tags.split(",") if tag]))
+            except ValueError as error:
+                raise ValueError(f"{path}:{line_number}: {error}") from error
+    return entries
+
+
+def write_catalog(path: str, entries: list) -> int:
+    """
+    Write a catalog file atomically.
+
+    Parameters:
+    - path (str): Where to write the file.
+    - entries (list): The CatalogEntry objects.
+
+    Returns:
+    - int: The catalog version.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w", encoding="utf-8", newline="\n") as catalog_file:
+        catalog_file.write(CATALOG_HEADER + "\n")
+        for entry in entries:
+            catalog_file.write(_format_entry(entry) + "\n")
+    # Replace atomically so a running app never reads a half-written catalog
+    os.replace(temp_path, path)
+    return catalog_version(entries)
+
+
+def get_shared_catalog() -> ArtistCatalog:
+    """
+    Get the process-wide artist catalog, loading it on first use.
+
+    MUSICMUSTARD_ARTIST_CATALOG=<path> selects the file; without a readable catalog file
+    the catalog falls back to random_mode_artists.
+
+    Returns:
+    - ArtistCatalog: The shared catalog.
+    """
+    global _shared_catalog
+    with _shared_catalog_lock:
+        if _shared_catalog is None:
+            try:
+                _shared_catalog = ArtistCatalog.load(DEFAULT_CATALOG_PATH)
+            except (OSError, ValueError):
+                _shared_catalog = ArtistCatalog.from_names(random_mode_artists)
+        return _shared_catalog
+
+
+def build_catalog(artist_info, entries: list, tag: str = None, limit: int = 0) -> list:
+    """
+    Resolve the MBIDs of entries that have none, and optionally add the artists with a MusicBrainz tag.
+
+    Parameters:
+    - artist_info (ArtistInfo): The controller to fetch data with.
+    - entries (list): The starting CatalogEntry objects.
+    - tag (str): A MusicBrainz tag whose artists are added, e.g. "shoegaze".
+    - limit (int): Maximum number of artists added from the tag.
+
+    Returns:
+    - list: The catalog's CatalogEntry objects.
+    """
+    by_name = {entry.name: entry for entry in entries}
+    artist_ids, misses = artist_info.resolve_many([entry.name for entry in entries if entry.mbid is None])
+    for name, artist_id in artist_ids.items():
+        by_name[name].mbid = artist_id
+    for name in misses:
+        print(f"Could not resolve {name}")
+
+    if tag:
+        known_ids = {entry.mbid for entry in by_name.values() if entry.mbid}
+        added = 0
+        for artist in artist_info.iter_artists_by_tag(tag):
+            if added >= limit:
+                break
+            if artist["id"] in known_ids or artist["name"] in by_name:
+                continue
+            # An artist's votes for the tag make a rough popularity weight
+            by_name[artist["name"]] = CatalogEntry(artist["name"], artist["id"], max(1, artist["votes"]), artist["tags"][:8])
+            known_ids.add(artist["id"])
+            added += 1
+        print(f"Added {added} artists tagged {tag}")
+
+    return list(by_name.values())
+
+
+def main():
+    """
+    Command-line entry point that builds or refreshes the artist catalog.
+    """
+    # Imported here so reading a catalog does not pull in the HTTP stack
+    from models.artist_info import ArtistInfo
+    from models.request_scheduler import RequestScheduler
+
+    parser = argparse.ArgumentParser(description="Build the random mode artist catalog.")
+    parser.add_argument("--output", default=DEFAULT_CATALOG_PATH, help="where to write the catalog file")
+    parser.add_argument("--input", help="catalog or name list (one name per line) to start from; defaults to the output file")
+    parser.add_argument("--tag", help="also add artists with this MusicBrainz tag")
+    parser.add_argument("--limit", type=int, default=1000, help="maximum number of artists added from the tag")
+    args = parser.parse_args()
+
+    source = args.input or args.output
+    if os.path.exists(source):
+        with open(source, encoding="utf-8") as source_file:
+            is_catalog = "\t" in source_file.read()
+        if is_catalog:
+            entries = read_catalog(source)
+        else:
+            with open(source, encoding="utf-8") as source_file:
+                entries = [CatalogEntry(line.strip()) for line in source_file if line.strip()]
+    else:
+        entries = [CatalogEntry(name, tags=("rock",)) for name in random_mode_artists]
+
+    entries = build_catalog(ArtistInfo(scheduler=RequestScheduler()), entries, args.tag, args.limit)
+    version = write_catalog(args.output, entries)
+    print(f"Wrote {args.output}: {len(entries)} artists (catalog version {version:08x})")
+
+
+if __name__ == "__main__":
+    main()
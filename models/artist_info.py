@@ -6,9 +6,27 @@ Final Project -- models.artist_info
 This program contains a class ArtistInfo that fetches artists' information from MusicBrainz API. MusicBrainz is an open music encyclopedia that collects music metadata
 """
 
+import asyncio
+import re
 import requests
 import random
-from models.random_mode_artists import random_mode_artists
+import time
+import unicodedata
+from urllib.parse import quote
+from models.artist_catalog import get_shared_catalog
+from models.http_session import get_shared_session, DEFAULT_TIMEOUT
+from models.transport import LiveTransport
+from models.circuit_breaker import CircuitOpenError
+from models.request_scheduler import SchedulerBusyError
+from models.metrics import get_shared_metrics, endpoint_of, HTTP_REQUEST_DURATION, HTTP_RESPONSE_BYTES
+
+ARTIST_ID_TTL = 30 * 24 * 60 * 60  # MBIDs are stable, keep them for 30 days
+ARTIST_WORKS_TTL = 24 * 60 * 60  # works lists change rarely, keep them for a day
+WORKS_PAGE_SIZE = 100  # the largest page MusicBrainz serves
+RESOLVE_BATCH_SIZE = 10  # names combined into one search query
+ARTIST_DETAILS_TTL = 24 * 60 * 60
+# Everything the Explore filters need, in a single artist lookup
+ARTIST_DETAILS_INC = "works+tags+genres+event-rels"
 
 
 class ArtistInfo:
@@ -17,12 +35,27 @@ class ArtistInfo:
 
     Attributes:
     - base_url (str): The base URL for MusicBrainz API.
+    - session (requests.Session): The pooled HTTP session behind the default live transport.
+    - transport (Transport): The transport every request is sent through.
+    - metrics (MetricsRegistry): The registry request latency, status and bytes are recorded in.
+    - timeout (tuple): The (connect, read) timeouts in seconds.
+    - cache (TwoTierCache): Optional cache for artist ids and works lists.
+    - scheduler (RequestScheduler): Optional rate-limiting scheduler that requests are sent through.
+    - circuit_breaker (CircuitBreaker): Optional breaker that fails requests fast while MusicBrainz is down.
+    - catalog (ArtistCatalog): The artists random mode draws from, with their pre-resolved MBIDs.
 
     Methods:
-    - __init__(self, base_url=BASE_URL): Constructor method.
-    - choose_current_artist(self) -> str: Chooses a random artist from the list of random_mode_artists.
+    - __init__(self, base_url=BASE_URL, session=None, timeout=DEFAULT_TIMEOUT, cache=None, scheduler=None, circuit_breaker=None, transport=None, metrics=None, catalog=None): Constructor method.
+    - choose_current_artist(self, rng=None) -> str: Chooses a random artist from the artist catalog.
     - fetch_artist_id(self, artist_name) -> str or None: Fetch a given artist's id from MusicBrainz API.
     - fetch_artist_works(self, artist_id) -> list or None: Fetch a given artist's works from MusicBrainz API.
+    - resolve_many(self, names) -> tuple: Resolve several artists' ids with one search query per batch.
+    - iter_artist_works(self, artist_id, page_size=WORKS_PAGE_SIZE, max_pages=None): Lazily yield an artist's works page by page.
+    - iter_artists_by_tag(self, tag, page_size=100, max_pages=None): Lazily yield the artists with a tag page by page.
+    - sample_artist_works(self, artist_id, k, max_pages=None, rng=None) -> list: Reservoir-sample k of an artist's works.
+    - fetch_artist_id_async(self, artist_name) -> str or None: Awaitable version of fetch_artist_id.
+    - fetch_artist_works_async(self, artist_id) -> list or None: Awaitable version of fetch_artist_works.
+    - fetch_artist_details(self, artist_id) -> dict or None: Fetch an artist's profile, works, genres and events in one lookup.
     - generate_artist_link(self, artist_name, search_content) -> str or None: Generate the MusicBrainz link to the artist's search content.
     - __eq__(self, other): Compares two ArtistInfo instances for equality.
     - __str__(self): Returns a string representation of the ArtistInfo instance.
@@ -30,27 +63,111 @@ class ArtistInfo:
 
     BASE_URL = 'https://beta.musicbrainz.org/ws/2/'
 
-    def __init__(self, base_url=BASE_URL):
+    def __init__(self, base_url=BASE_URL, session=None, timeout=DEFAULT_TIMEOUT, cache=None, scheduler=None, circuit_breaker=None, transport=None, metrics=None,
+                 catalog=None):
         """
         Constructor method.
 
         Parameters:
         - base_url (str): The base URL for MusicBrainz API.
+        - session (requests.Session): The HTTP session to use. Defaults to the process-wide pooled session.
+        - timeout (tuple): The (connect, read) timeouts in seconds.
+        - cache (TwoTierCache): Cache for artist ids and works lists. None disables caching.
+        - scheduler (RequestScheduler): Scheduler to send requests through. None sends them straight over the session.
+        - circuit_breaker (CircuitBreaker): Breaker to guard requests with. None disables it.
+        - transport (Transport): Transport to send requests through. Defaults to a LiveTransport over the session.
+        - metrics (MetricsRegistry): Registry to record request metrics in. Defaults to the process-wide registry.
+        - catalog (ArtistCatalog): The artists random mode draws from. Defaults to the process-wide catalog.
         """
         self.base_url = base_url
+        self.session = session if session is not None else get_shared_session()
+        self.timeout = timeout
+        self.cache = cache
+        self.scheduler = scheduler
+        self.circuit_breaker = circuit_breaker
+        self.transport = transport if transport is not None else LiveTransport(self.session)
+        self.metrics = metrics if metrics is not None else get_shared_metrics()
+        self.catalog = catalog if catalog is not None else get_shared_catalog()
+
+    def _get(self, url: str):
+        """
+        Send a GET request through the circuit breaker and scheduler if there are any, otherwise through the transport.
+        Every call is recorded in the metrics registry by endpoint and status.
+
+        Parameters:
+        - url (str): The URL to fetch.
+
+        Returns:
+        - requests.Response: The HTTP response.
+
+        Raises:
+        - CircuitOpenError: If the circuit breaker is open.
+        - SchedulerBusyError: If the scheduler's queue is too long to wait in.
+        """
+        endpoint = endpoint_of(url)
+        status = "error"
+        start = time.perf_counter()
+        try:
+            if self.circuit_breaker is not None:
+                response = self.circuit_breaker.call(self._send, url)
+            else:
+                response = self._send(url)
+            status = str(response.status_code)
+            self.metrics.inc(HTTP_RESPONSE_BYTES, len(response.content or b""), endpoint=endpoint, status=status)
+            return response
+        except CircuitOpenError:
+            status = "circuit_open"
+            raise
+        except SchedulerBusyError:
+            status = "scheduler_busy"
+            raise
+        finally:
+            self.metrics.observe(HTTP_REQUEST_DURATION, time.perf_counter() - start, endpoint=endpoint, status=status)
+
+    def _send(self, url: str):
+        """
+        Send a GET request through the scheduler if there is one, otherwise through the transport.
+
+        Parameters:
+        - url (str): The URL to fetch.
+
+        Returns:
+        - requests.Response: The HTTP response.
+        """
+        if self.scheduler is not None:
+            return self.scheduler.get(url, timeout=self.timeout)
+        return self.transport.get(url, timeout=self.timeout)
+
+    def _stale_fallback(self, cache_key: str):
+        """
+        Get a cached value even if it has expired, for use when MusicBrainz cannot be reached.
+
+        Parameters:
+        - cache_key (str): The cache key.
+
+        Returns:
+        - object: The stale value, or None if there is none.
+        """
+        if self.cache is None:
+            return None
+        return self.cache.get_stale(cache_key)[1]
 
-    def choose_current_artist(self) -> str:
+    def choose_current_artist(self, rng: random.Random = None) -> str:
         """
-        Chooses a random artist from the list of random_mode_artists.
+        Chooses a random artist from the artist catalog, more popular artists more often.
+
+        Parameters:
+        - rng (random.Random): Random number generator. Defaults to the random module.
 
         Returns:
         - str: The selected artist's name.
         """
-        return random.choice(random_mode_artists)
+        return self.catalog.choice(rng, weighted=True)
 
     def fetch_artist_id(self, artist_name: str) -> str or None:
         """
         Fetch a given artist's id from MusicBrainz API.
+        Catalog artists with a pre-resolved MBID are answered without a request.
 
         Parameters:
         - artist_name (str): The artist's name for fetching id.
@@ -59,26 +176,116 @@ class ArtistInfo:
         - str: The given artist's id.
         - None: In the case of an error.
         """
+        artist_id = self.catalog.artist_id(artist_name)
+        if artist_id is not None:
+            return artist_id
+
+        cache_key = f"artist_id:{artist_name}"
+        if self.cache is not None:
+            found, artist_id = self.cache.get(cache_key)
+            if found:
+                return artist_id
+
         endpoint = "artist"
         query = f"?query=artist:\"{artist_name}\"&limit=1&fmt=json"
-        url = f"{self.BASE_URL}{endpoint}/{query}"
+        url = f"{self.base_url}{endpoint}/{query}"
 
         try:
-            # Sends an HTTP GET request to the URL using the requests library
+            # Sends an HTTP GET request to the URL over the pooled session
             # Stores the information about the HTTP response
-            response = requests.get(url)
+            response = self._get(url)
             # Converts the JSON-formatted content into a Python dictionary
             data = response.json()
             # e.g. {"artists": [{"id": "095b2041-4975-4ba3-a92e-53fa3459107f"}]}
             artist_id = data.get('artists', [])[0].get('id', None)
+            if artist_id and self.cache is not None:
+                self.cache.set(cache_key, artist_id, ttl=ARTIST_ID_TTL)
             return artist_id
-        except (requests.exceptions.ConnectionError, IndexError, KeyError):
-            # Handle connection error, index error, or key error
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout, requests.exceptions.JSONDecodeError):
+            # Handle connection error, timeout, open circuit or non-JSON (e.g. throttled) response:
+            # fall back to an expired cached id if there is one
+            return self._stale_fallback(cache_key)
+        except (IndexError, KeyError):
+            # Handle index error or key error
             return None
 
+    def resolve_many(self, names: list) -> tuple:
+        """
+        Resolve several artists' ids with one Lucene OR query per RESOLVE_BATCH_SIZE names.
+
+        Results are mapped back to the input names by exact name first, then by normalized name
+        (case, accents, punctuation and a leading "The" ignored). Pre-resolved catalog ids and cached ids are used without a request.
+
+        Parameters:
+        - names (list): The artists' names.
+
+        Returns:
+        - tuple: (dict mapping each resolved name to its id, list of names that could not be resolved)
+        """
+        resolved = {}
+        pending = []
+        for name in dict.fromkeys(names):
+            artist_id = self.catalog.artist_id(name)
+            if artist_id is not None:
+                resolved[name] = artist_id
+                continue
+            if self.cache is not None:
+                found, artist_id = self.cache.get(f"artist_id:{name}")
+                if found:
+                    resolved[name] = artist_id
+                    continue
+            pending.append(name)
+
+        for start in range(0, len(pending), RESOLVE_BATCH_SIZE):
+            batch = pending[start:start + RESOLVE_BATCH_SIZE]
+            for name, artist_id in self._search_artists(batch).items():
+                resolved[name] = artist_id
+                if self.cache is not None:
+                    self.cache.set(f"artist_id:{name}", artist_id, ttl=ARTIST_ID_TTL)
+
+        misses = [name for name in dict.fromkeys(names) if name not in resolved]
+        return resolved, misses
+
+    def _search_artists(self, names: list) -> dict:
+        """
+        Send one OR search for a batch of names and match the results back to them.
+
+        Parameters:
+        - names (list): The artists' names.
+
+        Returns:
+        - dict: Each matched name mapped to its id.
+        """
+        endpoint = "artist"
+        lucene_query = " OR ".join(f'artist:"{escape_lucene_phrase(name)}"' for name in names)
+        query = f"?query={quote(lucene_query)}&limit=100&fmt=json"
+        url = f"{self.base_url}{endpoint}/{query}"
+
+        try:
+            data = self._get(url).json()
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout, requests.exceptions.JSONDecodeError):
+            return {}
+
+        # Results come sorted by score, so the first artist with a matching name wins
+        exact_ids = {}
+        normalized_ids = {}
+        for artist in data.get("artists", []):
+            for candidate in (artist.get("name"), artist.get("sort-name")):
+                if candidate and artist.get("id"):
+                    exact_ids.setdefault(candidate, artist["id"])
+                    normalized_ids.setdefault(normalize_artist_name(candidate), artist["id"])
+
+        matches = {}
+        for name in names:
+            artist_id = exact_ids.get(name) or normalized_ids.get(normalize_artist_name(name))
+            if artist_id:
+                matches[name] = artist_id
+        return matches
+
     def fetch_artist_works(self, artist_id: str) -> list or None:
         """
         Fetch a given artist's works from MusicBrainz API.
+        Only the first page (up to WORKS_PAGE_SIZE works) is fetched; use iter_artist_works for the full catalog.
 
         Parameters:
         - artist_id (str): The artist's id for fetching works.
@@ -87,14 +294,20 @@ class ArtistInfo:
         - list: List of artist's works.
         - None: In the case of an error.
         """
+        cache_key = f"artist_works:{artist_id}"
+        if self.cache is not None:
+            found, works_list = self.cache.get(cache_key)
+            if found:
+                return works_list
+
         endpoint = "work"
-        query = f"?artist={artist_id}&fmt=json"
-        url = f"{self.BASE_URL}{endpoint}/{query}"
+        query = f"?artist={artist_id}&limit={WORKS_PAGE_SIZE}&fmt=json"
+        url = f"{self.base_url}{endpoint}/{query}"
 
         try:
-            # Sends an HTTP GET request to the URL using the requests library
+            # Sends an HTTP GET request to the URL over the pooled session
             # Stores the information about the HTTP response
-            response = requests.get(url)
+            response = self._get(url)
             # Converts the JSON-formatted content into a Python dictionary
             # e.g. {'works': [{'title': 'Song 1'}, {'title': 'Song 2'}]}
             data = response.json()
@@ -106,15 +319,211 @@ class ArtistInfo:
                 for work in data["works"]:
                     works_list.append(work["title"])
 
+                if self.cache is not None:
+                    self.cache.set(cache_key, works_list, ttl=ARTIST_WORKS_TTL)
                 # Return the list of works
                 return works_list
             else:
                 # If 'works' key does not exist, return None
                 return None
 
-        except requests.exceptions.ConnectionError:
-            # Handle connection error
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout, requests.exceptions.JSONDecodeError):
+            # Handle connection error, timeout, open circuit or non-JSON (e.g. throttled) response:
+            # fall back to an expired cached works list if there is one
+            return self._stale_fallback(cache_key)
+
+    def iter_artists_by_tag(self, tag: str, page_size: int = 100, max_pages: int = None):
+        """
+        Lazily yield the artists with a MusicBrainz tag, best matches first, fetching one page at a time.
+
+        Parameters:
+        - tag (str): The tag, e.g. "shoegaze".
+        - page_size (int): Number of artists per request (MusicBrainz allows at most 100).
+        - max_pages (int): Page budget. None fetches every page.
+
+        Yields:
+        - dict: {"id", "name", "tags", "votes"}, where tags are the artist's tags by votes and
+          votes is how many users gave the artist this tag.
+        """
+        endpoint = "artist"
+        lucene_query = f'tag:"{escape_lucene_phrase(tag)}"'
+        offset = 0
+        pages = 0
+
+        while max_pages is None or pages < max_pages:
+            query = f"?query={quote(lucene_query)}&limit={page_size}&offset={offset}&fmt=json"
+            url = f"{self.base_url}{endpoint}/{query}"
+            try:
+                data = self._get(url).json()
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout, requests.exceptions.JSONDecodeError):
+                return
+
+            artists = data.get("artists", [])
+            pages += 1
+            for artist in artists:
+                # e.g. {"id": "...", "name": "Slowdive", "tags": [{"count": 5, "name": "shoegaze"}, ...]}
+                tags = sorted(artist.get("tags", []), key=lambda artist_tag: -artist_tag.get("count", 0))
+                votes = next((artist_tag.get("count", 0) for artist_tag in tags if artist_tag.get("name") == tag), 0)
+                yield {"id": artist["id"], "name": artist["name"], "tags": [artist_tag["name"] for artist_tag in tags], "votes": votes}
+
+            offset += len(artists)
+            if len(artists) < page_size or offset >= data.get("count", offset):
+                return
+
+    def iter_artist_works(self, artist_id: str, page_size: int = WORKS_PAGE_SIZE, max_pages: int = None):
+        """
+        Lazily yield a given artist's works, fetching one page at a time.
+
+        The next page is only requested once the caller has consumed the previous one,
+        and iteration stops at the last page, after max_pages pages, or on an error.
+
+        Parameters:
+        - artist_id (str): The artist's id for fetching works.
+        - page_size (int): Number of works per request (MusicBrainz allows at most 100).
+        - max_pages (int): Page budget. None fetches every page.
+
+        Yields:
+        - str: The title of each work.
+        """
+        endpoint = "work"
+        offset = 0
+        pages = 0
+
+        while max_pages is None or pages < max_pages:
+            query = f"?artist={artist_id}&limit={page_size}&offset={offset}&fmt=json"
+            url = f"{self.base_url}{endpoint}/{query}"
+            try:
+                data = self._get(url).json()
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout, requests.exceptions.JSONDecodeError):
+                return
+
+            works = data.get("works", [])
+            pages += 1
+            for work in works:
+                yield work["title"]
+
+            offset += len(works)
+            # e.g. {'work-count': 312, 'work-offset': 100, 'works': [...]}
+            if len(works) < page_size or offset >= data.get("work-count", offset):
+                return
+
+    def sample_artist_works(self, artist_id: str, k: int, max_pages: int = None, rng: random.Random = None) -> list:
+        """
+        Reservoir-sample k of a given artist's works while streaming the pages,
+        so memory stays at k titles however large the catalog is.
+
+        Parameters:
+        - artist_id (str): The artist's id for fetching works.
+        - k (int): Number of works to sample.
+        - max_pages (int): Page budget. None samples from every page.
+        - rng (random.Random): Random number generator. Defaults to the random module.
+
+        Returns:
+        - list: Up to k works, each equally likely to be picked.
+        """
+        rng = rng if rng is not None else random
+        reservoir = []
+
+        for seen, title in enumerate(self.iter_artist_works(artist_id, max_pages=max_pages)):
+            if seen < k:
+                reservoir.append(title)
+            else:
+                slot = rng.randint(0, seen)
+                if slot < k:
+                    reservoir[slot] = title
+
+        return reservoir
+
+    async def fetch_artist_id_async(self, artist_name: str) -> str or None:
+        """
+        Awaitable version of fetch_artist_id.
+
+        The blocking request runs in a worker thread on the same pooled session and cache,
+        so several lookups can be awaited concurrently with asyncio.gather.
+
+        Parameters:
+        - artist_name (str): The artist's name for fetching id.
+
+        Returns:
+        - str: The given artist's id.
+        - None: In the case of an error.
+        """
+        # Pre-resolved catalog artists need neither a request nor a worker thread
+        artist_id = self.catalog.artist_id(artist_name)
+        if artist_id is not None:
+            return artist_id
+        return await asyncio.to_thread(self.fetch_artist_id, artist_name)
+
+    async def fetch_artist_works_async(self, artist_id: str) -> list or None:
+        """
+        Awaitable version of fetch_artist_works.
+
+        Parameters:
+        - artist_id (str): The artist's id for fetching works.
+
+        Returns:
+        - list: List of artist's works.
+        - None: In the case of an error.
+        """
+        return await asyncio.to_thread(self.fetch_artist_works, artist_id)
+
+    def fetch_artist_details(self, artist_id: str) -> dict or None:
+        """
+        Fetch a given artist's profile, works, genres and events from MusicBrainz API in a single lookup.
+
+        Parameters:
+        - artist_id (str): The artist's id.
+
+        Returns:
+        - dict: {"id", "name", "type", "country", "disambiguation", "begin", "end", "genres", "tags", "works", "events"}
+        - None: In the case of an error.
+        """
+        cache_key = f"artist_details:{artist_id}"
+        if self.cache is not None:
+            found, details = self.cache.get(cache_key)
+            if found:
+                return details
+
+        endpoint = "artist"
+        query = f"?inc={ARTIST_DETAILS_INC}&fmt=json"
+        url = f"{self.base_url}{endpoint}/{artist_id}{query}"
+
+        try:
+            data = self._get(url).json()
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout, requests.exceptions.JSONDecodeError):
             return None
+        if "id" not in data:
+            # e.g. {"error": "Not Found"}
+            return None
+
+        life_span = data.get("life-span", {})
+        tags = sorted(data.get("tags", []), key=lambda tag: tag.get("count", 0), reverse=True)
+        events = []
+        for relation in data.get("relations", []):
+            event = relation.get("event")
+            if event:
+                events.append({
+                    "name": event.get("name"),
+                    "date": event.get("life-span", {}).get("begin"),
+                    "role": relation.get("type"),
+                })
+
+        details = {
+            "id": data["id"],
+            "name": data.get("name"),
+            "type": data.get("type"),
+            "country": data.get("country"),
+            "disambiguation": data.get("disambiguation"),
+            "begin": life_span.get("begin"),
+            "end": life_span.get("end"),
+            "genres": [genre["name"] for genre in data.get("genres", [])],
+            "tags": [tag["name"] for tag in tags],
+            "works": [work["title"] for work in data.get("works", [])],
+            "events": events,
+        }
+        if self.cache is not None:
+            self.cache.set(cache_key, details, ttl=ARTIST_DETAILS_TTL)
+        return details
 
     def generate_artist_link(self, artist_name: str, search_content: str) -> str or None:
         """
@@ -129,20 +538,9 @@ class ArtistInfo:
         - None: In the case of an error.
         """
         artist_id = self.fetch_artist_id(artist_name)
-        endpoint = "artist"
 
         if artist_id:
-            link_endpoints = {
-                "profile": "",
-                "works": "/works",
-                "genre": "/tags",
-                "events": "/events"
-            }
-
-            link_endpoint = link_endpoints.get(search_content)
-            if endpoint:
-                musicbrainz_link = f"https://beta.musicbrainz.org/{endpoint}/{artist_id}{link_endpoint}"
-                return musicbrainz_link
+            return build_artist_link(artist_id, search_content)
 
         return None
 
@@ -168,3 +566,59 @@ class ArtistInfo:
         - str: String representation of the instance.
         """
         return f"ArtistInfo(base_url={self.base_url})"
+
+
+def build_artist_link(artist_id: str, search_content: str) -> str or None:
+    """
+    Build the MusicBrainz link to an artist's search content.
+
+    Parameters:
+    - artist_id (str): The artist's id.
+    - search_content (str): Can be one of these: profile, works, genre, events.
+
+    Returns:
+    - str: MusicBrainz link to the artist's search content.
+    - None: If search_content is not recognised.
+    """
+    link_endpoints = {
+        "profile": "",
+        "works": "/works",
+        "genre": "/tags",
+        "events": "/events"
+    }
+
+    link_endpoint = link_endpoints.get(search_content)
+    if link_endpoint is None:
+        return None
+    return f"https://beta.musicbrainz.org/artist/{artist_id}{link_endpoint}"
+
+
+def escape_lucene_phrase(text: str) -> str:
+    """
+    Escape text for use inside a quoted Lucene phrase.
+
+    Parameters:
+    - text (str): The raw text.
+
+    Returns:
+    - str: The text with backslashes and double quotes escaped.
+    """
+    return text.replace("\\", "\\\\").replace('"', '\\"')
+
+
+def normalize_artist_name(name: str) -> str:
+    """
+    Normalize an artist's name for loose matching.
+
+    Parameters:
+    - name (str): The artist's name.
+
+    Returns:
+    - str: The name casefolded, without accents, punctuation or a leading "the".
+    """
+    decomposed = unicodedata.normalize("NFKD", name)
+    without_accents = "".join(char for char in decomposed if not unicodedata.combining(char))
+    words = re.sub(r"[^\w\s]", "", without_accents.casefold()).split()
+    if words and words[0] == "the":
+        words = words[1:]
+    return " ".join(words)
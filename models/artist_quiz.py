@@ -8,40 +8,150 @@ This program contains a class ArtistQuiz that generates questions and options fo
 Methods: generate_false_answers, generate_question_default_mode, generate_question_personal_mode
 """
 
+import asyncio
 import random
-from models.random_mode_artists import random_mode_artists
+from concurrent.futures import ThreadPoolExecutor
 from models.artist_info import ArtistInfo
+from models.distractor_engine import DistractorEngine, DistractorError
+from models.distractor_ranker import DistractorRanker
+from models.metrics import get_shared_metrics, QUIZ_STAGE_DURATION
+from models.profiling import profiled
+
+MAX_CURRENT_ARTIST_ATTEMPTS = 5  # random mode artists tried before giving up on a question
+
+
+class QuizGenerationError(RuntimeError):
+    """
+    Raised when a quiz question cannot be generated, e.g. because MusicBrainz is unavailable.
+    """
+
+
+class QuizTimeoutError(QuizGenerationError, TimeoutError):
+    """
+    Raised when quiz generation runs past its deadline.
+    """
+
+
+async def with_deadline(coroutine, timeout: float):
+    """
+    Await a coroutine, cancelling it if it runs past the deadline.
+
+    Parameters:
+    - coroutine (coroutine): The coroutine to await.
+    - timeout (float): Seconds allowed. None waits forever.
+
+    Returns:
+    - object: The coroutine's result.
+
+    Raises:
+    - QuizTimeoutError: If the deadline passes first.
+    """
+    if timeout is None:
+        return await coroutine
+    try:
+        return await asyncio.wait_for(coroutine, max(0, timeout))
+    except asyncio.TimeoutError:
+        raise QuizTimeoutError(f"Quiz generation did not finish within {timeout:.1f} s. MusicBrainz may be slow or unavailable.")
+
+
+def run_sync(coroutine, timeout: float = None):
+    """
+    Run a coroutine to completion from synchronous code.
+
+    Parameters:
+    - coroutine (coroutine): The coroutine to run.
+    - timeout (float): Deadline in seconds. None waits forever.
+
+    Returns:
+    - object: The coroutine's result.
+
+    Raises:
+    - QuizTimeoutError: If the deadline passes first.
+    """
+    coroutine = with_deadline(coroutine, timeout)
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return _run_in_new_loop(coroutine)
+
+    # Already inside an event loop (e.g. called from async code): run on a helper thread
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(_run_in_new_loop, coroutine).result()
+
+
+def _run_in_new_loop(coroutine):
+    """
+    Run a coroutine on a new event loop, like asyncio.run, but without waiting for blocking lookups
+    still running in worker threads once the coroutine has finished or timed out.
+
+    Parameters:
+    - coroutine (coroutine): The coroutine to run.
+
+    Returns:
+    - object: The coroutine's result.
+    """
+    loop = asyncio.new_event_loop()
+    executor = ThreadPoolExecutor()
+    loop.set_default_executor(executor)
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        pending = asyncio.all_tasks(loop)
+        for task in pending:
+            task.cancel()
+        if pending:
+            loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+        # Late lookups finish in the background; their results still land in the cache
+        executor.shutdown(wait=False)
+        loop.close()
 
 
 class ArtistQuiz:
     """
     This ArtistQuiz class represents a controller for generating quiz questions.
 
+    The async methods do the work and run independent lookups concurrently; the synchronous methods are thin wrappers around them.
+
     Attributes:
     - BASE_URL (str): The base URL for MusicBrainz API.
+    - artist_info (ArtistInfo): The injected controller used for every MusicBrainz lookup.
+    - distractor_engine (DistractorEngine): The bounded selector of false artists.
+    - distractor_ranker (DistractorRanker): Picks the false options among the false artists' works.
+    - metrics (MetricsRegistry): The registry the time spent in each generation stage is recorded in.
+    - rng (random.Random): The random number generator used when a method is not given one.
 
     Methods:
-    - __init__(self, base_url=BASE_URL): Constructor method.
+    - __init__(self, base_url=BASE_URL, artist_info=None, metrics=None, ranker=None, rng=None): Constructor method.
     - generate_false_answers(self, current_artist): Generate false answers for a quiz question.
-    - get_remaining_artists(self, current_artist: str): Get a list of artists that doesn't contain the current artist.
-    - choose_false_artists(self, remaining_artists, k=2): Choose a specified number of false artists from the remaining artists.
     - get_false_artists_works(self, false_artists): Get works for each false artist.
-    - generate_question_random_mode(self): Generate a quiz question in random mode.
-    - generate_question_personal_mode(self, current_artist): Generate a quiz question in personal mode.
+    - generate_question_random_mode(self, timeout=None, rng=None): Generate a quiz question in random mode.
+    - generate_question_personal_mode(self, current_artist, current_artist_works=None, timeout=None, rng=None): Generate a quiz question in personal mode.
+    - generate_quiz_random_mode(self, num_questions=3, timeout=None, rng=None): Generate a whole random mode quiz.
+    - generate_false_answers_async, get_false_artists_works_async, generate_question_random_mode_async,
+      generate_question_personal_mode_async, generate_quiz_random_mode_async: Async versions of the methods above.
     - __eq__(self, other): Compares two ArtistQuiz instances for equality.
     - __str__(self): Returns a string representation of the ArtistQuiz instance.
     """
 
     BASE_URL = 'https://beta.musicbrainz.org/ws/2/'
 
-    def __init__(self, base_url=BASE_URL):
+    def __init__(self, base_url=BASE_URL, artist_info=None, metrics=None, ranker=None, rng=None):
         """
         Constructor method.
 
         Parameters:
         - base_url (str): The base URL for MusicBrainz API.
+        - artist_info (ArtistInfo): The controller to fetch data with. Defaults to one on the shared pooled session.
+        - metrics (MetricsRegistry): Registry to record stage timings in. Defaults to the process-wide registry.
+        - ranker (DistractorRanker): Picks the false options. Defaults to one with the default similarity band.
+        - rng (random.Random): Random number generator used when a method is not given one. Defaults to the random module.
         """
         self.base_url = base_url
+        self.artist_info = artist_info if artist_info is not None else ArtistInfo(base_url)
+        self.metrics = metrics if metrics is not None else get_shared_metrics()
+        self.rng = rng if rng is not None else random
+        self.distractor_engine = DistractorEngine(self.artist_info, candidates=self.artist_info.catalog, rng=self.rng, metrics=self.metrics)
+        self.distractor_ranker = ranker if ranker is not None else DistractorRanker()
 
     def generate_false_answers(self, current_artist: str):
         """
@@ -53,45 +163,39 @@ class ArtistQuiz:
         Returns:
         - list: List of false answers.
         """
-        remaining_artists = self.get_remaining_artists(current_artist)
-        false_artists = self.choose_false_artists(remaining_artists, k=2)
-        false_artists_works_options = self.get_false_artists_works(false_artists)
+        return run_sync(self.generate_false_answers_async(current_artist))
 
-        return false_artists_works_options
-
-    def get_remaining_artists(self, current_artist: str):
+    async def generate_false_answers_async(self, current_artist: str):
         """
-        Get a list of artists that doesn't contain the current artist.
+        Generate false answers for a quiz question, fetching the false artists concurrently.
 
         Parameters:
         - current_artist (str): The current artist for the quiz question.
 
         Returns:
-        - list: List of remaining artists.
+        - list: List of false answers.
         """
-        remaining_artists = random_mode_artists.copy()
-        # If random mode, current artist is in random_mode_artists
-        if current_artist in remaining_artists:
-            remaining_artists.remove(current_artist)
+        # Drawn straight from the catalog in O(1), without building the list of remaining artists
+        false_artists = self.artist_info.catalog.sample(2, self.rng, exclude=(current_artist,))
+        false_artists_works_options = await self.get_false_artists_works_async(false_artists)
 
-        return remaining_artists
+        return false_artists_works_options
 
-    def choose_false_artists(self, remaining_artists, k=2):
+    def get_false_artists_works(self, false_artists):
         """
-        Choose a specified number of false artists from the remaining artists.
+        Get works for each false artist.
 
         Parameters:
-        - remaining_artists (list): List of remaining artists.
-        - k (int): Number of false artists to choose.
+        - false_artists (list): List of false artists.
 
         Returns:
-        - list: List of false artists.
+        - list: List of works for false artists.
         """
-        return random.sample(remaining_artists, k)
+        return run_sync(self.get_false_artists_works_async(false_artists))
 
-    def get_false_artists_works(self, false_artists):
+    async def get_false_artists_works_async(self, false_artists):
         """
-        Get works for each false artist.
+        Get works for each false artist, looking all of them up concurrently.
 
         Parameters:
         - false_artists (list): List of false artists.
@@ -99,78 +203,245 @@ class ArtistQuiz:
         Returns:
         - list: List of works for false artists.
         """
-        artist_info = ArtistInfo()
-        false_artists_works_options = []
+        false_artists_works = await asyncio.gather(*(self._fetch_works_async(false_artist) for false_artist in false_artists))
 
-        for false_artist in false_artists:
-            false_artist_id = artist_info.fetch_artist_id(false_artist)
-            if false_artist_id is not None:
-                false_artist_works = artist_info.fetch_artist_works(false_artist_id)
-                if false_artist_works:
-                    false_work = random.choice(false_artist_works)
-                    false_artists_works_options.append(false_work)
+        false_artists_works_options = []
+        for works in false_artists_works:
+            if works:
+                false_work = self.rng.choice(works)
+                false_artists_works_options.append(false_work)
 
         return false_artists_works_options
 
-    def generate_question_random_mode(self):
+    async def _fetch_works_async(self, artist_name: str) -> list or None:
+        """
+        Resolve an artist's id and then fetch their works.
+
+        Parameters:
+        - artist_name (str): The artist's name.
+
+        Returns:
+        - list: List of the artist's works.
+        - None: If the artist or their works could not be fetched.
+        """
+        with self.metrics.time(QUIZ_STAGE_DURATION, stage="id_resolution"):
+            artist_id = await self.artist_info.fetch_artist_id_async(artist_name)
+        if artist_id is None:
+            return None
+        with self.metrics.time(QUIZ_STAGE_DURATION, stage="works_fetch"):
+            return await self.artist_info.fetch_artist_works_async(artist_id)
+
+    async def _select_distractors_async(self, current_artist: str, k: int, rng: random.Random) -> list:
+        """
+        Find the false artists with the distractor engine, timing the whole selection including its retries.
+
+        Parameters:
+        - current_artist (str): The artist the question is about.
+        - k (int): Number of false options.
+        - rng (random.Random): Random number generator.
+
+        Returns:
+        - list: The works of k false artists.
+        """
+        with self.metrics.time(QUIZ_STAGE_DURATION, stage="distractor_selection"):
+            return await self.distractor_engine.select_candidates_async(current_artist, k, rng)
+
+    def _rank_distractors(self, correct_work: str, candidate_groups: list, current_artist_works: list, rng: random.Random) -> list:
+        """
+        Pick one false option from each false artist's works with the distractor ranker,
+        leaving out versions of the correct work and the current artist's own works.
+
+        Parameters:
+        - correct_work (str): The question's correct work.
+        - candidate_groups (list): The works of each false artist.
+        - current_artist_works (list): The current artist's works.
+        - rng (random.Random): Random number generator.
+
+        Returns:
+        - list: The false options, one per false artist, all different from each other and from the correct work.
+
+        Raises:
+        - DistractorError: If a false artist has no work left that can be a false option.
+        """
+        with self.metrics.time(QUIZ_STAGE_DURATION, stage="distractor_ranking"):
+            false_works = self.distractor_ranker.pick(correct_work, candidate_groups, rng, exclude=current_artist_works)
+        if len(set(false_works)) != len(candidate_groups) or correct_work in false_works:
+            raise DistractorError(f"Only {len(set(false_works) - {correct_work})} of {len(candidate_groups)} "
+                                  f"false options differ from each other and from \"{correct_work}\"")
+        return false_works
+
+    @profiled("artist_quiz.generate_question_random_mode")
+    def generate_question_random_mode(self, timeout: float = None, rng: random.Random = None):
         """
         Generate a quiz question in random mode.
 
+        Parameters:
+        - timeout (float): Deadline in seconds. None waits forever.
+        - rng (random.Random): Random number generator. Defaults to the quiz's.
+
         Returns:
         - list: List containing current artist, options, and correct work for the question.
         """
-        artist_info = ArtistInfo()
-        current_artist_works = None
+        return run_sync(self.generate_question_random_mode_async(rng), timeout)
+
+    async def generate_question_random_mode_async(self, rng: random.Random = None):
+        """
+        Generate a quiz question in random mode.
 
-        # Generate correct work
-        while not current_artist_works:
-            current_artist = artist_info.choose_current_artist()
-            current_artist_id = artist_info.fetch_artist_id(current_artist)
-            current_artist_works = artist_info.fetch_artist_works(current_artist_id)
+        The correct artist's lookup runs at the same time as the false artists' lookups.
+        Every random draw comes from rng, so the same generator state gives the same question for the same data.
 
-        correct_work = random.choice(current_artist_works)
+        Parameters:
+        - rng (random.Random): Random number generator. Defaults to the quiz's.
+
+        Returns:
+        - list: List containing current artist, options, and correct work for the question.
 
-        # Generate false works
-        false_works = []
-        # Ensure two false options
-        while len(false_works) < 2:
-            false_works = self.generate_false_answers(current_artist)
+        Raises:
+        - QuizGenerationError: If no artist with works is found within MAX_CURRENT_ARTIST_ATTEMPTS tries.
+        - DistractorError: If not enough false options are found within the distractor budget, or they would repeat an option.
+        """
+        with self.metrics.time(QUIZ_STAGE_DURATION, stage="question_random_mode"):
+            return await self._generate_question_random_mode_async(rng if rng is not None else self.rng)
+
+    async def _generate_question_random_mode_async(self, rng: random.Random):
+        current_artist_works = None
+        candidate_groups = None
+
+        # Generate correct work and false works together, trying a bounded number of artists
+        for _ in range(MAX_CURRENT_ARTIST_ATTEMPTS):
+            current_artist = self.artist_info.choose_current_artist(rng)
+            if self.distractor_engine.has_no_works(current_artist):
+                continue
+            if candidate_groups is None:
+                current_artist_works, candidate_groups = await asyncio.gather(
+                    self._fetch_works_async(current_artist),
+                    self._select_distractors_async(current_artist, 2, rng),
+                )
+            else:
+                # The false artists found on an earlier try are kept; only the new artist is looked up
+                current_artist_works = await self._fetch_works_async(current_artist)
+                if current_artist_works and current_artist_works in candidate_groups:
+                    # The new artist is one of the false artists
+                    candidate_groups = await self._select_distractors_async(current_artist, 2, rng)
+            if current_artist_works:
+                break
+        else:
+            raise QuizGenerationError(self._unavailable_message("No random mode artist with works could be fetched"))
+
+        correct_work = rng.choice(current_artist_works)
+        false_works = self._rank_distractors(correct_work, candidate_groups, current_artist_works, rng)
 
         # Genrate three options
         options = [correct_work] + false_works
-        random.shuffle(options)
+        rng.shuffle(options)
 
         return [current_artist, options, correct_work]
 
-    def generate_question_personal_mode(self, current_artist: str):
+    @profiled("artist_quiz.generate_question_personal_mode")
+    def generate_question_personal_mode(self, current_artist: str, current_artist_works: list = None, timeout: float = None,
+                                        rng: random.Random = None):
         """
         Generate a quiz question in personal mode.
 
         Parameters:
         - current_artist (str): The current artist for the quiz question.
+        - current_artist_works (list): The current artist's works if already fetched, so they are not fetched again.
+        - timeout (float): Deadline in seconds. None waits forever.
+        - rng (random.Random): Random number generator. Defaults to the quiz's.
 
         Returns:
         - list: List containing options and correct work for the question.
         """
-        artist_info = ArtistInfo()
+        return run_sync(self.generate_question_personal_mode_async(current_artist, current_artist_works, rng), timeout)
 
-        # In personal mode, the current artist is provided as parameter
-        # Generate correct option
-        current_artist_id = artist_info.fetch_artist_id(current_artist)
-        current_artist_works = artist_info.fetch_artist_works(current_artist_id)
-        correct_work = random.choice(current_artist_works)
+    async def generate_question_personal_mode_async(self, current_artist: str, current_artist_works: list = None, rng: random.Random = None):
+        """
+        Generate a quiz question in personal mode.
 
-        # Generate 2 false options
-        false_works = []
-        while len(false_works) < 2:
-            false_works = self.generate_false_answers(current_artist)
+        The current artist's lookup (skipped if the works are given) runs at the same time as the false artists' lookups.
+
+        Parameters:
+        - current_artist (str): The current artist for the quiz question.
+        - current_artist_works (list): The current artist's works if already fetched.
+        - rng (random.Random): Random number generator. Defaults to the quiz's.
+
+        Returns:
+        - list: List containing options and correct work for the question.
+        """
+        with self.metrics.time(QUIZ_STAGE_DURATION, stage="question_personal_mode"):
+            return await self._generate_question_personal_mode_async(current_artist, current_artist_works, rng if rng is not None else self.rng)
+
+    async def _generate_question_personal_mode_async(self, current_artist: str, current_artist_works: list, rng: random.Random):
+        # In personal mode, the current artist is provided as parameter
+        # Two false options, within the distractor engine's attempt and time budget
+        if current_artist_works:
+            candidate_groups = await self._select_distractors_async(current_artist, 2, rng)
+        else:
+            current_artist_works, candidate_groups = await asyncio.gather(
+                self._fetch_works_async(current_artist),
+                self._select_distractors_async(current_artist, 2, rng),
+            )
+        if not current_artist_works:
+            raise QuizGenerationError(self._unavailable_message(f"No works could be fetched for {current_artist}"))
+        correct_work = rng.choice(current_artist_works)
+        false_works = self._rank_distractors(correct_work, candidate_groups, current_artist_works, rng)
 
         # Generate three options
         options = [correct_work] + false_works
-        random.shuffle(options)
+        rng.shuffle(options)
 
         return [options, correct_work]
 
+    @profiled("artist_quiz.generate_quiz_random_mode")
+    def generate_quiz_random_mode(self, num_questions: int = 3, timeout: float = None, rng: random.Random = None):
+        """
+        Generate a whole random mode quiz.
+
+        Parameters:
+        - num_questions (int): Number of questions in the quiz.
+        - timeout (float): Deadline in seconds for the whole quiz. None waits forever.
+        - rng (random.Random): Random number generator. Defaults to the quiz's.
+
+        Returns:
+        - list: List of [current artist, options, correct work] questions.
+        """
+        return run_sync(self.generate_quiz_random_mode_async(num_questions, rng), timeout)
+
+    async def generate_quiz_random_mode_async(self, num_questions: int = 3, rng: random.Random = None):
+        """
+        Generate a whole random mode quiz with every question built concurrently.
+
+        Each question gets its own generator, seeded from rng before any question starts,
+        so the order the concurrent lookups finish in does not change the quiz.
+
+        Parameters:
+        - num_questions (int): Number of questions in the quiz.
+        - rng (random.Random): Random number generator. Defaults to the quiz's.
+
+        Returns:
+        - list: List of [current artist, options, correct work] questions.
+        """
+        rng = rng if rng is not None else self.rng
+        question_rngs = [random.Random(rng.getrandbits(64)) for _ in range(num_questions)]
+        questions = await asyncio.gather(*(self.generate_question_random_mode_async(question_rng) for question_rng in question_rngs))
+        return list(questions)
+
+    def _unavailable_message(self, message: str) -> str:
+        """
+        Add the circuit breaker's state to an error message, so outages are reported clearly.
+
+        Parameters:
+        - message (str): The base message.
+
+        Returns:
+        - str: The message, mentioning when MusicBrainz is known to be unavailable.
+        """
+        circuit_breaker = getattr(self.artist_info, "circuit_breaker", None)
+        if circuit_breaker is not None and circuit_breaker.retry_after() > 0:
+            return f"{message}: MusicBrainz is unavailable, please try again in {circuit_breaker.retry_after():.0f} s."
+        return f"{message}."
+
     def __eq__(self, other):
         """
         Compares two ArtistQuiz instances for equality.
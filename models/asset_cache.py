@@ -0,0 +1,323 @@
+"""
+Yue Yu
+CS 5001, Fall 2023
+Final Project -- models.asset_cache
+
+This program contains a content-addressed cache for static web assets such as the Lottie animations.
+Assets are looked up in memory, then in the on-disk cache; anything missing is downloaded in the background
+so a page never waits on it.
+
+The page animations can be downloaded ahead of time (e.g. when building a deployment) with: python -m models.asset_cache
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+DEFAULT_ASSET_CACHE_DIR = os.environ.get("MUSICMUSTARD_ASSET_CACHE_DIR", os.path.join(".cache", "assets"))
+ASSET_TIMEOUT = (3.05, 5)  # (connect, read) seconds
+RETRY_INTERVAL = 5 * 60  # seconds before a failed download is tried again
+INDEX_FILE = "index.json"
+
+# The animations shown on the home, quiz and result pages
+PAGE_LOTTIE_URLS = (
+    "https://lottie.host/f3a74b44-f2c7-41da-8171-8f716f1ce0c0/JKhG2YIzuU.json",
+    "https://lottie.host/b83a5bf4-8424-4a66-8597-8191627d4c5c/8BiLp5fksW.json",
+    "https://lottie.host/89fc8e61-60dc-4a50-ae62-a63c182c6e86/r2frCUxYuE.json",
+)
+
+_shared_asset_cache = None
+_shared_asset_cache_lock = threading.Lock()
+
+
+class AssetStore:
+    """
+    This AssetStore class represents a content-addressed directory of JSON assets.
+
+    Each asset is stored as <sha256 of its bytes>.json, and index.json maps source URLs to digests,
+    so an asset referenced by several URLs is stored once and corrupt files are detected on read.
+
+    Attributes:
+    - directory (str): The directory holding the index and the asset files.
+
+    Methods:
+    - digest(self, url) -> str or None: The digest stored for a URL.
+    - read(self, url) -> dict or None: Read and verify the asset stored for a URL.
+    - write(self, url, content) -> str: Store an asset's raw bytes for a URL.
+    """
+
+    def __init__(self, directory: str):
+        """
+        Constructor method.
+
+        Parameters:
+        - directory (str): The directory holding the index and the asset files.
+        """
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._index = self._load_index()
+
+    def _load_index(self) -> dict:
+        try:
+            with open(os.path.join(self.directory, INDEX_FILE), encoding="utf-8") as index_file:
+                return json.load(index_file)
+        except (OSError, ValueError):
+            return {}
+
+    def digest(self, url: str) -> str or None:
+        """
+        The digest stored for a URL.
+
+        Parameters:
+        - url (str): The asset's source URL.
+
+        Returns:
+        - str: The sha256 hex digest, or None if the URL is not stored.
+        """
+        with self._lock:
+            return self._index.get(url)
+
+    def read(self, url: str) -> dict or None:
+        """
+        Read the asset stored for a URL, checking its bytes against the digest.
+
+        Parameters:
+        - url (str): The asset's source URL.
+
+        Returns:
+        - dict: The parsed asset.
+        - None: If the asset is not stored, or the file is missing or corrupt.
+        """
+        digest = self.digest(url)
+        if digest is None:
+            return None
+        try:
+            with open(os.path.join(self.directory, f"{digest}.json"), "rb") as asset_file:
+                content = asset_file.read()
+            if hashlib.sha256(content).hexdigest() != digest:
+                return None
+            return json.loads(content)
+        except (OSError, ValueError):
+            return None
+
+    def write(self, url: str, content: bytes) -> str:
+        """
+        Store an asset's raw bytes for a URL. Files are replaced atomically.
+
+        Parameters:
+        - url (str): The asset's source URL.
+        - content (bytes): The raw JSON bytes.
+
+        Returns:
+        - str: The asset's sha256 hex digest.
+        """
+        digest = hashlib.sha256(content).hexdigest()
+        os.makedirs(self.directory, exist_ok=True)
+        _atomic_write(os.path.join(self.directory, f"{digest}.json"), content)
+        with self._lock:
+            self._index[url] = digest
+            index = json.dumps(self._index, indent=2, sort_keys=True).encode("utf-8")
+            _atomic_write(os.path.join(self.directory, INDEX_FILE), index)
+        return digest
+
+
+def _atomic_write(path: str, content: bytes):
+    """
+    Write a file through a temporary file and os.replace, so readers never see a partial file.
+
+    Parameters:
+    - path (str): The destination path.
+    - content (bytes): The bytes to write.
+    """
+    temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temp_path, "wb") as temp_file:
+        temp_file.write(content)
+    os.replace(temp_path, path)
+
+
+class AssetCache:
+    """
+    This AssetCache class represents a memory + disk cache of JSON assets with background downloads.
+
+    get() never touches the network, so page reruns make no outbound HTTP calls; load() starts a
+    download only when an asset is in neither tier, and at most once per RETRY_INTERVAL after a failure.
+
+    Attributes:
+    - disk (AssetStore): The on-disk cache of downloaded assets.
+    - session (requests.Session): The session used for downloads.
+    - timeout (tuple): The (connect, read) timeout for downloads.
+    - retry_interval (float): Seconds before a failed download is tried again.
+
+    Methods:
+    - get(self, url) -> dict or None: Look up an asset without touching the network.
+    - load(self, url) -> Future: Get an asset, downloading it in the background if needed.
+    - fetch(self, url) -> dict or None: Download an asset now and store it.
+    - stats(self) -> dict: Return cache counters.
+    """
+
+    def __init__(self, directory: str = DEFAULT_ASSET_CACHE_DIR, session=None, timeout: tuple = ASSET_TIMEOUT, retry_interval: float = RETRY_INTERVAL):
+        """
+        Constructor method.
+
+        Parameters:
+        - directory (str): The on-disk cache directory.
+        - session (requests.Session): The session used for downloads. Defaults to the shared pooled session.
+        - timeout (tuple): The (connect, read) timeout for downloads.
+        - retry_interval (float): Seconds before a failed download is tried again.
+        """
+        self.disk = AssetStore(directory)
+        self._session = session
+        self.timeout = timeout
+        self.retry_interval = retry_interval
+        self._memory = {}  # url -> asset
+        self._pending = {}  # url -> Future of a running download
+        self._failed_at = {}  # url -> time of the last failed download
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="asset-cache")
+        self._downloads = 0
+        self._failures = 0
+
+    @property
+    def session(self):
+        """
+        The session used for downloads, created on the first download so that pages which only read
+        cached assets never import requests.
+
+        Returns:
+        - requests.Session: The session.
+        """
+        if self._session is None:
+            from models.http_session import get_shared_session
+            self._session = get_shared_session()
+        return self._session
+
+    def get(self, url: str) -> dict or None:
+        """
+        Look up an asset in memory and the disk cache, without touching the network.
+
+        Parameters:
+        - url (str): The asset's source URL.
+
+        Returns:
+        - dict: The asset.
+        - None: If it has not been downloaded yet.
+        """
+        with self._lock:
+            if url in self._memory:
+                return self._memory[url]
+
+        asset = self.disk.read(url)
+        if asset is not None:
+            with self._lock:
+                self._memory[url] = asset
+        return asset
+
+    def load(self, url: str) -> Future:
+        """
+        Get an asset, downloading it in the background if neither tier has it.
+
+        Concurrent calls for the same URL share one download.
+
+        Parameters:
+        - url (str): The asset's source URL.
+
+        Returns:
+        - Future: Resolves to the asset, or None if it cannot be downloaded.
+        """
+        asset = self.get(url)
+        with self._lock:
+            if asset is None and url in self._pending:
+                return self._pending[url]
+            if asset is None and time.monotonic() - self._failed_at.get(url, -self.retry_interval) >= self.retry_interval:
+                future = self._executor.submit(self._download, url)
+                self._pending[url] = future
+                return future
+
+        future = Future()
+        future.set_result(asset)
+        return future
+
+    def _download(self, url: str) -> dict or None:
+        try:
+            return self.fetch(url)
+        finally:
+            with self._lock:
+                self._pending.pop(url, None)
+
+    def fetch(self, url: str) -> dict or None:
+        """
+        Download an asset now and store it in memory and on disk.
+
+        Parameters:
+        - url (str): The asset's source URL.
+
+        Returns:
+        - dict: The asset.
+        - None: If the download failed or the response is not JSON.
+        """
+        with self._lock:
+            self._downloads += 1
+        try:
+            response = self.session.get(url, timeout=self.timeout)
+            response.raise_for_status()
+            content = response.content
+            asset = json.loads(content)
+            self.disk.write(url, content)
+        except Exception:
+            with self._lock:
+                self._failures += 1
+                self._failed_at[url] = time.monotonic()
+            return None
+
+        with self._lock:
+            self._memory[url] = asset
+            self._failed_at.pop(url, None)
+        return asset
+
+    def stats(self) -> dict:
+        """
+        Return the cache counters.
+
+        Returns:
+        - dict: Assets in memory, downloads in progress, downloads and failed downloads.
+        """
+        with self._lock:
+            return {"memory": len(self._memory), "pending": len(self._pending),
+                    "downloads": self._downloads, "failures": self._failures}
+
+
+def get_shared_asset_cache() -> AssetCache:
+    """
+    Get the process-wide asset cache, creating it on first use.
+
+    Returns:
+    - AssetCache: The shared asset cache.
+    """
+    global _shared_asset_cache
+    with _shared_asset_cache_lock:
+        if _shared_asset_cache is None:
+            _shared_asset_cache = AssetCache()
+        return _shared_asset_cache
+
+
+def main():
+    """
+    Command-line entry point that downloads assets into the on-disk cache.
+    """
+    parser = argparse.ArgumentParser(description="Download assets into the on-disk asset cache.")
+    parser.add_argument("urls", nargs="*", default=list(PAGE_LOTTIE_URLS), help="asset URLs (default: the page animations)")
+    parser.add_argument("--output", default=DEFAULT_ASSET_CACHE_DIR, help="the asset cache directory")
+    args = parser.parse_args()
+
+    asset_cache = AssetCache(directory=args.output)
+    for url in args.urls:
+        status = "ok" if asset_cache.fetch(url) is not None else "FAILED"
+        print(f"{status} {url} -> {asset_cache.disk.digest(url)}")
+
+
+if __name__ == "__main__":
+    main()
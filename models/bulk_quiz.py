@@ -0,0 +1,255 @@
+"""
+Yue Yu
+CS 5001, Fall 2023
+Final Project -- models.bulk_quiz
+
+This program generates large numbers of random mode quizzes offline, e.g. for load tests, for pre-seeding
+question caches and for checking the answers for bias.
+
+Every quiz is built by ArtistQuiz from the offline question bank, so no request is sent to MusicBrainz.
+The quizzes are spread over a process pool in chunks and streamed to a JSON Lines file in order, one quiz per line,
+so memory use does not grow with the number of quizzes. Quiz i is generated from its own seed, derived from the
+run's seed and i, so a run is reproducible and its output does not depend on the number of processes.
+
+Usage: python -m models.bulk_quiz --count 100000 --seed 42 --output quizzes.jsonl
+"""
+
+import argparse
+import asyncio
+import collections
+import hashlib
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from models.artist_catalog import ArtistCatalog, CatalogEntry, read_catalog, DEFAULT_CATALOG_PATH
+from models.question_bank import QuestionBank, DEFAULT_BANK_PATH
+
+DEFAULT_CHUNK_SIZE = 500  # quizzes per task sent to a worker process
+QUESTIONS_PER_QUIZ = 3
+
+_worker_quiz = None  # the ArtistQuiz of the current worker process
+
+
+def quiz_seed(seed: int, index: int) -> int:
+    """
+    Derive the seed of one quiz from the run's seed, the same on every platform and Python version.
+
+    Parameters:
+    - seed (int): The run's seed.
+    - index (int): The quiz's position in the run.
+
+    Returns:
+    - int: A 64-bit seed.
+    """
+    digest = hashlib.blake2b(f"{seed}:{index}".encode("ascii"), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+def offline_artist_quiz(bank: QuestionBank, catalog_path: str = DEFAULT_CATALOG_PATH):
+    """
+    Build an ArtistQuiz that answers every lookup from the question bank.
+
+    The bank's artists with works become the catalog, keeping their weights and tags from the catalog file,
+    their works are loaded into a memory-only cache that never expires, and any other request is refused.
+
+    Parameters:
+    - bank (QuestionBank): The opened question bank.
+    - catalog_path (str): The catalog file to take the artists' weights and tags from, if it exists.
+
+    Returns:
+    - ArtistQuiz: The offline quiz generator.
+
+    Raises:
+    - ValueError: If fewer than three artists in the bank have works.
+    """
+    # Imported here so reading a bank does not pull in the HTTP stack
+    from models.artist_cache import LRUCache, TwoTierCache
+    from models.artist_info import ArtistInfo
+    from models.artist_quiz import ArtistQuiz
+    from models.metrics import MetricsRegistry
+    from models.transport import FakeTransport
+
+    try:
+        known = {entry.name: entry for entry in read_catalog(catalog_path)}
+    except OSError:
+        known = {}
+
+    entries = []
+    cache = TwoTierCache(memory=LRUCache(maxsize=bank.artist_count + 1, default_ttl=float("inf")))
+    for index in range(bank.artist_count):
+        mbid = bank.artist_id(index)
+        if mbid is None or bank.artist_works_count(index) == 0:
+            continue
+        name = bank.artist_name(index)
+        entry = known.get(name)
+        entries.append(CatalogEntry(name, mbid, entry.weight if entry else 1, entry.tags if entry else ()))
+        cache.set(f"artist_works:{mbid}", bank.artist_works(index))
+    if len(entries) < QUESTIONS_PER_QUIZ:
+        raise ValueError("The question bank needs at least three artists with works")
+
+    metrics = MetricsRegistry()
+    artist_info = ArtistInfo(cache=cache, transport=FakeTransport(), catalog=ArtistCatalog(entries), metrics=metrics)
+    return ArtistQuiz(artist_info=artist_info, metrics=metrics)
+
+
+def _init_worker(bank_path: str, catalog_path: str):
+    """
+    Set up the ArtistQuiz of a worker process.
+
+    Parameters:
+    - bank_path (str): The question bank file.
+    - catalog_path (str): The catalog file to take weights and tags from.
+    """
+    global _worker_quiz
+    _worker_quiz = offline_artist_quiz(QuestionBank(bank_path), catalog_path)
+
+
+async def _generate_chunk_async(artist_quiz, seed: int, start: int, count: int, num_questions: int) -> tuple:
+    """
+    Generate quizzes start to start + count - 1, one after another on one event loop.
+
+    Returns:
+    - tuple: (JSON lines, {"errors": int, "answer_positions": Counter, "artists": Counter})
+    """
+    # Imported here, like the ArtistQuiz it goes with
+    from models.artist_quiz import QuizGenerationError
+    from models.distractor_engine import DistractorError
+
+    lines = []
+    tally = {"errors": 0, "answer_positions": collections.Counter(), "artists": collections.Counter()}
+    for index in range(start, start + count):
+        seed_of_quiz = quiz_seed(seed, index)
+        record = {"index": index, "seed": seed_of_quiz}
+        try:
+            questions = await artist_quiz.generate_quiz_random_mode_async(num_questions, random.Random(seed_of_quiz))
+        except (QuizGenerationError, DistractorError) as error:
+            record["error"] = str(error)
+            tally["errors"] += 1
+        else:
+            record["questions"] = [{"artist": artist, "options": options, "correct_answer": correct_answer}
+                                   for artist, options, correct_answer in questions]
+            for artist, options, correct_answer in questions:
+                tally["answer_positions"][options.index(correct_answer)] += 1
+                tally["artists"][artist] += 1
+        lines.append(json.dumps(record, ensure_ascii=False))
+    return lines, tally
+
+
+def generate_chunk(seed: int, start: int, count: int, num_questions: int = QUESTIONS_PER_QUIZ) -> tuple:
+    """
+    Generate one chunk of quizzes with the worker process's ArtistQuiz.
+
+    Parameters:
+    - seed (int): The run's seed.
+    - start (int): Index of the first quiz.
+    - count (int): Number of quizzes.
+    - num_questions (int): Questions per quiz.
+
+    Returns:
+    - tuple: (JSON lines, tally), see _generate_chunk_async.
+    """
+    return asyncio.run(_generate_chunk_async(_worker_quiz, seed, start, count, num_questions))
+
+
+def generate_quizzes(output_file, count: int, seed: int, workers: int = None, bank_path: str = DEFAULT_BANK_PATH,
+                     catalog_path: str = DEFAULT_CATALOG_PATH, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                     num_questions: int = QUESTIONS_PER_QUIZ) -> dict:
+    """
+    Generate quizzes over a process pool and write them to a file as JSON Lines, in order.
+
+    At most two chunks per worker are in flight, so memory use stays flat however many quizzes are generated.
+
+    Parameters:
+    - output_file (file): Text file to write the quizzes to.
+    - count (int): Number of quizzes.
+    - seed (int): The run's seed.
+    - workers (int): Number of worker processes. Defaults to the number of CPUs; 1 generates in this process.
+    - bank_path (str): The question bank file.
+    - catalog_path (str): The catalog file to take the artists' weights and tags from.
+    - chunk_size (int): Quizzes per task.
+    - num_questions (int): Questions per quiz.
+
+    Returns:
+    - dict: Summary of the run: counts, speed, snapshot version and how often each answer position and artist came up.
+    """
+    workers = workers or os.cpu_count() or 1
+    chunks = [(start, min(chunk_size, count - start)) for start in range(0, count, chunk_size)]
+    errors = 0
+    answer_positions = collections.Counter()
+    artists = collections.Counter()
+
+    def write(lines: list, tally: dict):
+        nonlocal errors
+        for line in lines:
+            output_file.write(line + "\n")
+        errors += tally["errors"]
+        answer_positions.update(tally["answer_positions"])
+        artists.update(tally["artists"])
+
+    bank = QuestionBank(bank_path)
+    snapshot_version = bank.snapshot_version
+    bank.close()
+
+    started = time.perf_counter()
+    if workers == 1:
+        _init_worker(bank_path, catalog_path)
+        for start, chunk_count in chunks:
+            write(*generate_chunk(seed, start, chunk_count, num_questions))
+    else:
+        with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(bank_path, catalog_path)) as executor:
+            pending = collections.deque()
+            for start, chunk_count in chunks:
+                pending.append(executor.submit(generate_chunk, seed, start, chunk_count, num_questions))
+                if len(pending) >= 2 * workers:
+                    write(*pending.popleft().result())
+            while pending:
+                write(*pending.popleft().result())
+    elapsed = time.perf_counter() - started
+
+    questions = sum(answer_positions.values())
+    return {
+        "quizzes": count,
+        "errors": errors,
+        "seed": seed,
+        "workers": workers,
+        "snapshot_version": f"{snapshot_version:08x}",
+        "seconds": round(elapsed, 3),
+        "quizzes_per_second": round(count / elapsed, 1) if elapsed > 0 else None,
+        "answer_positions": {str(position): round(answer_positions[position] / questions, 4) for position in sorted(answer_positions)},
+        "artists": len(artists),
+        "most_common_artists": [{"artist": artist, "share": round(times / questions, 4)} for artist, times in artists.most_common(5)],
+    }
+
+
+def main():
+    """
+    Command-line entry point that generates quizzes.
+    """
+    parser = argparse.ArgumentParser(description="Generate random mode quizzes offline from the question bank.")
+    parser.add_argument("--count", type=int, default=1000, help="number of quizzes")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the run; the same seed gives the same quizzes")
+    parser.add_argument("--output", default="quizzes.jsonl", help="JSON Lines file to write, or - for standard output")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per CPU)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="quizzes per task")
+    parser.add_argument("--questions", type=int, default=QUESTIONS_PER_QUIZ, help="questions per quiz")
+    parser.add_argument("--bank", default=DEFAULT_BANK_PATH, help="question bank file")
+    parser.add_argument("--catalog", default=DEFAULT_CATALOG_PATH, help="catalog file with the artists' weights")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.bank):
+        parser.error(f"{args.bank} does not exist; build it with python -m models.question_bank --output {args.bank}")
+
+    if args.output == "-":
+        summary = generate_quizzes(sys.stdout, args.count, args.seed, args.workers, args.bank, args.catalog, args.chunk_size, args.questions)
+    else:
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            summary = generate_quizzes(output_file, args.count, args.seed, args.workers, args.bank, args.catalog, args.chunk_size,
+                                       args.questions)
+    print(json.dumps(summary, indent=2), file=sys.stderr if args.output == "-" else sys.stdout)
+
+
+if __name__ == "__main__":
+    main()
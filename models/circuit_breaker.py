@@ -0,0 +1,200 @@
+"""
+Yue Yu
+CS 5001, Fall 2023
+Final Project -- models.circuit_breaker
+
+This program contains a circuit breaker for the MusicBrainz transport.
+After repeated failures it stops sending requests for a while, so an upstream outage fails fast
+instead of tying up threads waiting on timeouts.
+"""
+
+import threading
+import time
+import requests
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_RECOVERY_TIMEOUT = 30.0  # seconds
+
+_shared_circuit_breaker = None
+_shared_circuit_breaker_lock = threading.Lock()
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """
+    Raised instead of sending a request while the circuit is open.
+    It is a ConnectionError, so callers that already handle connection errors handle it too.
+    """
+
+
+class CircuitBreaker:
+    """
+    This CircuitBreaker class represents a closed / open / half-open circuit breaker.
+
+    - closed: requests flow; consecutive failures are counted.
+    - open: requests fail immediately with CircuitOpenError until recovery_timeout has passed.
+    - half-open: one trial request is let through; success closes the circuit, failure opens it again.
+
+    Attributes:
+    - failure_threshold (int): Consecutive failures that open the circuit.
+    - recovery_timeout (float): Seconds the circuit stays open before a trial request.
+
+    Methods:
+    - call(self, func, *args, **kwargs): Call func through the breaker.
+    - state (property) -> str: The current state.
+    - retry_after(self) -> float: Seconds until the next trial request is allowed.
+    - reset(self): Close the circuit.
+    - stats(self) -> dict: Return state and counters.
+    """
+
+    def __init__(self, failure_threshold: int = DEFAULT_FAILURE_THRESHOLD, recovery_timeout: float = DEFAULT_RECOVERY_TIMEOUT):
+        """
+        Constructor method.
+
+        Parameters:
+        - failure_threshold (int): Consecutive failures that open the circuit.
+        - recovery_timeout (float): Seconds the circuit stays open before a trial request.
+        """
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._rejected = 0
+        self._times_opened = 0
+
+    @property
+    def state(self) -> str:
+        """
+        The current state, moving from open to half-open once the recovery timeout has passed.
+
+        Returns:
+        - str: "closed", "open" or "half-open".
+        """
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.recovery_timeout:
+            self._state = HALF_OPEN
+            self._trial_in_flight = False
+        return self._state
+
+    def retry_after(self) -> float:
+        """
+        Seconds until the next trial request is allowed.
+
+        Returns:
+        - float: 0 if requests are currently allowed.
+        """
+        with self._lock:
+            if self._current_state() != OPEN:
+                return 0.0
+            return max(0.0, self.recovery_timeout - (time.monotonic() - self._opened_at))
+
+    def call(self, func, *args, **kwargs):
+        """
+        Call func through the breaker.
+
+        Connection errors, timeouts and 5xx responses count as failures. Any other exception (e.g. an HTTPError
+        or a bad JSON body) says nothing about whether MusicBrainz is up, so it counts as neither; a half-open
+        trial that ends that way just lets the next request be the trial.
+
+        Parameters:
+        - func (callable): The function that sends the request.
+
+        Returns:
+        - object: Whatever func returns.
+
+        Raises:
+        - CircuitOpenError: If the circuit is open (or a half-open trial is already running).
+        """
+        self._before_call()
+        failed = None  # None: the call ended in some other exception
+        try:
+            result = func(*args, **kwargs)
+            failed = getattr(result, "status_code", 200) >= 500
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as error:
+            # Errors raised before anything was sent (e.g. SchedulerBusyError) are neutral
+            failed = None if getattr(error, "local", False) else True
+            raise
+        finally:
+            if failed:
+                self._record_failure()
+            elif failed is None:
+                self._record_neutral()
+            else:
+                self._record_success()
+        return result
+
+    def _before_call(self):
+        with self._lock:
+            state = self._current_state()
+            if state == CLOSED:
+                return
+            if state == HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return
+            self._rejected += 1
+            wait = max(0.0, self.recovery_timeout - (time.monotonic() - self._opened_at))
+        raise CircuitOpenError(f"MusicBrainz is unavailable, circuit open; retry in {wait:.0f} s")
+
+    def _record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != OPEN:
+                    self._times_opened += 1
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+                self._trial_in_flight = False
+
+    def _record_neutral(self):
+        with self._lock:
+            self._trial_in_flight = False
+
+    def _record_success(self):
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def reset(self):
+        """
+        Close the circuit and forget past failures.
+        """
+        self._record_success()
+
+    def stats(self) -> dict:
+        """
+        Return the breaker state and counters.
+
+        Returns:
+        - dict: state, consecutive_failures, rejected and times_opened.
+        """
+        with self._lock:
+            return {
+                "state": self._current_state(),
+                "consecutive_failures": self._failures,
+                "rejected": self._rejected,
+                "times_opened": self._times_opened,
+            }
+
+
+def get_shared_circuit_breaker() -> CircuitBreaker:
+    """
+    Get the process-wide circuit breaker for MusicBrainz, creating it on first use.
+
+    Returns:
+    - CircuitBreaker: The shared breaker.
+    """
+    global _shared_circuit_breaker
+    with _shared_circuit_breaker_lock:
+        if _shared_circuit_breaker is None:
+            _shared_circuit_breaker = CircuitBreaker()
+        return _shared_circuit_breaker
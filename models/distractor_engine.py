@@ -0,0 +1,244 @@
+"""
+Yue Yu
+CS 5001, Fall 2023
+Final Project -- models.distractor_engine
+
+This program contains a class DistractorEngine that picks the false options of a quiz question.
+It draws artists from a candidate pool, keeps partial results between attempts, remembers artists
+known to have no works, and stops after a fixed number of lookups or amount of time.
+"""
+
+import asyncio
+import random
+import time
+from models.artist_cache import LRUCache
+from models.artist_catalog import ArtistCatalog, get_shared_catalog
+from models.metrics import get_shared_metrics, DISTRACTOR_LOOKUPS
+
+DEFAULT_MAX_ATTEMPTS = 6  # artist lookups per question
+DEFAULT_TIME_BUDGET = 10.0  # seconds per question
+DEFAULT_NEGATIVE_TTL = 60 * 60  # seconds an artist without works is skipped
+
+
+class DistractorError(RuntimeError):
+    """
+    Raised when not enough distractors could be found within the attempt and time budget.
+    """
+
+
+class DistractorEngine:
+    """
+    This DistractorEngine class represents a bounded selector of false answers.
+
+    Attributes:
+    - artist_info (ArtistInfo): The controller to fetch data with.
+    - candidates (ArtistCatalog): The artists distractors are drawn from.
+    - max_attempts (int): Maximum artist lookups per selection.
+    - time_budget (float): Maximum seconds per selection.
+    - rng (random.Random): The random number generator used for sampling.
+    - metrics (MetricsRegistry): The registry lookups are counted in, by outcome.
+
+    Methods:
+    - select(self, current_artist, k=2, rng=None) -> list: Pick k false works.
+    - select_async(self, current_artist, k=2, rng=None) -> list: Awaitable version of select.
+    - select_candidates_async(self, current_artist, k=2, rng=None) -> list: The works of k false artists, to rank the options from.
+    - mark_no_works(self, artist): Remember that an artist has no works.
+    - has_no_works(self, artist) -> bool: Whether an artist is known to have no works.
+    - stats(self) -> dict: Return negative cache counters.
+    """
+
+    def __init__(self, artist_info, candidates: list = None, max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+                 time_budget: float = DEFAULT_TIME_BUDGET, negative_ttl: float = DEFAULT_NEGATIVE_TTL, rng: random.Random = None,
+                 metrics=None):
+        """
+        Constructor method.
+
+        Parameters:
+        - artist_info (ArtistInfo): The controller to fetch data with.
+        - candidates (ArtistCatalog or list): The artists distractors are drawn from. Defaults to the process-wide catalog.
+        - max_attempts (int): Maximum artist lookups per selection.
+        - time_budget (float): Maximum seconds per selection.
+        - negative_ttl (float): Seconds an artist without works is skipped.
+        - rng (random.Random): Random number generator. Defaults to the random module.
+        - metrics (MetricsRegistry): Registry to count lookups in. Defaults to the process-wide registry.
+        """
+        self.artist_info = artist_info
+        if candidates is None:
+            candidates = get_shared_catalog()
+        elif not isinstance(candidates, ArtistCatalog):
+            candidates = ArtistCatalog.from_names(candidates)
+        self.candidates = candidates
+        self.max_attempts = max_attempts
+        self.time_budget = time_budget
+        self.rng = rng if rng is not None else random
+        self.metrics = metrics if metrics is not None else get_shared_metrics()
+        self._no_works = LRUCache(maxsize=4096, default_ttl=negative_ttl)
+
+    def mark_no_works(self, artist: str):
+        """
+        Remember that an artist has no works, so it is skipped until the negative TTL expires.
+
+        Parameters:
+        - artist (str): The artist's name.
+        """
+        self._no_works.set(artist, True)
+
+    def has_no_works(self, artist: str) -> bool:
+        """
+        Whether an artist is known to have no works.
+
+        Parameters:
+        - artist (str): The artist's name.
+
+        Returns:
+        - bool: True if the artist is in the negative cache.
+        """
+        return self._no_works.get(artist)[0]
+
+    def select(self, current_artist: str, k: int = 2, rng: random.Random = None) -> list:
+        """
+        Pick k false works from artists other than the current artist.
+
+        Parameters:
+        - current_artist (str): The artist the question is about.
+        - k (int): Number of false works.
+        - rng (random.Random): Random number generator for this selection. Defaults to the engine's.
+
+        Returns:
+        - list: k distinct false works.
+
+        Raises:
+        - DistractorError: If the attempt or time budget runs out first.
+        """
+        return asyncio.run(self.select_async(current_artist, k, rng))
+
+    async def select_async(self, current_artist: str, k: int = 2, rng: random.Random = None) -> list:
+        """
+        Pick k false works, one at random from each of k false artists' works.
+
+        Parameters:
+        - current_artist (str): The artist the question is about.
+        - k (int): Number of false works.
+        - rng (random.Random): Random number generator for this selection. Defaults to the engine's.
+
+        Returns:
+        - list: k distinct false works.
+
+        Raises:
+        - DistractorError: If the attempt or time budget runs out first.
+        """
+        rng = rng if rng is not None else self.rng
+        false_works = []
+        for works in await self.select_candidates_async(current_artist, k, rng):
+            false_works.append(rng.choice([work for work in works if work not in false_works]))
+        return false_works
+
+    async def select_candidates_async(self, current_artist: str, k: int = 2, rng: random.Random = None) -> list:
+        """
+        Find k false artists with works, looking up several candidate artists concurrently, and return their works
+        so the false options can be ranked (see DistractorRanker).
+
+        Works found in earlier rounds are kept, so a miss only costs a lookup for the missing option.
+        An artist's works are only used if they include a title none of the artists before had, or more titles than
+        there are artists before, so one distinct false work can always be picked per artist.
+
+        Parameters:
+        - current_artist (str): The artist the question is about.
+        - k (int): Number of false artists.
+        - rng (random.Random): Random number generator for this selection. Defaults to the engine's.
+          Given the same data and negative cache, the same generator state draws the same artists.
+
+        Returns:
+        - list: k lists of works, one per false artist.
+
+        Raises:
+        - DistractorError: If the attempt or time budget runs out first.
+        """
+        rng = rng if rng is not None else self.rng
+        deadline = time.monotonic() + self.time_budget
+        drawn = {current_artist}
+
+        candidate_groups = []
+        seen_works = set()
+        attempts = 0
+        while len(candidate_groups) < k:
+            remaining_time = deadline - time.monotonic()
+            batch = self._draw_candidates(min(k - len(candidate_groups), self.max_attempts - attempts), drawn, rng)
+            if not batch or remaining_time <= 0:
+                raise DistractorError(
+                    f"Found {len(candidate_groups)} of {k} distractors for {current_artist} after {attempts} lookups"
+                )
+
+            batch_size = len(batch)
+            attempts += batch_size
+            try:
+                batch_works = await asyncio.wait_for(
+                    asyncio.gather(*(self._fetch_works_async(artist) for artist in batch)), remaining_time
+                )
+            except asyncio.TimeoutError:
+                self.metrics.inc(DISTRACTOR_LOOKUPS, batch_size, outcome="timeout")
+                raise DistractorError(f"Distractor lookups for {current_artist} exceeded {self.time_budget} s")
+
+            for artist, works in zip(batch, batch_works):
+                if works and (len(set(works)) > len(candidate_groups) or not seen_works.issuperset(works)):
+                    candidate_groups.append(list(works))
+                    seen_works.update(works)
+                    outcome = "used"
+                elif works == []:
+                    # The lookup worked but the artist has no works: skip them for a while
+                    self.mark_no_works(artist)
+                    outcome = "no_works"
+                else:
+                    outcome = "failed" if works is None else "duplicate"
+                self.metrics.inc(DISTRACTOR_LOOKUPS, outcome=outcome)
+
+        return candidate_groups
+
+    def _draw_candidates(self, count: int, drawn: set, rng: random.Random) -> list:
+        """
+        Draw up to count artists from the catalog that have not been drawn yet and are not known to have no works.
+        Each draw is O(1), so the cost does not grow with the size of the catalog.
+
+        Parameters:
+        - count (int): Number of artists wanted.
+        - drawn (set): Artists already drawn, including the current artist; updated with every artist drawn.
+        - rng (random.Random): Random number generator.
+
+        Returns:
+        - list: The artists to look up, fewer than count if the catalog runs out.
+        """
+        batch = []
+        while len(batch) < count:
+            available = len(self.candidates) - sum(artist in self.candidates for artist in drawn)
+            if available <= 0:
+                break
+            for artist in self.candidates.sample(min(count - len(batch), available), rng, exclude=drawn):
+                drawn.add(artist)
+                if not self.has_no_works(artist):
+                    batch.append(artist)
+        return batch
+
+    async def _fetch_works_async(self, artist_name: str) -> list or None:
+        """
+        Resolve an artist's id and then fetch their works.
+
+        Parameters:
+        - artist_name (str): The artist's name.
+
+        Returns:
+        - list: List of the artist's works.
+        - None: If the artist is unknown or the lookup failed.
+        """
+        artist_id = await self.artist_info.fetch_artist_id_async(artist_name)
+        if artist_id is None:
+            return None
+        return await self.artist_info.fetch_artist_works_async(artist_id)
+
+    def stats(self) -> dict:
+        """
+        Return the negative cache counters.
+
+        Returns:
+        - dict: Negative cache hits, misses and size.
+        """
+        return self._no_works.stats()
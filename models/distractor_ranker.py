@@ -0,0 +1,255 @@
+"""
+Yue Yu
+CS 5001, Fall 2023
+Final Project -- models.distractor_ranker
+
+This program contains a class DistractorRanker that chooses which of the false artists' works become the false options.
+
+Every candidate title is turned into a hashed character n-gram vector in one NumPy batch and scored against the
+correct work by cosine similarity. Near-duplicates of the correct work (e.g. "Wonderwall (Live)" for "Wonderwall")
+are dropped, and titles in a similarity band are preferred, so options are neither giveaways nor trivially easy.
+"""
+
+import random
+import re
+import unicodedata
+import numpy as np
+
+NGRAM_SIZE = 3
+HASH_DIMENSIONS = 1 << 18
+NEAR_DUPLICATE_SIMILARITY = 0.7  # at or above this, a title is a version of the correct work
+SIMILARITY_BAND = (0.1, 0.6)  # preferred similarity to the correct work
+_HASH_MULTIPLIER = np.uint32(1000003)
+_SEPARATOR = "\x1f"
+# Version qualifiers such as "(live)", "[demo]" or " - 2009 remaster" do not make a title different
+# (one pattern each, as a pattern starting with a literal character is much faster to search for than an alternation)
+_QUALIFIERS = (re.compile(r"\([^()\x1f]*\)"), re.compile(r"\[[^\[\]\x1f]*\]"), re.compile(r" - [^\x1f]*"))
+_COMBINING_MARKS = re.compile(r"[\u0300-\u036f]")
+_SPACE = ord(" ")
+# Word characters as in the \w regex class, looked up per code point for ASCII
+_ASCII_WORD = np.array([chr(code).isalnum() or chr(code) == "_" for code in range(128)])
+
+
+def _normalized_codes(titles: list) -> np.ndarray:
+    """
+    Normalize titles for comparison: lower case, no accents, version qualifiers or punctuation.
+    All titles are processed as one joined array of code points, so the cost does not grow with a loop over titles.
+
+    Parameters:
+    - titles (list): The titles.
+
+    Returns:
+    - np.ndarray: The code points of the normalized titles, each padded with a space on both sides, separated by \\x1f.
+    """
+    joined = _SEPARATOR.join(titles)
+    if joined.count(_SEPARATOR) != len(titles) - 1:
+        joined = _SEPARATOR.join(title.replace(_SEPARATOR, " ") for title in titles)
+    joined = joined.lower()
+    for qualifier in _QUALIFIERS:
+        joined = qualifier.sub("", joined)
+    if not joined.isascii():
+        joined = _COMBINING_MARKS.sub("", unicodedata.normalize("NFKD", joined))
+    codes = np.frombuffer(joined.encode("utf-32-le"), dtype=np.uint32)
+
+    is_word = np.zeros(len(codes), dtype=bool)
+    is_ascii = codes < 128
+    is_word[is_ascii] = _ASCII_WORD[codes[is_ascii]]
+    if not is_ascii.all():
+        others = np.unique(codes[~is_ascii])
+        word_others = others[[chr(code).isalnum() for code in others]]
+        is_word[~is_ascii] = np.isin(codes[~is_ascii], word_others)
+    is_separator = codes == ord(_SEPARATOR)
+    codes = np.where(is_word | is_separator, codes, _SPACE)
+
+    # Collapse runs of spaces and drop the spaces at the ends of each title, then pad every title with one space
+    is_space = ~(is_word | is_separator)
+    codes = codes[~(is_space & np.concatenate(([True], is_space[:-1] | is_separator[:-1])))]
+    is_space = codes == _SPACE
+    codes = codes[~(is_space & np.concatenate((codes[1:] == ord(_SEPARATOR), [True])))]
+    separators = np.flatnonzero(codes == ord(_SEPARATOR))
+    codes = np.insert(codes, np.concatenate((separators, separators + 1)), _SPACE)
+    return np.concatenate(([_SPACE], codes, [_SPACE])).astype(np.uint32)
+
+
+def normalize_titles(titles: list) -> list:
+    """
+    Normalize titles for comparison: lower case, no accents, version qualifiers or punctuation.
+
+    Parameters:
+    - titles (list): The titles.
+
+    Returns:
+    - list: The normalized titles, each padded with a space on both sides.
+    """
+    return _normalized_codes(titles).tobytes().decode("utf-32-le").split(_SEPARATOR)
+
+
+class DistractorRanker:
+    """
+    This DistractorRanker class represents a vectorized scorer and picker of false options.
+
+    Attributes:
+    - ngram_size (int): Characters per n-gram.
+    - dimensions (int): Size of the hashed n-gram space, a power of two.
+    - near_duplicate (float): Similarity at or above which a title counts as a version of the correct work.
+    - band (tuple): The (low, high) similarity to the correct work preferred for false options.
+
+    Methods:
+    - similarities(self, reference, titles) -> np.ndarray: Cosine similarity of every title to a reference title.
+    - pick(self, correct_work, candidate_groups, rng=None, exclude=()) -> list: Pick one false option per group.
+    """
+
+    def __init__(self, ngram_size: int = NGRAM_SIZE, dimensions: int = HASH_DIMENSIONS,
+                 near_duplicate: float = NEAR_DUPLICATE_SIMILARITY, band: tuple = SIMILARITY_BAND):
+        """
+        Constructor method.
+
+        Parameters:
+        - ngram_size (int): Characters per n-gram.
+        - dimensions (int): Size of the hashed n-gram space, a power of two.
+        - near_duplicate (float): Similarity at or above which a title counts as a version of the correct work.
+        - band (tuple): The (low, high) similarity preferred for false options.
+
+        Raises:
+        - ValueError: If dimensions is not a power of two.
+        """
+        if dimensions <= 0 or dimensions & (dimensions - 1):
+            raise ValueError("dimensions must be a power of two")
+        self.ngram_size = ngram_size
+        self.dimensions = dimensions
+        self.near_duplicate = near_duplicate
+        self.band = band
+
+    def _ngram_counts(self, titles: list) -> tuple:
+        """
+        Hash the character n-grams of every title in one batch.
+
+        Parameters:
+        - titles (list): The titles.
+
+        Returns:
+        - tuple: (rows, features, counts) arrays, one entry per distinct n-gram of each title.
+        """
+        codes = _normalized_codes(titles)
+        is_separator = codes == ord(_SEPARATOR)
+        separators_seen = np.cumsum(is_separator, dtype=np.int64)  # the row of the title at each position
+        windows = max(len(codes) - self.ngram_size + 1, 0)
+        # Hash the n-gram starting at every position, wrapping around in uint32; a window is kept if it stays in its title
+        hashes = np.zeros(windows, dtype=np.uint32)
+        crosses = np.zeros(windows, dtype=bool)
+        for offset in range(self.ngram_size):
+            hashes = hashes * _HASH_MULTIPLIER + codes[offset:offset + windows]
+            crosses |= is_separator[offset:offset + windows]
+
+        # Count the n-grams of each title by sorting (row, feature) keys; the dimensions are a power of two
+        feature_bits = self.dimensions.bit_length() - 1
+        keys = (separators_seen[:windows] << feature_bits) | (hashes & np.uint32(self.dimensions - 1))
+        keys = np.sort(keys[~crosses])
+        if len(keys) == 0:
+            # No title has an n-gram, e.g. every title is only a qualifier such as "[untitled]"
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0)
+        firsts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+        counts = np.diff(np.append(firsts, len(keys)))
+        keys = keys[firsts]
+        return keys >> feature_bits, keys & (self.dimensions - 1), counts.astype(np.float64)
+
+    def _cosine(self, rows: np.ndarray, features: np.ndarray, counts: np.ndarray, norms: np.ndarray, reference: int) -> np.ndarray:
+        """
+        Cosine similarity of every row's n-gram vector to one row's, from the output of _ngram_counts().
+
+        Parameters:
+        - rows, features, counts (np.ndarray): The sparse n-gram vectors.
+        - norms (np.ndarray): The norm of every row.
+        - reference (int): The row to compare with.
+
+        Returns:
+        - np.ndarray: One similarity in [0, 1] per row; 0 for rows with no n-grams.
+        """
+        # The reference's few n-grams are sorted by feature, so every other n-gram is matched by binary search
+        is_reference = rows == reference
+        reference_features, reference_counts = features[is_reference], counts[is_reference]
+        if len(reference_features) == 0:
+            return np.zeros(len(norms))
+        positions = np.minimum(np.searchsorted(reference_features, features), len(reference_features) - 1)
+        weights = np.where(reference_features[positions] == features, counts * reference_counts[positions], 0.0)
+        dots = np.bincount(rows, weights=weights, minlength=len(norms))
+        denominators = norms * norms[reference]
+        return np.divide(dots, denominators, out=np.zeros(len(norms)), where=denominators > 0)
+
+    def similarities(self, reference: str, titles: list) -> np.ndarray:
+        """
+        Cosine similarity of every title's n-gram vector to the reference title's.
+
+        Parameters:
+        - reference (str): The title to compare with, e.g. the correct work.
+        - titles (list): The candidate titles.
+
+        Returns:
+        - np.ndarray: One similarity in [0, 1] per title; 0 for titles with no n-grams.
+        """
+        if not titles:
+            return np.zeros(0)
+        rows, features, counts = self._ngram_counts([reference] + list(titles))
+        norms = np.sqrt(np.bincount(rows, weights=counts * counts, minlength=len(titles) + 1))
+        return self._cosine(rows, features, counts, norms, 0)[1:]
+
+    def pick(self, correct_work: str, candidate_groups: list, rng: random.Random = None, exclude=()) -> list:
+        """
+        Pick one false option from each group of candidate titles, e.g. one per false artist.
+
+        In each group, titles that are excluded or near-duplicates of the correct work or of an earlier pick are dropped,
+        and a random title within the similarity band is chosen. Without one, the title closest to the band is chosen,
+        and if every title is a near-duplicate, the least similar one. Excluded titles and earlier picks are never picked,
+        so a group with no other title is skipped.
+
+        Parameters:
+        - correct_work (str): The question's correct work.
+        - candidate_groups (list): Lists of candidate titles, one list per false option.
+        - rng (random.Random): Random number generator. Defaults to the random module.
+        - exclude (iterable): Titles that should not be picked, e.g. the correct artist's own works.
+
+        Returns:
+        - list: One title per group that has a title left that is neither excluded nor picked before.
+        """
+        rng = rng if rng is not None else random
+        excluded = set(exclude)
+        excluded.add(correct_work)
+        groups = []
+        for group in candidate_groups:
+            group = list(dict.fromkeys(group))
+            groups.append([title for title in group if title not in excluded])
+        titles = [title for group in groups for title in group]
+        if not titles:
+            return []
+
+        # Row 0 is the correct work and row i the i-th title; every vector is built once, in one batch
+        rows, features, counts = self._ngram_counts([correct_work] + titles)
+        norms = np.sqrt(np.bincount(rows, weights=counts * counts, minlength=len(titles) + 1))
+        scores = self._cosine(rows, features, counts, norms, 0)
+        # The highest similarity of every title to the correct work or a pick, to keep the options apart from each other too
+        closest = scores.copy()
+        low, high = self.band
+        picks = []
+        start = 1
+        for group in groups:
+            group_rows = np.arange(start, start + len(group))
+            start += len(group)
+            available = np.array([title not in picks for title in group], dtype=bool)
+            if not available.any():
+                continue
+            group_scores = scores[group_rows]
+            group_closest = np.where(available, closest[group_rows], np.inf)
+
+            usable = np.flatnonzero(group_closest < self.near_duplicate)
+            if len(usable) == 0:
+                chosen = int(np.argmin(group_closest))
+            else:
+                in_band = usable[(group_scores[usable] >= low) & (group_scores[usable] <= high)]
+                if len(in_band):
+                    chosen = int(rng.choice(in_band))
+                else:
+                    distance = np.maximum(low - group_scores[usable], group_scores[usable] - high)
+                    chosen = int(usable[np.argmin(distance)])
+            picks.append(group[chosen])
+            closest = np.maximum(closest, self._cosine(rows, features, counts, norms, int(group_rows[chosen])))
+        return picks
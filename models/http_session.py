@@ -0,0 +1,69 @@
+"""
+Yue Yu
+CS 5001, Fall 2023
+Final Project -- models.http_session
+
+This program contains the process-wide HTTP session used for every MusicBrainz call.
+Reusing one pooled session keeps TCP+TLS connections to MusicBrainz alive between requests.
+"""
+
+import os
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+
+# Can be overridden per deployment, e.g. MUSICMUSTARD_POOL_SIZE=32
+DEFAULT_POOL_SIZE = int(os.environ.get("MUSICMUSTARD_POOL_SIZE", "10"))
+# (connect timeout, read timeout) in seconds
+DEFAULT_TIMEOUT = (3.05, 10)
+USER_AGENT = "MusicMustard/1.0 ( https://github.com/claireyyu/music-mustard-quiz-app )"
+
+_shared_session = None
+_shared_session_lock = threading.Lock()
+
+
+def create_session(pool_size: int = DEFAULT_POOL_SIZE) -> requests.Session:
+    """
+    Create a requests session with keep-alive connection pooling.
+
+    Parameters:
+    - pool_size (int): Maximum number of pooled connections kept per host.
+
+    Returns:
+    - requests.Session: A new pooled session.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    # MusicBrainz asks every client to identify itself
+    session.headers.update({"User-Agent": USER_AGENT, "Accept": "application/json"})
+    return session
+
+
+def get_shared_session(pool_size: int = DEFAULT_POOL_SIZE) -> requests.Session:
+    """
+    Get the process-wide pooled session, creating it on first use.
+
+    Parameters:
+    - pool_size (int): Pool size used only when the session is first created.
+
+    Returns:
+    - requests.Session: The shared session.
+    """
+    global _shared_session
+    with _shared_session_lock:
+        if _shared_session is None:
+            _shared_session = create_session(pool_size)
+        return _shared_session
+
+
+def close_shared_session():
+    """
+    Close the process-wide session and release its pooled connections.
+    """
+    global _shared_session
+    with _shared_session_lock:
+        if _shared_session is not None:
+            _shared_session.close()
+            _shared_session = None
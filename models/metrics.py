@@ -0,0 +1,384 @@
+"""
+Yue Yu
+CS 5001, Fall 2023
+Final Project -- models.metrics
+
+This program contains the app's metrics: counters and latency histograms for every MusicBrainz call
+and every quiz generation stage, plus gauges read from the caches, pools and schedulers' stats().
+Everything is rendered in the Prometheus text format, served on a local port and shown on the admin page.
+"""
+
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_METRICS_PORT = int(os.environ.get("MUSICMUSTARD_METRICS_PORT", "9464"))  # 0 disables the endpoint
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+HTTP_REQUEST_DURATION = "musicmustard_http_request_duration_seconds"
+HTTP_RESPONSE_BYTES = "musicmustard_http_response_bytes_total"
+QUIZ_STAGE_DURATION = "musicmustard_quiz_stage_duration_seconds"
+DISTRACTOR_LOOKUPS = "musicmustard_distractor_lookups_total"
+RESULTS_QUERY_DURATION = "musicmustard_results_query_duration_seconds"
+
+METRIC_HELP = {
+    HTTP_REQUEST_DURATION: "MusicBrainz request latency by endpoint and status, including rate limiting and retries.",
+    HTTP_RESPONSE_BYTES: "MusicBrainz response bytes by endpoint and status.",
+    QUIZ_STAGE_DURATION: "Time spent in each quiz generation stage.",
+    DISTRACTOR_LOOKUPS: "Artist lookups made while picking false options, by outcome.",
+    RESULTS_QUERY_DURATION: "Time spent reading and writing quiz results, by query.",
+}
+
+_shared_metrics = None
+_shared_metrics_lock = threading.Lock()
+
+
+class Histogram:
+    """
+    This Histogram class represents a cumulative-bucket histogram, as Prometheus expects.
+
+    Attributes:
+    - buckets (tuple): Upper bounds of the buckets, in increasing order.
+    - counts (list): Observations in each bucket (not cumulative), with one extra for +Inf.
+    - total (float): Sum of all observations.
+    - count (int): Number of observations.
+
+    Methods:
+    - observe(self, value): Record an observation.
+    - cumulative_counts(self) -> list: Observations at or below each bucket bound, then the total count.
+    """
+
+    def __init__(self, buckets: tuple = LATENCY_BUCKETS):
+        """
+        Constructor method.
+
+        Parameters:
+        - buckets (tuple): Upper bounds of the buckets, in increasing order.
+        """
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        """
+        Record an observation.
+
+        Parameters:
+        - value (float): The observed value.
+        """
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def cumulative_counts(self) -> list:
+        """
+        Observations at or below each bucket bound, then the total count (the +Inf bucket).
+
+        Returns:
+        - list: The cumulative counts.
+        """
+        cumulative = []
+        running = 0
+        for count in self.counts:
+            running += count
+            cumulative.append(running)
+        return cumulative
+
+
+class MetricsRegistry:
+    """
+    This MetricsRegistry class represents a thread-safe store of counters, histograms and stats collectors.
+
+    Attributes:
+    - counters (dict): Metric name mapped to {labels: value}.
+    - histograms (dict): Metric name mapped to {labels: Histogram}.
+
+    Methods:
+    - inc(self, name, value=1, **labels): Add to a counter.
+    - observe(self, name, value, **labels): Record a histogram observation.
+    - time(self, name, **labels): Context manager that observes the time spent inside it.
+    - add_stats(self, prefix, stats): Publish a component's stats() as gauges.
+    - gauges(self) -> list: Read every stats collector.
+    - snapshot(self) -> dict: Copy every counter and histogram under the lock.
+    - summarize(self, name) -> list: Summarize a histogram's series.
+    - render(self) -> str: Render everything in the Prometheus text format.
+    """
+
+    def __init__(self):
+        """
+        Constructor method.
+        """
+        self.counters = {}
+        self.histograms = {}
+        self._collectors = {}  # prefix -> stats callable
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, value: float = 1, **labels):
+        """
+        Add to a counter.
+
+        Parameters:
+        - name (str): The metric name.
+        - value (float): The amount to add.
+        - labels (str): The metric's labels.
+        """
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self.counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        """
+        Record a histogram observation.
+
+        Parameters:
+        - name (str): The metric name.
+        - value (float): The observed value, in seconds for latencies.
+        - labels (str): The metric's labels.
+        """
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self.histograms.setdefault(name, {})
+            if key not in series:
+                series[key] = Histogram()
+            series[key].observe(value)
+
+    @contextmanager
+    def time(self, name: str, **labels):
+        """
+        Observe the wall-clock time spent inside the with block, including time spent awaiting.
+
+        Parameters:
+        - name (str): The histogram name.
+        - labels (str): The metric's labels.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def add_stats(self, prefix: str, stats):
+        """
+        Publish a component's stats() as gauges named musicmustard_<prefix>_<key>.
+
+        Numbers become gauges, nested dicts become gauges with a "group" label, and strings
+        (e.g. a circuit state) become a gauge of 1 with a "value" label. Registering a prefix again replaces it.
+
+        Parameters:
+        - prefix (str): The gauge name prefix, e.g. "cache".
+        - stats (callable): Returns the component's stats dict.
+        """
+        with self._lock:
+            self._collectors[prefix] = stats
+
+    def gauges(self) -> list:
+        """
+        Read every stats collector.
+
+        Returns:
+        - list: (name, labels, value) tuples.
+        """
+        with self._lock:
+            collectors = list(self._collectors.items())
+
+        gauges = []
+        for prefix, stats in collectors:
+            try:
+                values = stats()
+            except Exception:
+                continue
+            for key, value in values.items():
+                if isinstance(value, dict):
+                    # e.g. {"memory": {"hits": 3}} becomes musicmustard_cache_hits{group="memory"} 3
+                    gauges.extend(_gauge(f"musicmustard_{prefix}_{inner_key}", {"group": key}, inner)
+                                  for inner_key, inner in value.items())
+                else:
+                    gauges.append(_gauge(f"musicmustard_{prefix}_{key}", {}, value))
+        return [gauge for gauge in gauges if gauge is not None]
+
+    def snapshot(self) -> dict:
+        """
+        Copy every counter and histogram under the lock, so they can be read while other threads record.
+
+        Returns:
+        - dict: "counters" maps a name to {labels: value}; "histograms" maps a name to
+          {labels: (buckets, cumulative counts, total, count)}.
+        """
+        with self._lock:
+            counters = {name: dict(series) for name, series in self.counters.items()}
+            histograms = {name: {key: (list(h.buckets), h.cumulative_counts(), h.total, h.count) for key, h in series.items()}
+                          for name, series in self.histograms.items()}
+        return {"counters": counters, "histograms": histograms}
+
+    def summarize(self, name: str) -> list:
+        """
+        Summarize a histogram's series, e.g. for a table on the admin page.
+
+        Parameters:
+        - name (str): The histogram name.
+
+        Returns:
+        - list: One dict per label set, with the labels plus count, total_s and mean_ms.
+        """
+        with self._lock:
+            series = [(dict(key), histogram.count, histogram.total) for key, histogram in self.histograms.get(name, {}).items()]
+        return [dict(labels, count=count, total_s=round(total, 3), mean_ms=round(total / count * 1000, 1) if count else 0.0)
+                for labels, count, total in sorted(series, key=lambda item: -item[2])]
+
+    def render(self) -> str:
+        """
+        Render every metric in the Prometheus text exposition format.
+
+        Returns:
+        - str: The exposition text.
+        """
+        lines = []
+        snapshot = self.snapshot()
+        counters, histograms = snapshot["counters"], snapshot["histograms"]
+
+        for name in sorted(counters):
+            lines.append(f"# HELP {name} {METRIC_HELP.get(name, name)}")
+            lines.append(f"# TYPE {name} counter")
+            for key, value in sorted(counters[name].items()):
+                lines.append(f"{name}{format_labels(dict(key))} {format_value(value)}")
+
+        for name in sorted(histograms):
+            lines.append(f"# HELP {name} {METRIC_HELP.get(name, name)}")
+            lines.append(f"# TYPE {name} histogram")
+            for key, (buckets, cumulative, total, count) in sorted(histograms[name].items()):
+                labels = dict(key)
+                for bound, bucket_count in zip(list(buckets) + ["+Inf"], cumulative):
+                    lines.append(f"{name}_bucket{format_labels(dict(labels, le=str(bound)))} {bucket_count}")
+                lines.append(f"{name}_sum{format_labels(labels)} {format_value(total)}")
+                lines.append(f"{name}_count{format_labels(labels)} {count}")
+
+        described = set()
+        for name, labels, value in sorted(self.gauges(), key=lambda sample: sample[0]):
+            if name not in described:
+                lines.append(f"# TYPE {name} gauge")
+                described.add(name)
+            lines.append(f"{name}{format_labels(labels)} {format_value(value)}")
+
+        return "\n".join(lines) + "\n"
+
+
+def _gauge(name: str, labels: dict, value) -> tuple or None:
+    """
+    Turn one stats value into a gauge sample.
+
+    Parameters:
+    - name (str): The gauge name.
+    - labels (dict): The gauge's labels.
+    - value (object): A number, or a string such as a circuit state.
+
+    Returns:
+    - tuple: (name, labels, value), or None if the value is neither a number nor a string.
+    """
+    if isinstance(value, str):
+        return name, dict(labels, value=value), 1
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return name, labels, value
+    return None
+
+
+def format_labels(labels: dict) -> str:
+    """
+    Format labels as {key="value",...}, escaping the values.
+
+    Parameters:
+    - labels (dict): The labels.
+
+    Returns:
+    - str: The formatted labels, or "" if there are none.
+    """
+    if not labels:
+        return ""
+    escaped = []
+    for key, value in sorted(labels.items()):
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        escaped.append(f'{key}="{value}"')
+    return "{" + ",".join(escaped) + "}"
+
+
+def format_value(value: float) -> str:
+    """
+    Format a sample value, keeping integers free of a trailing .0.
+
+    Parameters:
+    - value (float): The value.
+
+    Returns:
+    - str: The formatted value.
+    """
+    if isinstance(value, float) and not value.is_integer():
+        return repr(value)
+    return str(int(value))
+
+
+def endpoint_of(url: str) -> str:
+    """
+    Name the MusicBrainz endpoint a URL calls, for use as a low-cardinality label.
+
+    Parameters:
+    - url (str): The request URL.
+
+    Returns:
+    - str: e.g. "artist_search", "artist_lookup" or "work_browse".
+    """
+    path = url.split("?", 1)[0]
+    segments = [segment for segment in path.split("/ws/2/", 1)[-1].split("/") if segment]
+    if not segments:
+        return "unknown"
+    resource = segments[0]
+    if len(segments) > 1:
+        return f"{resource}_lookup"
+    return f"{resource}_search" if "query=" in url else f"{resource}_browse"
+
+
+def start_metrics_server(registry: MetricsRegistry, port: int = DEFAULT_METRICS_PORT, host: str = "127.0.0.1"):
+    """
+    Serve the registry in the Prometheus text format on a local port, on a background thread.
+
+    Parameters:
+    - registry (MetricsRegistry): The registry to serve.
+    - port (int): The port. 0 picks a free one.
+    - host (str): The address to bind; local only by default.
+
+    Returns:
+    - ThreadingHTTPServer: The running server; its server_address has the actual port.
+    """
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            payload = registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    return server
+
+
+def get_shared_metrics() -> MetricsRegistry:
+    """
+    Get the process-wide metrics registry, creating it on first use.
+
+    Returns:
+    - MetricsRegistry: The shared registry.
+    """
+    global _shared_metrics
+    with _shared_metrics_lock:
+        if _shared_metrics is None:
+            _shared_metrics = MetricsRegistry()
+        return _shared_metrics
@@ -0,0 +1,278 @@
+"""
+Yue Yu
+CS 5001, Fall 2023
+Final Project -- models.profiling
+
+This program contains opt-in profiling hooks for page runs and quiz generation.
+With MUSICMUSTARD_PROFILE=1, each hooked run is profiled with cProfile and dumped to a directory,
+as a pstats file or as speedscope JSON, keeping only the newest dumps.
+
+Settings (environment variables):
+- MUSICMUSTARD_PROFILE: 1 turns profiling on.
+- MUSICMUSTARD_PROFILE_DIR: where dumps are written (default .cache/profiles).
+- MUSICMUSTARD_PROFILE_FORMAT: pstats (default) or speedscope.
+- MUSICMUSTARD_PROFILE_KEEP: how many dumps to keep (default 50).
+- MUSICMUSTARD_PROFILE_MIN_MS: only dump runs at least this slow (default 0, every run).
+"""
+
+import cProfile
+import functools
+import json
+import os
+import pstats
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+DEFAULT_PROFILE_DIR = os.path.join(".cache", "profiles")
+DEFAULT_KEEP = 50
+FORMATS = ("pstats", "speedscope")
+MAX_STACK_DEPTH = 64
+
+_shared_profiler = None
+_shared_profiler_lock = threading.Lock()
+
+
+class Profiler:
+    """
+    This Profiler class represents a switchable cProfile wrapper that dumps one profile per run.
+
+    cProfile only sees the thread it runs in, so a run that hands work to other threads
+    shows up as time spent waiting; profile the work itself (e.g. ArtistQuiz generation) to see inside it.
+    Runs nested in a profiled run on the same thread are part of the outer profile.
+
+    Attributes:
+    - enabled (bool): Whether runs are profiled.
+    - directory (str): Where dumps are written.
+    - output_format (str): "pstats" or "speedscope".
+    - keep (int): How many dumps are kept; older ones are deleted.
+    - min_duration (float): Only runs at least this many seconds long are dumped.
+
+    Methods:
+    - profile(self, label): Context manager that profiles the code inside it.
+    - dump(self, profile, label, elapsed) -> str: Write a profile and apply the retention limit.
+    """
+
+    def __init__(self, enabled: bool = False, directory: str = DEFAULT_PROFILE_DIR, output_format: str = "pstats",
+                 keep: int = DEFAULT_KEEP, min_duration: float = 0.0):
+        """
+        Constructor method.
+
+        Parameters:
+        - enabled (bool): Whether runs are profiled.
+        - directory (str): Where dumps are written.
+        - output_format (str): "pstats" or "speedscope".
+        - keep (int): How many dumps are kept.
+        - min_duration (float): Only runs at least this many seconds long are dumped.
+
+        Raises:
+        - ValueError: If output_format is not supported.
+        """
+        if output_format not in FORMATS:
+            raise ValueError(f"Unsupported profile format {output_format!r}, expected one of {FORMATS}")
+        self.enabled = enabled
+        self.directory = directory
+        self.output_format = output_format
+        self.keep = keep
+        self.min_duration = min_duration
+        self._local = threading.local()
+        self._dump_lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        """
+        Create a profiler from the MUSICMUSTARD_PROFILE* environment variables.
+
+        Returns:
+        - Profiler: The configured profiler.
+        """
+        return cls(
+            enabled=os.environ.get("MUSICMUSTARD_PROFILE", "0") == "1",
+            directory=os.environ.get("MUSICMUSTARD_PROFILE_DIR", DEFAULT_PROFILE_DIR),
+            output_format=os.environ.get("MUSICMUSTARD_PROFILE_FORMAT", "pstats"),
+            keep=int(os.environ.get("MUSICMUSTARD_PROFILE_KEEP", str(DEFAULT_KEEP))),
+            min_duration=float(os.environ.get("MUSICMUSTARD_PROFILE_MIN_MS", "0")) / 1000,
+        )
+
+    @contextmanager
+    def profile(self, label: str):
+        """
+        Profile the code inside the with block and dump it if it was slow enough.
+
+        Parameters:
+        - label (str): Names the run in the dump's file name, e.g. "quiz_page".
+        """
+        if not self.enabled or getattr(self._local, "active", False):
+            yield
+            return
+
+        profile = cProfile.Profile()
+        self._local.active = True
+        start = time.perf_counter()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            elapsed = time.perf_counter() - start
+            self._local.active = False
+            if elapsed >= self.min_duration:
+                self.dump(profile, label, elapsed)
+
+    def dump(self, profile: cProfile.Profile, label: str, elapsed: float) -> str:
+        """
+        Write a profile to the directory and delete the oldest dumps beyond the retention limit.
+
+        Parameters:
+        - profile (cProfile.Profile): The finished profile.
+        - label (str): Names the run.
+        - elapsed (float): The run's wall-clock time in seconds.
+
+        Returns:
+        - str: The path written.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        safe_label = re.sub(r"[^A-Za-z0-9_.-]+", "_", label)
+        stem = f"{time.strftime('%Y%m%d-%H%M%S')}-{time.time_ns() % 10**9:09d}-{safe_label}-{elapsed * 1000:.0f}ms"
+
+        if self.output_format == "speedscope":
+            path = os.path.join(self.directory, f"{stem}.speedscope.json")
+            with open(path, "w", encoding="utf-8") as profile_file:
+                json.dump(to_speedscope(pstats.Stats(profile), f"{label} ({elapsed * 1000:.0f} ms)"), profile_file)
+        else:
+            path = os.path.join(self.directory, f"{stem}.prof")
+            profile.dump_stats(path)
+
+        with self._dump_lock:
+            self._apply_retention()
+        return path
+
+    def _apply_retention(self):
+        dumps = [os.path.join(self.directory, name) for name in os.listdir(self.directory)
+                 if name.endswith(".prof") or name.endswith(".speedscope.json")]
+        dumps.sort(key=lambda path: (os.path.getmtime(path), path))
+        for path in dumps[:max(0, len(dumps) - self.keep)]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def profiled(self, label: str):
+        """
+        Decorator that profiles every call of a function.
+
+        Parameters:
+        - label (str): Names the runs.
+
+        Returns:
+        - callable: The decorator.
+        """
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.profile(label):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+
+def to_speedscope(stats: pstats.Stats, name: str) -> dict:
+    """
+    Convert cProfile stats to a speedscope sampled profile.
+
+    cProfile keeps caller edges but not whole stacks, so each function's own time is placed under
+    the chain of its heaviest callers. The flame graph is an approximation; the sandwich and
+    left-heavy views, which aggregate by function, are exact.
+
+    Parameters:
+    - stats (pstats.Stats): The profile statistics.
+    - name (str): The profile's name in speedscope.
+
+    Returns:
+    - dict: The speedscope JSON document.
+    """
+    frames = []
+    frame_index = {}
+
+    def index_of(function):
+        if function not in frame_index:
+            filename, line, function_name = function
+            frame_index[function] = len(frames)
+            frames.append({"name": function_name, "file": filename, "line": line})
+        return frame_index[function]
+
+    entries = stats.stats  # function -> (primitive calls, calls, own time, cumulative time, callers)
+    samples = []
+    weights = []
+    for function, (_, _, own_time, _, _) in entries.items():
+        if own_time <= 0:
+            continue
+        stack = [function]
+        seen = {function}
+        while len(stack) < MAX_STACK_DEPTH:
+            callers = entries.get(stack[-1], (0, 0, 0, 0, {}))[4]
+            candidates = [caller for caller in callers if caller not in seen]
+            if not candidates:
+                break
+            heaviest = max(candidates, key=lambda caller: callers[caller][3])  # by cumulative time through the edge
+            stack.append(heaviest)
+            seen.add(heaviest)
+        samples.append([index_of(frame) for frame in reversed(stack)])
+        weights.append(own_time)
+
+    total = sum(weights)
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "shared": {"frames": frames},
+        "profiles": [{"type": "sampled", "name": name, "unit": "seconds", "startValue": 0,
+                      "endValue": total, "samples": samples, "weights": weights}],
+        "name": name,
+        "exporter": "musicmustard",
+    }
+
+
+def get_shared_profiler() -> Profiler:
+    """
+    Get the process-wide profiler, configured from the environment on first use.
+
+    Returns:
+    - Profiler: The shared profiler.
+    """
+    global _shared_profiler
+    with _shared_profiler_lock:
+        if _shared_profiler is None:
+            _shared_profiler = Profiler.from_env()
+        return _shared_profiler
+
+
+@contextmanager
+def profile_run(label: str):
+    """
+    Profile the code inside the with block with the shared profiler, if profiling is turned on.
+
+    Parameters:
+    - label (str): Names the run.
+    """
+    with get_shared_profiler().profile(label):
+        yield
+
+
+def profiled(label: str):
+    """
+    Decorator that profiles every call of a function with the shared profiler, if profiling is turned on.
+    The profiler is looked up at call time, so the decorator can be applied at import.
+
+    Parameters:
+    - label (str): Names the runs.
+
+    Returns:
+    - callable: The decorator.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with get_shared_profiler().profile(label):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
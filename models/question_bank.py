@@ -0,0 +1,346 @@
+"""
+Yue Yu
+CS 5001, Fall 2023
+Final Project -- models.question_bank
+
+This program contains an offline question bank for random mode.
+
+The bank is a compact, versioned binary snapshot of every pool artist's MBID and works list.
+It is memory-mapped, so random mode questions are sampled straight from the file without calling MusicBrainz.
+
+Build it with:
+    python -m models.question_bank --output data/question_bank.bin
+
+File layout (little endian):
+- header: magic b"MMQB", format version (u16), reserved (u16), artist count (u32), work count (u32), snapshot version (u32)
+- artist table, one 48-byte record per artist: name offset (u32), name length (u32), MBID (36 ASCII bytes), first work (u32)
+  followed by one sentinel u32 holding the total work count, so artist i owns works [first_i, first_i+1)
+- work table, one record per work: title offset (u32), title length (u32)
+- string blob: UTF-8 names and titles
+"""
+
+import argparse
+import mmap
+import os
+import random
+import struct
+import zlib
+from models.artist_catalog import get_shared_catalog
+
+MAGIC = b"MMQB"
+FORMAT_VERSION = 1
+DEFAULT_BANK_PATH = os.path.join("data", "question_bank.bin")
+MAX_FALSE_ARTIST_ATTEMPTS = 10  # artists tried for the two false options of a question
+
+_HEADER = struct.Struct("<4sHHIII")
+_ARTIST = struct.Struct("<II36sI")
+_OFFSET = struct.Struct("<I")
+_WORK = struct.Struct("<II")
+
+
+def write_question_bank(path: str, snapshot: list) -> int:
+    """
+    Write a question bank file.
+
+    Parameters:
+    - path (str): Where to write the file.
+    - snapshot (list): (artist name, MBID, list of work titles) tuples.
+
+    Returns:
+    - int: The snapshot version, a checksum of the file's contents.
+    """
+    blob = bytearray()
+    artist_records = []
+    work_records = []
+
+    for name, mbid, works in snapshot:
+        encoded_name = name.encode("utf-8")
+        artist_records.append((len(blob), len(encoded_name), (mbid or "").encode("ascii"), len(work_records)))
+        blob += encoded_name
+        for title in works:
+            encoded_title = title.encode("utf-8")
+            work_records.append((len(blob), len(encoded_title)))
+            blob += encoded_title
+
+    body = bytearray()
+    for record in artist_records:
+        body += _ARTIST.pack(*record)
+    body += _OFFSET.pack(len(work_records))
+    for record in work_records:
+        body += _WORK.pack(*record)
+    body += blob
+
+    snapshot_version = zlib.crc32(body)
+    header = _HEADER.pack(MAGIC, FORMAT_VERSION, 0, len(artist_records), len(work_records), snapshot_version)
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "wb") as file:
+        file.write(header)
+        file.write(body)
+    # Replace atomically so readers never see a half-written bank
+    os.replace(temp_path, path)
+
+    return snapshot_version
+
+
+class QuestionBank:
+    """
+    This QuestionBank class represents a memory-mapped question bank used to generate random mode questions offline.
+
+    Attributes:
+    - path (str): The bank file path.
+    - artist_count (int): Number of artists in the bank.
+    - work_count (int): Number of works in the bank.
+    - snapshot_version (int): Checksum identifying the snapshot's contents.
+    - rng (random.Random): The random number generator used for sampling.
+
+    Methods:
+    - artist_name(self, index) -> str: Get an artist's name.
+    - artist_id(self, index) -> str or None: Get an artist's MBID.
+    - artist_works_count(self, index) -> int: Get how many works an artist has.
+    - work_title(self, artist_index, work_index) -> str: Get one of an artist's works.
+    - artist_works(self, index) -> list: Get all of an artist's works.
+    - generate_question_random_mode(self, rng=None) -> list: Sample a random mode question.
+    - close(self): Unmap the file.
+    """
+
+    def __init__(self, path: str = DEFAULT_BANK_PATH, rng: random.Random = None):
+        """
+        Constructor method.
+
+        Parameters:
+        - path (str): The bank file path.
+        - rng (random.Random): Random number generator. Defaults to a new unseeded one.
+
+        Raises:
+        - ValueError: If the file is not a question bank of a supported version.
+        """
+        self.path = path
+        self.rng = rng if rng is not None else random.Random()
+        with open(path, "rb") as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, _, self.artist_count, self.work_count, self.snapshot_version = _HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            self._map.close()
+            raise ValueError(f"{path} is not a question bank")
+        if version != FORMAT_VERSION:
+            self._map.close()
+            raise ValueError(f"{path} has question bank version {version}, expected {FORMAT_VERSION}")
+
+        self._artists_start = _HEADER.size
+        self._works_start = self._artists_start + self.artist_count * _ARTIST.size + _OFFSET.size
+        self._blob_start = self._works_start + self.work_count * _WORK.size
+        # Only artists with works can be used for correct answers and distractors
+        self._playable = [i for i in range(self.artist_count) if self.artist_works_count(i) > 0]
+
+    def _artist_record(self, index: int) -> tuple:
+        return _ARTIST.unpack_from(self._map, self._artists_start + index * _ARTIST.size)
+
+    def _first_work(self, index: int) -> int:
+        if index == self.artist_count:
+            # The sentinel after the artist table
+            return _OFFSET.unpack_from(self._map, self._artists_start + index * _ARTIST.size)[0]
+        return self._artist_record(index)[3]
+
+    def _string(self, offset: int, length: int) -> str:
+        start = self._blob_start + offset
+        return self._map[start:start + length].decode("utf-8")
+
+    def artist_name(self, index: int) -> str:
+        """
+        Get an artist's name.
+
+        Parameters:
+        - index (int): The artist's index.
+
+        Returns:
+        - str: The artist's name.
+        """
+        name_offset, name_length, _, _ = self._artist_record(index)
+        return self._string(name_offset, name_length)
+
+    def artist_id(self, index: int) -> str or None:
+        """
+        Get an artist's MBID.
+
+        Parameters:
+        - index (int): The artist's index.
+
+        Returns:
+        - str: The MBID.
+        - None: If the artist could not be resolved when the bank was built.
+        """
+        mbid = self._artist_record(index)[2].rstrip(b"\0").decode("ascii")
+        return mbid or None
+
+    def artist_works_count(self, index: int) -> int:
+        """
+        Get how many works an artist has.
+
+        Parameters:
+        - index (int): The artist's index.
+
+        Returns:
+        - int: The number of works.
+        """
+        return self._first_work(index + 1) - self._first_work(index)
+
+    def work_title(self, artist_index: int, work_index: int) -> str:
+        """
+        Get one of an artist's works.
+
+        Parameters:
+        - artist_index (int): The artist's index.
+        - work_index (int): The work's index within the artist's works.
+
+        Returns:
+        - str: The work's title.
+        """
+        position = self._first_work(artist_index) + work_index
+        title_offset, title_length = _WORK.unpack_from(self._map, self._works_start + position * _WORK.size)
+        return self._string(title_offset, title_length)
+
+    def artist_works(self, index: int) -> list:
+        """
+        Get all of an artist's works.
+
+        Parameters:
+        - index (int): The artist's index.
+
+        Returns:
+        - list: The artist's work titles.
+        """
+        return [self.work_title(index, j) for j in range(self.artist_works_count(index))]
+
+    def _random_work(self, artist_index: int, rng: random.Random) -> str:
+        return self.work_title(artist_index, rng.randrange(self.artist_works_count(artist_index)))
+
+    def generate_question_random_mode(self, rng: random.Random = None) -> list:
+        """
+        Sample a random mode question from the bank. The same generator state gives the same question.
+
+        Like a live question, the false options are two different works of two other artists, and neither is one of the
+        current artist's works; an artist with no such work is replaced by another one.
+
+        Parameters:
+        - rng (random.Random): Random number generator. Defaults to the bank's.
+
+        Returns:
+        - list: List containing current artist, options, and correct work for the question.
+
+        Raises:
+        - ValueError: If fewer than three artists in the bank have works, or no two such false options are found
+          within MAX_FALSE_ARTIST_ATTEMPTS artists.
+        """
+        if len(self._playable) < 3:
+            raise ValueError("The question bank needs at least three artists with works")
+
+        rng = rng if rng is not None else self.rng
+        current_index, *false_indexes = rng.sample(self._playable, 3)
+        correct_work = self._random_work(current_index, rng)
+
+        excluded = set(self.artist_works(current_index))
+        tried = {current_index}
+        false_works = []
+        candidates, drawn = false_indexes, False
+        while len(false_works) < 2 and len(tried) <= MAX_FALSE_ARTIST_ATTEMPTS:
+            if not candidates:
+                if drawn:
+                    break
+                # Artists without a usable work are replaced by others, in random order
+                candidates, drawn = rng.sample(self._playable, min(len(self._playable), 2 * MAX_FALSE_ARTIST_ATTEMPTS)), True
+            index = candidates.pop(0)
+            if index in tried:
+                continue
+            tried.add(index)
+            works = [work for work in self.artist_works(index) if work not in excluded]
+            if works:
+                false_works.append(rng.choice(works))
+                excluded.add(false_works[-1])
+        if len(false_works) < 2:
+            raise ValueError(f"No two false options different from the works of {self.artist_name(current_index)} "
+                             "were found in the question bank")
+
+        options = [correct_work] + false_works
+        rng.shuffle(options)
+
+        return [self.artist_name(current_index), options, correct_work]
+
+    def close(self):
+        """
+        Unmap the file.
+        """
+        self._map.close()
+
+    def __str__(self):
+        """
+        Returns a string representation of the QuestionBank instance.
+        """
+        return f"QuestionBank(path={self.path}, artists={self.artist_count}, works={self.work_count}, snapshot_version={self.snapshot_version})"
+
+
+def load_question_bank(path: str = DEFAULT_BANK_PATH) -> QuestionBank or None:
+    """
+    Open the question bank if it has been built.
+
+    Parameters:
+    - path (str): The bank file path.
+
+    Returns:
+    - QuestionBank: The opened bank.
+    - None: If the file does not exist or is not a usable bank.
+    """
+    try:
+        return QuestionBank(path)
+    except (OSError, ValueError, struct.error):
+        return None
+
+
+def build_question_bank(artist_info, artists: list = None, output: str = DEFAULT_BANK_PATH) -> int:
+    """
+    Snapshot every pool artist's MBID and works from MusicBrainz into a question bank file.
+
+    Parameters:
+    - artist_info (ArtistInfo): The controller to fetch data with.
+    - artists (list): Artist names to include. Defaults to every artist in the catalog.
+    - output (str): Where to write the bank.
+
+    Returns:
+    - int: The snapshot version.
+    """
+    artists = artists or list(get_shared_catalog().names)
+    artist_ids, _ = artist_info.resolve_many(artists)
+
+    snapshot = []
+    for artist in artists:
+        artist_id = artist_ids.get(artist)
+        # Page through the artist's full catalog rather than only the first page
+        works = list(artist_info.iter_artist_works(artist_id)) if artist_id else []
+        snapshot.append((artist, artist_id, works))
+        print(f"{artist}: {len(works)} works")
+
+    return write_question_bank(output, snapshot)
+
+
+def main():
+    """
+    Command-line entry point that builds the question bank.
+    """
+    # Imported here so reading a bank does not pull in the HTTP stack
+    from models.artist_info import ArtistInfo
+    from models.request_scheduler import RequestScheduler
+
+    parser = argparse.ArgumentParser(description="Build the offline random mode question bank.")
+    parser.add_argument("--output", default=DEFAULT_BANK_PATH, help="where to write the bank file")
+    args = parser.parse_args()
+
+    snapshot_version = build_question_bank(ArtistInfo(scheduler=RequestScheduler()), output=args.output)
+    print(f"Wrote {args.output} (snapshot version {snapshot_version:08x})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+"""
+Yue Yu
+CS 5001, Fall 2023
+Final Project -- models.question_pool
+
+This program contains a class QuestionPool that keeps a bounded queue of ready-made random mode questions,
+refilled in the background, so starting a quiz only has to pop finished questions.
+"""
+
+import os
+import queue
+import random
+import threading
+import time
+from models.artist_quiz import ArtistQuiz
+from models.quiz_token import new_seed
+
+DEFAULT_DEPTH = int(os.environ.get("MUSICMUSTARD_QUESTION_POOL_DEPTH", "9"))
+DEFAULT_REFILL_WORKERS = int(os.environ.get("MUSICMUSTARD_QUESTION_POOL_WORKERS", "2"))
+ERROR_BACKOFF = 5  # seconds a producer waits after a failed generation
+
+
+class QuestionPool:
+    """
+    This QuestionPool class represents a warm pool of pre-generated random mode questions.
+
+    Producer threads call ArtistQuiz.generate_question_random_mode and block once the queue is full,
+    so the pool refills itself as questions are taken. Every question is generated from its own seed,
+    which is kept with it so the question can be rebuilt (see QuizToken).
+
+    Attributes:
+    - artist_quiz (ArtistQuiz): The injected question generator.
+    - depth (int): Maximum number of ready questions.
+    - refill_workers (int): Number of producer threads.
+
+    Methods:
+    - start(self): Start the producer threads.
+    - stop(self): Ask the producer threads to stop.
+    - take(self, num_questions=3, timeout=None) -> list: Pop ready questions.
+    - take_seeded(self, num_questions=3, timeout=None) -> list: Pop ready questions with their seeds.
+    - take_ready(self, num_questions=3) -> list: Pop at most num_questions ready questions, without generating any.
+    - stats(self) -> dict: Return pool counters, including starvation.
+    """
+
+    def __init__(self, artist_quiz: ArtistQuiz = None, depth: int = DEFAULT_DEPTH, refill_workers: int = DEFAULT_REFILL_WORKERS):
+        """
+        Constructor method.
+
+        Parameters:
+        - artist_quiz (ArtistQuiz): The question generator. Defaults to a new ArtistQuiz.
+        - depth (int): Maximum number of ready questions.
+        - refill_workers (int): Number of producer threads.
+        """
+        self.artist_quiz = artist_quiz if artist_quiz is not None else ArtistQuiz()
+        self.depth = depth
+        self.refill_workers = refill_workers
+        self._queue = queue.Queue(maxsize=depth)
+        self._stopped = threading.Event()
+        self._threads = []
+        self._lock = threading.Lock()
+        self._generated = 0
+        self._served = 0
+        self._starved = 0
+        self._errors = 0
+
+    def start(self):
+        """
+        Start the producer threads. Calling start() on a running pool does nothing.
+        """
+        if self._threads:
+            return
+        self._stopped.clear()
+        for i in range(self.refill_workers):
+            thread = threading.Thread(target=self._produce, name=f"question-pool-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        """
+        Ask the producer threads to stop after their current question.
+        """
+        self._stopped.set()
+        self._threads = []
+
+    def _produce(self):
+        """
+        Producer loop: generate questions and put them in the queue until stopped.
+        """
+        while not self._stopped.is_set():
+            try:
+                seed = new_seed()
+                question = self.artist_quiz.generate_question_random_mode(rng=random.Random(seed))
+            except Exception:
+                with self._lock:
+                    self._errors += 1
+                self._stopped.wait(ERROR_BACKOFF)
+                continue
+
+            with self._lock:
+                self._generated += 1
+            # Block while the pool is full, waking up regularly to notice stop()
+            while not self._stopped.is_set():
+                try:
+                    self._queue.put((seed, question), timeout=1)
+                    break
+                except queue.Full:
+                    continue
+
+    def take(self, num_questions: int = 3, timeout: float = None) -> list:
+        """
+        Pop ready questions from the pool.
+
+        Parameters:
+        - num_questions (int): Number of questions to take.
+        - timeout (float): Seconds to wait for a producer before generating inline. None does not wait.
+
+        Returns:
+        - list: List of [current artist, options, correct work] questions.
+        """
+        return [question for _, question in self.take_seeded(num_questions, timeout)]
+
+    def take_seeded(self, num_questions: int = 3, timeout: float = None) -> list:
+        """
+        Pop ready questions from the pool, with the seed each was generated from.
+
+        If the pool runs dry, the shortfall is counted as starvation and the missing questions
+        are generated on the caller's thread (after waiting up to timeout for the producers). QuizBuilder uses
+        take_ready() instead and builds the shortfall on its thread pool.
+
+        Parameters:
+        - num_questions (int): Number of questions to take.
+        - timeout (float): Seconds to wait for a producer before generating inline. None does not wait.
+
+        Returns:
+        - list: (seed, [current artist, options, correct work]) tuples.
+        """
+        questions = self.take_ready(num_questions)
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        while len(questions) < num_questions:
+            # Only wait if there are producers that could still deliver
+            remaining = 0 if deadline is None or not self._threads else deadline - time.monotonic()
+            if remaining > 0:
+                try:
+                    questions.append(self._queue.get(timeout=remaining))
+                    with self._lock:
+                        self._served += 1
+                    continue
+                except queue.Empty:
+                    pass
+            seed = new_seed()
+            questions.append((seed, self.artist_quiz.generate_question_random_mode(rng=random.Random(seed))))
+
+        return questions
+
+    def take_ready(self, num_questions: int = 3) -> list:
+        """
+        Pop the questions that are ready, up to num_questions, without waiting or generating any.
+        Finding fewer than num_questions is counted as starvation.
+
+        Parameters:
+        - num_questions (int): Number of questions wanted.
+
+        Returns:
+        - list: At most num_questions (seed, [current artist, options, correct work]) tuples.
+        """
+        questions = []
+        while len(questions) < num_questions:
+            try:
+                questions.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+
+        with self._lock:
+            self._served += len(questions)
+            if len(questions) < num_questions:
+                self._starved += 1
+
+        return questions
+
+    def stats(self) -> dict:
+        """
+        Return the pool counters.
+
+        Returns:
+        - dict: ready, depth, generated, served (questions taken from the pool), starved (takes that found the pool short) and errors.
+        """
+        with self._lock:
+            return {
+                "ready": self._queue.qsize(),
+                "depth": self.depth,
+                "generated": self._generated,
+                "served": self._served,
+                "starved": self._starved,
+                "errors": self._errors,
+            }
+
+    def __str__(self):
+        """
+        Returns a string representation of the QuestionPool instance.
+        """
+        return f"QuestionPool(depth={self.depth}, refill_workers={self.refill_workers})"
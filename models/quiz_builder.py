@@ -0,0 +1,401 @@
+"""
+Yue Yu
+CS 5001, Fall 2023
+Final Project -- models.quiz_builder
+
+This program contains a class QuizBuilder that assembles all questions of a quiz in parallel on a bounded thread pool.
+"""
+
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from models.artist_cache import LRUCache
+from models.artist_quiz import ArtistQuiz, QuizGenerationError, QuizTimeoutError
+from models.metrics import QUIZ_STAGE_DURATION
+from models.quiz_token import QuizToken, QuizTokenError, get_shared_secret, new_seed, SOURCE_BANK, SOURCE_CATALOG
+
+DEFAULT_MAX_WORKERS = 8
+DEFAULT_QUESTION_TIMEOUT = 20  # seconds
+QUIZ_CACHE_SIZE = 4096  # quizzes kept by token, shared by every session
+QUIZ_CACHE_TTL = 6 * 60 * 60  # seconds; older quizzes are rebuilt from their token
+
+
+class ArtistNotFoundError(ValueError):
+    """
+    Raised for a personal mode artist that cannot be found on MusicBrainz or has no works.
+    """
+
+
+class QuestionResult:
+    """
+    This QuestionResult class represents the outcome of building one quiz question.
+
+    Attributes:
+    - index (int): The position of the question in the quiz.
+    - question (dict or None): {"artist", "options", "correct_answer"} if the question was built.
+    - error (Exception or None): Why the question could not be built.
+    - seed (int or None): The seed a random mode question was generated from.
+
+    Methods:
+    - ok (property) -> bool: Whether the question was built.
+    """
+
+    def __init__(self, index: int, question: dict = None, error: Exception = None, seed: int = None):
+        """
+        Constructor method.
+
+        Parameters:
+        - index (int): The position of the question in the quiz.
+        - question (dict): The built question.
+        - error (Exception): The failure, if any.
+        - seed (int): The seed a random mode question was generated from.
+        """
+        self.index = index
+        self.question = question
+        self.error = error
+        self.seed = seed
+
+    @property
+    def ok(self) -> bool:
+        """
+        Whether the question was built.
+
+        Returns:
+        - bool: True if the question is available, False otherwise.
+        """
+        return self.error is None and self.question is not None
+
+    def __repr__(self):
+        """
+        Returns a string representation of the QuestionResult instance.
+        """
+        return f"QuestionResult(index={self.index}, question={self.question}, error={self.error!r})"
+
+
+class QuizBuilder:
+    """
+    This QuizBuilder class represents a controller that builds every question of a quiz at once.
+
+    Questions are submitted to a bounded thread pool, every question shares the same deadline,
+    and results come back in question order with failures reported per question.
+    Random mode quizzes are identified by a QuizToken and kept in a cache shared by every session,
+    so a session only needs to keep the token; a quiz no longer in the cache is rebuilt from its token.
+    Tokens are signed with a server secret, so only quizzes issued by the app are ever rebuilt.
+
+    Attributes:
+    - artist_quiz (ArtistQuiz): The injected question generator.
+    - question_bank (QuestionBank or None): Offline bank used for random mode instead of live fetching, if built.
+    - question_pool (QuestionPool or None): Warm pool of pre-generated random mode questions.
+    - max_workers (int): Size of the thread pool.
+    - question_timeout (float): Seconds each quiz build may take before unfinished questions fail.
+
+    Methods:
+    - build(self, question_factories) -> list: Build questions from zero-argument callables.
+    - build_random_mode(self, num_questions=3) -> list: Build a random mode quiz.
+    - build_personal_mode(self, chosen_artists) -> list: Build a personal mode quiz.
+    - quiz_token(self, results) -> str or None: Get the token of a built random mode quiz.
+    - load_quiz(self, token) -> list: Get the questions of a random mode quiz from its token.
+    - prefetch_artist_works(self, artists) -> dict: Resolve and fetch each distinct artist's works once.
+    - shutdown(self): Stop the thread pool.
+    """
+
+    def __init__(self, artist_quiz: ArtistQuiz = None, max_workers: int = DEFAULT_MAX_WORKERS, question_timeout: float = DEFAULT_QUESTION_TIMEOUT,
+                 question_bank=None, question_pool=None, secret: bytes = None):
+        """
+        Constructor method.
+
+        Parameters:
+        - artist_quiz (ArtistQuiz): The question generator. Defaults to a new ArtistQuiz.
+        - question_bank (QuestionBank): Offline bank for random mode. None generates random mode questions live.
+        - question_pool (QuestionPool): Warm pool to take random mode questions from when there is no bank.
+        - max_workers (int): Size of the thread pool.
+        - question_timeout (float): Deadline in seconds for the questions of one build.
+        - secret (bytes): The secret quiz tokens are signed with. Defaults to the shared secret.
+        """
+        self.artist_quiz = artist_quiz if artist_quiz is not None else ArtistQuiz()
+        self.max_workers = max_workers
+        self.question_timeout = question_timeout
+        self.question_bank = question_bank
+        self.question_pool = question_pool
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="quiz-builder")
+        self._quizzes = LRUCache(maxsize=QUIZ_CACHE_SIZE, default_ttl=QUIZ_CACHE_TTL)
+        self._secret = secret if secret is not None else get_shared_secret()
+
+    def build(self, question_factories: list, seeds: list = None) -> list:
+        """
+        Build questions from zero-argument callables that each return a question dict.
+
+        Parameters:
+        - question_factories (list): Callables returning {"artist", "options", "correct_answer"}.
+        - seeds (list): The seed each factory generates its question from, if any.
+
+        Returns:
+        - list: One QuestionResult per factory, in the same order.
+        """
+        seeds = seeds if seeds is not None else [None] * len(question_factories)
+        futures = [self._executor.submit(factory) for factory in question_factories]
+        deadline = time.monotonic() + self.question_timeout
+        with self.artist_quiz.metrics.time(QUIZ_STAGE_DURATION, stage="quiz"):
+            wait(futures, timeout=max(0, deadline - time.monotonic()))
+
+        results = []
+        for index, future in enumerate(futures):
+            if not future.done():
+                future.cancel()
+                error = TimeoutError(f"Question {index + 1} was not ready within {self.question_timeout} s")
+                results.append(QuestionResult(index, error=error, seed=seeds[index]))
+            elif future.exception() is not None:
+                results.append(QuestionResult(index, error=future.exception(), seed=seeds[index]))
+            else:
+                results.append(QuestionResult(index, question=future.result(), seed=seeds[index]))
+
+        return results
+
+    def build_random_mode(self, num_questions: int = 3, seeds: list = None) -> list:
+        """
+        Build a random mode quiz, every question from its own seed.
+
+        Parameters:
+        - num_questions (int): Number of questions in the quiz.
+        - seeds (list): The seed of each question, to rebuild a quiz. Defaults to new seeds (or the pool's).
+
+        Returns:
+        - list: One QuestionResult per question, with its seed.
+        """
+        if self.question_bank is not None:
+            # Sampling from the bank takes microseconds, so there is no need for the thread pool
+            seeds = seeds if seeds is not None else [new_seed() for _ in range(num_questions)]
+            return [self._bank_question(index, seed) for index, seed in enumerate(seeds)]
+        if self.question_pool is not None and seeds is None:
+            return self._pool_questions(num_questions)
+        seeds = seeds if seeds is not None else [new_seed() for _ in range(num_questions)]
+        return self.build([lambda seed=seed: self._random_mode_question(seed) for seed in seeds], seeds)
+
+    def _random_mode_source(self) -> tuple:
+        """
+        Get where random mode questions come from and the version of that data.
+
+        Returns:
+        - tuple: (SOURCE_BANK, snapshot version) with a question bank, (SOURCE_CATALOG, catalog version) otherwise.
+        """
+        if self.question_bank is not None:
+            return SOURCE_BANK, self.question_bank.snapshot_version
+        return SOURCE_CATALOG, self.artist_quiz.artist_info.catalog.version
+
+    def quiz_token(self, results: list) -> str or None:
+        """
+        Get the token of a built random mode quiz, and keep its questions in the shared quiz cache.
+
+        Parameters:
+        - results (list): The QuestionResult objects of build_random_mode().
+
+        Returns:
+        - str: The token.
+        - None: If a question failed or has no seed.
+        """
+        if not results or any(not result.ok or result.seed is None for result in results):
+            return None
+        questions = [result.question for result in results]
+        source, version = self._random_mode_source()
+        token = QuizToken.for_questions(source, version, [result.seed for result in results], questions).encode(self._secret)
+        self._quizzes.set(token, questions)
+        return token
+
+    def load_quiz(self, token: str) -> list:
+        """
+        Get the questions of a random mode quiz from its token: from the shared quiz cache,
+        or rebuilt from the seeds in the token when the quiz is not cached (e.g. a shared link).
+
+        Parameters:
+        - token (str): The quiz token.
+
+        Returns:
+        - list: The {"artist", "options", "correct_answer"} questions.
+
+        Raises:
+        - QuizTokenError: If the token is malformed or was not issued here, the data it was built from
+          has changed, or a question cannot be rebuilt.
+        """
+        found, questions = self._quizzes.get(token)
+        if found:
+            return questions
+
+        # The signature is checked before anything is rebuilt, so made-up links cost no MusicBrainz requests
+        quiz_token = QuizToken.decode(token, self._secret)
+        source, version = self._random_mode_source()
+        if (quiz_token.source, quiz_token.version) != (source, version):
+            raise QuizTokenError("This quiz was made from other artists and can no longer be rebuilt")
+        with self.artist_quiz.metrics.time(QUIZ_STAGE_DURATION, stage="quiz_rebuild"):
+            results = self.build_random_mode(len(quiz_token.seeds), list(quiz_token.seeds))
+        failed = [result for result in results if not result.ok]
+        if failed:
+            raise QuizTokenError(f"Question {failed[0].index + 1} could not be rebuilt: {failed[0].error}")
+
+        questions = [result.question for result in results]
+        if QuizToken.for_questions(source, version, quiz_token.seeds, questions) != quiz_token:
+            # The same seeds gave other questions, e.g. because an artist's works changed
+            raise QuizTokenError("This quiz's artists have changed and it can no longer be rebuilt")
+        self._quizzes.set(token, questions)
+        return questions
+
+    def _pool_questions(self, num_questions: int) -> list:
+        """
+        Take the ready random mode questions from the warm pool, and build any shortfall in parallel
+        on the thread pool, with the usual deadline, like a quiz without a pool.
+
+        Parameters:
+        - num_questions (int): Number of questions in the quiz.
+
+        Returns:
+        - list: One QuestionResult per question.
+        """
+        results = []
+        for index, (seed, (current_artist, options, correct_answer)) in enumerate(self.question_pool.take_ready(num_questions)):
+            question = {"artist": current_artist, "options": options, "correct_answer": correct_answer}
+            results.append(QuestionResult(index, question=question, seed=seed))
+
+        ready = len(results)
+        seeds = [new_seed() for _ in range(num_questions - ready)]
+        for result in self.build([lambda seed=seed: self._random_mode_question(seed) for seed in seeds], seeds):
+            result.index += ready
+            results.append(result)
+        return results
+
+    def _bank_question(self, index: int, seed: int) -> QuestionResult:
+        """
+        Sample one random mode question from the question bank.
+
+        Parameters:
+        - index (int): The position of the question in the quiz.
+        - seed (int): The seed to sample the question with.
+
+        Returns:
+        - QuestionResult: The sampled question, or the reason it could not be sampled.
+        """
+        try:
+            current_artist, options, correct_answer = self.question_bank.generate_question_random_mode(random.Random(seed))
+        except ValueError as error:
+            return QuestionResult(index, error=error, seed=seed)
+        question = {"artist": current_artist, "options": options, "correct_answer": correct_answer}
+        return QuestionResult(index, question=question, seed=seed)
+
+    def build_personal_mode(self, chosen_artists: list) -> list:
+        """
+        Build a personal mode quiz with one question per chosen artist.
+
+        Repeated artists are looked up once: all names are resolved in one batched search,
+        each distinct artist's works are fetched exactly once, and every question is built from those works.
+
+        Parameters:
+        - chosen_artists (list): The artists the questions are about.
+
+        Returns:
+        - list: One QuestionResult per artist. Artists that are not found, or have no works, fail with ArtistNotFoundError;
+          artists whose works could not be fetched in time fail with a QuizGenerationError.
+        """
+        artist_works = self.prefetch_artist_works(chosen_artists)
+
+        factories = []
+        for artist in chosen_artists:
+            works = artist_works.get(artist, [])
+            if isinstance(works, Exception):
+                factories.append(lambda error=works: self._raise(error))
+            elif works is None:
+                # MusicBrainz did not answer with the works, e.g. an error or a throttled response
+                message = self.artist_quiz._unavailable_message(f"No works could be fetched for {artist}")
+                factories.append(lambda message=message: self._raise(QuizGenerationError(message)))
+            elif works:
+                factories.append(lambda artist=artist, works=works: self._personal_mode_question(artist, works))
+            else:
+                factories.append(lambda artist=artist: self._artist_not_found(artist))
+
+        return self.build(factories)
+
+    def prefetch_artist_works(self, artists: list) -> dict:
+        """
+        Resolve and fetch the works of each distinct artist exactly once.
+
+        Parameters:
+        - artists (list): Artists' names, possibly repeated.
+
+        Returns:
+        - dict: Each artist found on MusicBrainz mapped to their works (empty if they have none, None if MusicBrainz
+          did not send them), or to the exception that stopped the fetch (a QuizTimeoutError if they did not arrive in time).
+        """
+        artist_info = self.artist_quiz.artist_info
+        artist_ids, _ = artist_info.resolve_many(list(dict.fromkeys(artists)))
+        futures = {artist: self._executor.submit(artist_info.fetch_artist_works, artist_id) for artist, artist_id in artist_ids.items()}
+        wait(futures.values(), timeout=self.question_timeout)
+
+        artist_works = {}
+        for artist, future in futures.items():
+            if not future.done():
+                artist_works[artist] = QuizTimeoutError(f"The works of {artist} did not arrive within {self.question_timeout} s. "
+                                                        "MusicBrainz may be slow or unavailable.")
+            else:
+                artist_works[artist] = future.exception() or future.result()
+        return artist_works
+
+    def _artist_not_found(self, artist: str):
+        """
+        Fail a question whose artist could not be found.
+
+        Parameters:
+        - artist (str): The artist's name.
+
+        Raises:
+        - ArtistNotFoundError: Always.
+        """
+        raise ArtistNotFoundError(f"No works found for the artist: {artist}")
+
+    def _raise(self, error: Exception):
+        """
+        Fail a question with an error found before it was built, e.g. while its artist's works were fetched.
+
+        Parameters:
+        - error (Exception): The error.
+
+        Raises:
+        - Exception: The error.
+        """
+        raise error
+
+    def _random_mode_question(self, seed: int) -> dict:
+        """
+        Generate one random mode question.
+
+        Parameters:
+        - seed (int): The seed to generate the question with.
+
+        Returns:
+        - dict: The question.
+        """
+        current_artist, options, correct_answer = self.artist_quiz.generate_question_random_mode(timeout=self.question_timeout,
+                                                                                                 rng=random.Random(seed))
+        return {"artist": current_artist, "options": options, "correct_answer": correct_answer}
+
+    def _personal_mode_question(self, artist: str, works: list) -> dict:
+        """
+        Generate one personal mode question from the artist's prefetched works.
+
+        Parameters:
+        - artist (str): The artist the question is about.
+        - works (list): The artist's works.
+
+        Returns:
+        - dict: The question.
+        """
+        options, correct_answer = self.artist_quiz.generate_question_personal_mode(artist, works, timeout=self.question_timeout)
+        return {"artist": artist, "options": options, "correct_answer": correct_answer}
+
+    def shutdown(self):
+        """
+        Stop the thread pool without waiting for running questions.
+        """
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def __str__(self):
+        """
+        Returns a string representation of the QuizBuilder instance.
+        """
+        return f"QuizBuilder(max_workers={self.max_workers}, question_timeout={self.question_timeout})"
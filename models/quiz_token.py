@@ -0,0 +1,287 @@
+"""
+Yue Yu
+CS 5001, Fall 2023
+Final Project -- models.quiz_token
+
+This program contains a class QuizToken, a compact identifier from which a random mode quiz can be rebuilt.
+
+Every random mode question is generated from its own seed. Given the same data, the same seed gives the same question,
+so a quiz is identified by where its questions came from (the live artist catalog or the offline question bank),
+the version of that data, the seed of each question, and a short checksum of the answers to detect a rebuild that
+came out differently. The token is signed with an HMAC under a server secret, so a token the server did not issue
+is refused before any question is rebuilt. It is about 38 URL-safe characters, so it can be kept in the session state
+instead of the questions and passed in links.
+"""
+
+import base64
+import hashlib
+import hmac
+import os
+import random
+import struct
+import threading
+import zlib
+
+SOURCE_CATALOG = b"c"  # generated by ArtistQuiz from the artist catalog
+SOURCE_BANK = b"b"  # sampled from the offline question bank
+NO_ANSWER = "-"
+DEFAULT_SECRET_PATH = os.path.join(".cache", "quiz_token.key")
+SECRET_SIZE = 32
+MAC_SIZE = 8  # bytes of the HMAC-SHA256 kept in a token
+
+_HEADER = struct.Struct("<cIB")  # source, data version, number of questions
+_SEED = struct.Struct("<I")
+_CHECKSUM = struct.Struct("<H")
+_system_random = random.SystemRandom()
+_shared_secret = None
+_shared_secret_lock = threading.Lock()
+
+
+class QuizTokenError(ValueError):
+    """
+    Raised for a token that is malformed, or whose quiz cannot be rebuilt from the current data.
+    """
+
+
+def load_secret(path: str = DEFAULT_SECRET_PATH) -> bytes:
+    """
+    Get the secret quiz tokens are signed with: MUSICMUSTARD_QUIZ_SECRET if set, otherwise a random key kept in a file,
+    created on first use, so tokens stay valid across restarts and in every process of the app.
+
+    Parameters:
+    - path (str): The key file.
+
+    Returns:
+    - bytes: The secret.
+
+    Raises:
+    - ValueError: If the key file is shorter than SECRET_SIZE bytes, e.g. truncated by hand.
+    """
+    configured = os.environ.get("MUSICMUSTARD_QUIZ_SECRET")
+    if configured:
+        return configured.encode("utf-8")
+    try:
+        return _read_secret(path)
+    except FileNotFoundError:
+        pass
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    secret = os.urandom(SECRET_SIZE)
+    # The key is written in full to a temporary file and then linked into place, so no process ever reads a partial key;
+    # linking fails if another process created the key first, and its key is used instead
+    temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    descriptor = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    try:
+        with os.fdopen(descriptor, "wb") as key_file:
+            key_file.write(secret)
+        os.link(temp_path, path)
+    except FileExistsError:
+        return _read_secret(path)
+    finally:
+        os.remove(temp_path)
+    return secret
+
+
+def _read_secret(path: str) -> bytes:
+    with open(path, "rb") as key_file:
+        secret = key_file.read()
+    if len(secret) < SECRET_SIZE:
+        raise ValueError(f"{path} holds {len(secret)} bytes, not a {SECRET_SIZE} byte key; delete it to create a new key")
+    return secret
+
+
+def get_shared_secret() -> bytes:
+    """
+    Get the process-wide quiz token secret, loading it on first use.
+
+    Returns:
+    - bytes: The secret.
+    """
+    global _shared_secret
+    with _shared_secret_lock:
+        if _shared_secret is None:
+            _shared_secret = load_secret()
+        return _shared_secret
+
+
+def new_seed() -> int:
+    """
+    Draw the seed of a new question.
+
+    Returns:
+    - int: A random 32-bit seed.
+    """
+    return _system_random.getrandbits(32)
+
+
+def answers_checksum(questions: list) -> int:
+    """
+    Checksum the artists and correct answers of a quiz, to tell whether a rebuilt quiz is the same quiz.
+
+    Parameters:
+    - questions (list): {"artist", "options", "correct_answer"} dicts.
+
+    Returns:
+    - int: A 16-bit checksum.
+    """
+    text = "\x1f".join(f"{question['artist']}\x1e{question['correct_answer']}" for question in questions)
+    return zlib.crc32(text.encode("utf-8")) & 0xFFFF
+
+
+class QuizToken:
+    """
+    This QuizToken class represents the compact identifier of a random mode quiz.
+
+    Attributes:
+    - source (bytes): SOURCE_CATALOG or SOURCE_BANK.
+    - version (int): The catalog or question bank snapshot version the questions were generated from.
+    - seeds (tuple): The seed of each question.
+    - checksum (int): answers_checksum() of the questions.
+
+    Methods:
+    - for_questions(cls, source, version, seeds, questions) -> QuizToken: Make the token of built questions.
+    - encode(self, secret) -> str: The signed, URL-safe token string.
+    - decode(cls, token, secret) -> QuizToken: Parse a token string and check its signature.
+    """
+
+    def __init__(self, source: bytes, version: int, seeds: tuple, checksum: int):
+        """
+        Constructor method.
+
+        Parameters:
+        - source (bytes): SOURCE_CATALOG or SOURCE_BANK.
+        - version (int): The version of the data the questions were generated from.
+        - seeds (tuple): The seed of each question.
+        - checksum (int): answers_checksum() of the questions.
+        """
+        self.source = source
+        self.version = version
+        self.seeds = tuple(seeds)
+        self.checksum = checksum
+
+    @classmethod
+    def for_questions(cls, source: bytes, version: int, seeds: list, questions: list):
+        """
+        Make the token of a built quiz.
+
+        Parameters:
+        - source (bytes): SOURCE_CATALOG or SOURCE_BANK.
+        - version (int): The version of the data the questions were generated from.
+        - seeds (list): The seed each question was generated from.
+        - questions (list): The questions.
+
+        Returns:
+        - QuizToken: The token.
+        """
+        return cls(source, version, seeds, answers_checksum(questions))
+
+    def encode(self, secret: bytes) -> str:
+        """
+        Encode the token as a URL-safe string, signed with the secret.
+
+        Parameters:
+        - secret (bytes): The server secret.
+
+        Returns:
+        - str: The token.
+        """
+        packed = _HEADER.pack(self.source, self.version, len(self.seeds))
+        packed += b"".join(_SEED.pack(seed) for seed in self.seeds)
+        packed += _CHECKSUM.pack(self.checksum)
+        packed += _mac(secret, packed)
+        return base64.urlsafe_b64encode(packed).decode("ascii").rstrip("=")
+
+    @classmethod
+    def decode(cls, token: str, secret: bytes):
+        """
+        Parse a token string, checking that it was signed with the secret.
+
+        Parameters:
+        - token (str): The token.
+        - secret (bytes): The server secret.
+
+        Returns:
+        - QuizToken: The parsed token.
+
+        Raises:
+        - QuizTokenError: If the string is not a valid token, or was not issued with this secret.
+        """
+        try:
+            packed = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+            source, version, count = _HEADER.unpack_from(packed)
+            if source not in (SOURCE_CATALOG, SOURCE_BANK) or len(packed) != _HEADER.size + count * _SEED.size + _CHECKSUM.size + MAC_SIZE:
+                raise QuizTokenError(f"Not a quiz token: {token}")
+            if not hmac.compare_digest(packed[-MAC_SIZE:], _mac(secret, packed[:-MAC_SIZE])):
+                raise QuizTokenError("This quiz was not made here")
+            seeds = [_SEED.unpack_from(packed, _HEADER.size + i * _SEED.size)[0] for i in range(count)]
+            checksum = _CHECKSUM.unpack_from(packed, len(packed) - MAC_SIZE - _CHECKSUM.size)[0]
+        except QuizTokenError:
+            raise
+        except (ValueError, struct.error):  # binascii.Error is a ValueError
+            raise QuizTokenError(f"Not a quiz token: {token}")
+        return cls(source, version, seeds, checksum)
+
+    def __eq__(self, other):
+        """
+        Compares two QuizToken instances for equality.
+        """
+        if not isinstance(other, QuizToken):
+            return False
+        return (self.source, self.version, self.seeds, self.checksum) == (other.source, other.version, other.seeds, other.checksum)
+
+    def __str__(self):
+        """
+        Returns a string representation of the QuizToken instance.
+        """
+        return f"QuizToken(source={self.source.decode()}, version={self.version:08x}, seeds={list(self.seeds)}, checksum={self.checksum:04x})"
+
+
+def _mac(secret: bytes, packed: bytes) -> bytes:
+    """
+    Sign a packed token.
+
+    Parameters:
+    - secret (bytes): The server secret.
+    - packed (bytes): The packed token without its MAC.
+
+    Returns:
+    - bytes: The first MAC_SIZE bytes of the HMAC-SHA256.
+    """
+    return hmac.new(secret, packed, hashlib.sha256).digest()[:MAC_SIZE]
+
+
+def encode_answers(questions: list, answers: list) -> str:
+    """
+    Encode a user's answers as one character per question: the index of the chosen option, or NO_ANSWER.
+
+    Parameters:
+    - questions (list): The questions.
+    - answers (list): The chosen option of each question, or None.
+
+    Returns:
+    - str: The encoded answers, e.g. "02-".
+    """
+    encoded = []
+    for question, answer in zip(questions, answers):
+        encoded.append(str(question["options"].index(answer)) if answer in question["options"] else NO_ANSWER)
+    return "".join(encoded)
+
+
+def grade_answers(questions: list, encoded_answers: str) -> int:
+    """
+    Grade encoded answers against the questions.
+
+    Parameters:
+    - questions (list): The questions.
+    - encoded_answers (str): The answers as encoded by encode_answers().
+
+    Returns:
+    - int: The number of correct answers.
+    """
+    score = 0
+    for question, answer in zip(questions, encoded_answers):
+        if answer.isdigit() and int(answer) < len(question["options"]) and question["options"][int(answer)] == question["correct_answer"]:
+            score += 1
+    return score
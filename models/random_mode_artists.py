@@ -3,7 +3,8 @@ Yue Yu
 CS 5001, Fall 2023
 Final Project -- models.default_mode_artists
 
-This program contains a list of rock artists. When the user chooses "random mode", the quiz questions will be generated based on these artists.
+This program contains a list of rock artists. It seeds the artist catalog (data/artist_catalog.tsv) that "random mode" quiz questions
+are generated from, and is used as the catalog when the catalog file is missing.
 '''
 
 random_mode_artists = [
@@ -0,0 +1,324 @@
+"""
+Yue Yu
+CS 5001, Fall 2023
+Final Project -- models.request_scheduler
+
+This program contains the process-wide scheduler that every MusicBrainz request goes through.
+It rate limits with a token bucket, merges identical in-flight requests and backs off on 503/429 responses.
+A request that would have to wait longer than max_wait for its turn is refused at once with SchedulerBusyError,
+so under load callers fall back to stale data instead of queueing for minutes.
+"""
+
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+import requests
+from models.transport import get_shared_transport
+
+# MusicBrainz allows about one request per second per client
+DEFAULT_RATE = float(os.environ.get("MUSICMUSTARD_RATE_LIMIT", "1.0"))
+DEFAULT_BURST = 1
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_BACKOFF_BASE = 1.0  # seconds
+DEFAULT_MAX_BACKOFF = 30.0  # seconds
+DEFAULT_MAX_WAIT = float(os.environ.get("MUSICMUSTARD_MAX_QUEUE_WAIT", "10"))  # seconds a request may wait for its turn
+RETRY_STATUSES = (429, 503)
+
+_shared_scheduler = None
+_shared_scheduler_lock = threading.Lock()
+
+
+class SchedulerBusyError(requests.exceptions.ConnectionError):
+    """
+    Raised instead of queueing a request that would wait longer than the scheduler's max_wait.
+    It is a ConnectionError, so callers that already fall back to cached data on connection errors do so too.
+    Nothing was sent, so it says nothing about MusicBrainz's health (local is True for the circuit breaker).
+    """
+
+    local = True
+
+
+class TokenBucket:
+    """
+    This TokenBucket class represents a thread-safe token bucket rate limiter.
+
+    Callers reserve a token up front and sleep off any deficit, so waiting callers are served in arrival order.
+
+    Attributes:
+    - rate (float): Tokens added per second.
+    - capacity (int): Maximum number of tokens, i.e. the allowed burst.
+
+    Methods:
+    - acquire(self, max_wait=None) -> float or None: Take one token, blocking until it is available. Returns the seconds waited.
+    """
+
+    def __init__(self, rate: float = DEFAULT_RATE, capacity: int = DEFAULT_BURST):
+        """
+        Constructor method.
+
+        Parameters:
+        - rate (float): Tokens added per second.
+        - capacity (int): Maximum number of tokens.
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, max_wait: float = None) -> float or None:
+        """
+        Take one token, blocking until it is available.
+
+        Parameters:
+        - max_wait (float): Longest wait allowed. If the token would come later, none is taken. None waits as long as needed.
+
+        Returns:
+        - float: The number of seconds spent waiting.
+        - None: If the wait would have been longer than max_wait.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            wait_time = max(0.0, (1 - self._tokens) / self.rate)
+            if max_wait is not None and wait_time > max_wait:
+                return None
+            self._tokens -= 1
+
+        if wait_time > 0:
+            time.sleep(wait_time)
+        return wait_time
+
+
+class _InFlightCall:
+    """
+    A request that is currently being sent, shared by every caller asking for the same URL.
+    """
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.response = None
+        self.error = None
+
+
+class RequestScheduler:
+    """
+    This RequestScheduler class represents a rate-limited, coalescing front for HTTP GET requests.
+
+    Attributes:
+    - session (requests.Session or Transport): What actually sends requests; anything with get(url, timeout=...).
+    - bucket (TokenBucket): The rate limiter.
+    - max_retries (int): Maximum retries of a 503/429 response.
+    - backoff_base (float): First exponential backoff delay in seconds.
+    - max_backoff (float): Upper bound for any single backoff delay in seconds.
+    - max_wait (float): Longest a request may wait for its turn before SchedulerBusyError. None waits as long as needed.
+
+    Methods:
+    - get(self, url, timeout=None) -> requests.Response: Send (or join) a GET request for url.
+    - stats(self) -> dict: Return queue depth, wait time and request counters.
+    """
+
+    def __init__(self, session=None, rate: float = DEFAULT_RATE, burst: int = DEFAULT_BURST, max_retries: int = DEFAULT_MAX_RETRIES,
+                 backoff_base: float = DEFAULT_BACKOFF_BASE, max_backoff: float = DEFAULT_MAX_BACKOFF, max_wait: float = DEFAULT_MAX_WAIT):
+        """
+        Constructor method.
+
+        Parameters:
+        - session (requests.Session or Transport): What to send requests with. Defaults to the process-wide transport.
+        - rate (float): Requests allowed per second.
+        - burst (int): Requests allowed back to back before throttling starts.
+        - max_retries (int): Maximum retries of a 503/429 response.
+        - backoff_base (float): First exponential backoff delay in seconds.
+        - max_backoff (float): Upper bound for any single backoff delay in seconds.
+        - max_wait (float): Longest a request may wait for its turn before SchedulerBusyError. None waits as long as needed.
+        """
+        self.session = session if session is not None else get_shared_transport()
+        self.bucket = TokenBucket(rate, burst)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.max_backoff = max_backoff
+        self.max_wait = max_wait
+
+        self._lock = threading.Lock()
+        self._in_flight = {}  # url -> _InFlightCall
+        self._queue_depth = 0
+        self._requests = 0
+        self._coalesced = 0
+        self._retries = 0
+        self._rejected = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    def get(self, url: str, timeout=None):
+        """
+        Send a GET request for url, or wait for an identical request that is already in flight.
+
+        Parameters:
+        - url (str): The URL to fetch.
+        - timeout (tuple or float): The requests timeout.
+
+        Returns:
+        - requests.Response: The response, shared with every coalesced caller.
+
+        Raises:
+        - SchedulerBusyError: If the request would wait longer than max_wait for its turn.
+        """
+        with self._lock:
+            call = self._in_flight.get(url)
+            is_leader = call is None
+            if is_leader:
+                call = _InFlightCall()
+                self._in_flight[url] = call
+            else:
+                self._coalesced += 1
+
+        if not is_leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.response
+
+        try:
+            call.response = self._send(url, timeout)
+            return call.response
+        except Exception as error:
+            call.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[url]
+            call.done.set()
+
+    def _send(self, url: str, timeout):
+        """
+        Send a request, honoring the rate limit and retrying 503/429 responses with backoff.
+
+        Parameters:
+        - url (str): The URL to fetch.
+        - timeout (tuple or float): The requests timeout.
+
+        Returns:
+        - requests.Response: The final response.
+
+        Raises:
+        - SchedulerBusyError: If the first attempt would wait longer than max_wait for its turn.
+        """
+        attempt = 0
+        response = None
+        while True:
+            try:
+                self._wait_for_token()
+            except SchedulerBusyError:
+                if response is None:
+                    raise
+                return response  # too busy to retry: the throttled response is the answer
+            response = self.session.get(url, timeout=timeout)
+            with self._lock:
+                self._requests += 1
+
+            if response.status_code not in RETRY_STATUSES or attempt >= self.max_retries:
+                return response
+
+            with self._lock:
+                self._retries += 1
+            time.sleep(self._backoff_delay(response, attempt))
+            attempt += 1
+
+    def _wait_for_token(self):
+        """
+        Block until the rate limiter allows another request, recording queue depth and wait time.
+
+        Raises:
+        - SchedulerBusyError: If the wait would be longer than max_wait.
+        """
+        with self._lock:
+            self._queue_depth += 1
+        try:
+            waited = self.bucket.acquire(self.max_wait)
+        finally:
+            with self._lock:
+                self._queue_depth -= 1
+        if waited is None:
+            with self._lock:
+                self._rejected += 1
+            raise SchedulerBusyError(f"Too many MusicBrainz requests queued; the wait would be over {self.max_wait:.0f} s")
+        with self._lock:
+            self._total_wait += waited
+            self._max_wait = max(self._max_wait, waited)
+
+    def _backoff_delay(self, response, attempt: int) -> float:
+        """
+        Work out how long to wait before retrying.
+
+        Parameters:
+        - response (requests.Response): The throttled response.
+        - attempt (int): Zero-based retry number.
+
+        Returns:
+        - float: Seconds to wait, from Retry-After if present, otherwise exponential with jitter.
+        """
+        retry_after = parse_retry_after(response.headers.get("Retry-After"))
+        if retry_after is None:
+            retry_after = self.backoff_base * (2 ** attempt) * random.uniform(0.5, 1.0)
+        return min(retry_after, self.max_backoff)
+
+    def stats(self) -> dict:
+        """
+        Return the scheduler counters.
+
+        Returns:
+        - dict: queue_depth, in_flight, requests, coalesced, retries, rejected, total_wait, max_wait and avg_wait.
+        """
+        with self._lock:
+            return {
+                "queue_depth": self._queue_depth,
+                "in_flight": len(self._in_flight),
+                "requests": self._requests,
+                "coalesced": self._coalesced,
+                "retries": self._retries,
+                "rejected": self._rejected,
+                "total_wait": self._total_wait,
+                "max_wait": self._max_wait,
+                "avg_wait": self._total_wait / self._requests if self._requests else 0.0,
+            }
+
+
+def parse_retry_after(value: str) -> float or None:
+    """
+    Parse a Retry-After header given either as seconds or as an HTTP date.
+
+    Parameters:
+    - value (str): The header value.
+
+    Returns:
+    - float: Seconds to wait.
+    - None: If the header is missing or malformed.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+def get_shared_scheduler() -> RequestScheduler:
+    """
+    Get the process-wide request scheduler, creating it on first use.
+
+    Returns:
+    - RequestScheduler: The shared scheduler.
+    """
+    global _shared_scheduler
+    with _shared_scheduler_lock:
+        if _shared_scheduler is None:
+            _shared_scheduler = RequestScheduler()
+        return _shared_scheduler
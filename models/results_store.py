@@ -0,0 +1,358 @@
+"""
+Yue Yu
+CS 5001, Fall 2023
+Final Project -- models.results_store
+
+This program contains a class ResultsStore that keeps every saved quiz result in SQLite, for score history
+and a leaderboard shared by every session.
+
+The database runs in WAL mode, so readers never wait for the writer. Results are not written on the request thread:
+record() only puts the result in a queue, and a background thread writes whatever has queued up in one transaction.
+A trigger keeps one row per player with their totals, so the leaderboard reads the first rows of an index
+and a player's history reads the newest rows of another, however many results are stored.
+"""
+
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from models.metrics import RESULTS_QUERY_DURATION, get_shared_metrics
+
+DEFAULT_RESULTS_PATH = os.environ.get("MUSICMUSTARD_RESULTS_PATH", os.path.join("data", "results.sqlite3"))
+DEFAULT_QUEUE_SIZE = 10000  # results waiting to be written; record() drops results beyond this
+DEFAULT_BATCH_SIZE = 500  # results written per transaction, at most
+DEFAULT_BATCH_INTERVAL = 0.2  # seconds the writer waits for more results before writing a batch
+DEFAULT_READERS = 4  # read connections kept open
+MAX_PLAYER_LENGTH = 30
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY,
+    player TEXT NOT NULL,
+    score INTEGER NOT NULL,
+    num_questions INTEGER NOT NULL,
+    quiz TEXT,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_player_history ON results (player, created_at DESC);
+CREATE UNIQUE INDEX IF NOT EXISTS results_player_quiz ON results (player, quiz) WHERE quiz IS NOT NULL;
+
+CREATE TABLE IF NOT EXISTS players (
+    player TEXT PRIMARY KEY,
+    quizzes INTEGER NOT NULL,
+    correct INTEGER NOT NULL,
+    questions INTEGER NOT NULL,
+    best_score INTEGER NOT NULL,
+    updated_at REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS players_leaderboard ON players (correct DESC, questions, updated_at);
+
+CREATE TRIGGER IF NOT EXISTS results_update_player AFTER INSERT ON results BEGIN
+    INSERT INTO players (player, quizzes, correct, questions, best_score, updated_at)
+    VALUES (NEW.player, 1, NEW.score, NEW.num_questions, NEW.score, NEW.created_at)
+    ON CONFLICT (player) DO UPDATE SET
+        quizzes = quizzes + 1,
+        correct = correct + NEW.score,
+        questions = questions + NEW.num_questions,
+        best_score = MAX(best_score, NEW.score),
+        updated_at = NEW.created_at;
+END;
+"""
+
+_INSERT = "INSERT OR IGNORE INTO results (player, score, num_questions, quiz, created_at) VALUES (?, ?, ?, ?, ?)"
+_LEADERBOARD = ("SELECT player, quizzes, correct, questions, best_score FROM players "
+                "ORDER BY correct DESC, questions, updated_at LIMIT ?")
+_HISTORY = "SELECT score, num_questions, quiz, created_at FROM results WHERE player = ? ORDER BY created_at DESC LIMIT ?"
+
+_shared_store = None
+_shared_store_lock = threading.Lock()
+
+
+def normalize_player(player: str) -> str:
+    """
+    Clean up a player name: collapse whitespace and cut it to MAX_PLAYER_LENGTH characters.
+
+    Parameters:
+    - player (str): The name as typed.
+
+    Returns:
+    - str: The cleaned name.
+
+    Raises:
+    - ValueError: If the name is empty.
+    """
+    player = " ".join(player.split())[:MAX_PLAYER_LENGTH]
+    if not player:
+        raise ValueError("Please enter a name")
+    return player
+
+
+class ResultsStore:
+    """
+    This ResultsStore class represents the persistent store of quiz results, with a background batch writer.
+
+    Attributes:
+    - path (str): The SQLite database path.
+    - batch_size (int): Results written per transaction, at most.
+    - batch_interval (float): Seconds the writer waits for more results before writing a batch.
+    - metrics (MetricsRegistry): Where query and batch times are recorded.
+
+    Methods:
+    - record(self, player, score, num_questions, quiz=None) -> bool: Queue a result to be written.
+    - flush(self, timeout=None) -> bool: Wait until every queued result is written.
+    - leaderboard(self, limit=10) -> list: The players with the most correct answers.
+    - history(self, player, limit=20) -> list: A player's newest results.
+    - stats(self) -> dict: Return queue and writer counters.
+    - close(self): Write the queued results and close the database.
+    """
+
+    def __init__(self, path: str = DEFAULT_RESULTS_PATH, batch_size: int = DEFAULT_BATCH_SIZE,
+                 batch_interval: float = DEFAULT_BATCH_INTERVAL, queue_size: int = DEFAULT_QUEUE_SIZE,
+                 readers: int = DEFAULT_READERS, metrics=None):
+        """
+        Constructor method. Creates the database if needed and starts the writer thread.
+
+        Parameters:
+        - path (str): The SQLite database path. It must be a file, as readers and the writer use separate connections.
+        - batch_size (int): Results written per transaction, at most.
+        - batch_interval (float): Seconds the writer waits for more results before writing a batch.
+        - queue_size (int): Results waiting to be written, at most.
+        - readers (int): Read connections kept open.
+        - metrics (MetricsRegistry): Where query and batch times are recorded. Defaults to the shared registry.
+        """
+        self.path = path
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        self.metrics = metrics if metrics is not None else get_shared_metrics()
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._readers = queue.LifoQueue(maxsize=readers)
+        self._lock = threading.Lock()
+        self._written = 0
+        self._duplicates = 0
+        self._dropped = 0
+        self._batches = 0
+        self._errors = 0
+        self._closed = False
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._writer_conn = self._connect()
+        self._writer_conn.execute("PRAGMA journal_mode = WAL")
+        self._writer_conn.executescript(_SCHEMA)
+
+        self._writer = threading.Thread(target=self._write_loop, name="results-writer", daemon=True)
+        self._writer.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        """
+        Open a connection to the database.
+
+        Returns:
+        - sqlite3.Connection: The connection. It may be used from any thread, by one thread at a time.
+        """
+        conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False, isolation_level=None)
+        # With WAL, NORMAL only syncs at checkpoints: the database stays consistent, a power cut may lose the last batch
+        conn.execute("PRAGMA synchronous = NORMAL")
+        return conn
+
+    def record(self, player: str, score: int, num_questions: int, quiz: str = None) -> bool:
+        """
+        Queue a result to be written by the writer thread. Never blocks.
+        A player's result for the same quiz token is only kept once.
+
+        Parameters:
+        - player (str): The player's name.
+        - score (int): The number of correct answers.
+        - num_questions (int): The number of questions in the quiz.
+        - quiz (str): The quiz token, if the quiz has one.
+
+        Returns:
+        - bool: True if queued, False if the queue is full and the result was dropped.
+
+        Raises:
+        - ValueError: If the player's name is empty.
+        - RuntimeError: If the store is closed.
+        """
+        if self._closed:
+            raise RuntimeError("The results store is closed")
+        try:
+            self._queue.put_nowait((normalize_player(player), score, num_questions, quiz, time.time()))
+        except queue.Full:
+            with self._lock:
+                self._dropped += 1
+            return False
+        return True
+
+    def flush(self, timeout: float = None) -> bool:
+        """
+        Wait until every result queued so far is written.
+
+        Parameters:
+        - timeout (float): Seconds to wait. None waits for as long as it takes.
+
+        Returns:
+        - bool: True if everything was written in time.
+        """
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def _write_loop(self):
+        """
+        Writer loop: wait for a result, gather whatever else arrives within batch_interval, and write it all at once.
+        A None in the queue stops the loop; an Event is set once everything queued before it is written.
+        """
+        while True:
+            item = self._queue.get()
+            batch, waiting, stop = [], [], False
+            deadline = time.monotonic() + self.batch_interval
+            while True:
+                if item is None:
+                    stop = True
+                elif isinstance(item, threading.Event):
+                    waiting.append(item)
+                else:
+                    batch.append(item)
+                if stop or waiting or len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get(timeout=max(0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+
+            if batch:
+                self._write_batch(batch)
+            for done in waiting:
+                done.set()
+            if stop:
+                return
+
+    def _write_batch(self, batch: list):
+        """
+        Write results in one transaction.
+
+        Parameters:
+        - batch (list): (player, score, num_questions, quiz, created_at) tuples.
+        """
+        try:
+            with self.metrics.time(RESULTS_QUERY_DURATION, query="write_batch"):
+                self._writer_conn.execute("BEGIN IMMEDIATE")
+                written = self._writer_conn.executemany(_INSERT, batch).rowcount  # not counting the trigger's rows
+                self._writer_conn.execute("COMMIT")
+        except sqlite3.Error:
+            if self._writer_conn.in_transaction:
+                self._writer_conn.execute("ROLLBACK")
+            with self._lock:
+                self._errors += 1
+            return
+
+        with self._lock:
+            self._batches += 1
+            self._written += written
+            self._duplicates += len(batch) - written
+
+    @contextmanager
+    def _reader(self):
+        """
+        Borrow a read connection, opening one if none is free.
+
+        Yields:
+        - sqlite3.Connection: The connection.
+        """
+        try:
+            conn = self._readers.get_nowait()
+        except queue.Empty:
+            conn = self._connect()
+            conn.execute("PRAGMA query_only = ON")
+        try:
+            yield conn
+        finally:
+            try:
+                self._readers.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+
+    def leaderboard(self, limit: int = 10) -> list:
+        """
+        Get the players with the most correct answers; fewer questions, then an earlier last result, break ties.
+
+        Parameters:
+        - limit (int): Number of players.
+
+        Returns:
+        - list: {"player", "quizzes", "correct", "questions", "best_score"} dicts, best first.
+        """
+        with self.metrics.time(RESULTS_QUERY_DURATION, query="leaderboard"), self._reader() as conn:
+            rows = conn.execute(_LEADERBOARD, (limit,)).fetchall()
+        return [{"player": player, "quizzes": quizzes, "correct": correct, "questions": questions, "best_score": best_score}
+                for player, quizzes, correct, questions, best_score in rows]
+
+    def history(self, player: str, limit: int = 20) -> list:
+        """
+        Get a player's newest results.
+
+        Parameters:
+        - player (str): The player's name.
+        - limit (int): Number of results.
+
+        Returns:
+        - list: {"score", "num_questions", "quiz", "created_at"} dicts, newest first.
+        """
+        try:
+            player = normalize_player(player)
+        except ValueError:
+            return []
+        with self.metrics.time(RESULTS_QUERY_DURATION, query="history"), self._reader() as conn:
+            rows = conn.execute(_HISTORY, (player, limit)).fetchall()
+        return [{"score": score, "num_questions": num_questions, "quiz": quiz, "created_at": created_at}
+                for score, num_questions, quiz, created_at in rows]
+
+    def stats(self) -> dict:
+        """
+        Return the writer counters.
+
+        Returns:
+        - dict: queued, written, duplicates, dropped, batches and errors.
+        """
+        with self._lock:
+            return {"queued": self._queue.qsize(), "written": self._written, "duplicates": self._duplicates,
+                    "dropped": self._dropped, "batches": self._batches, "errors": self._errors}
+
+    def close(self):
+        """
+        Write the queued results, stop the writer thread and close every connection.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._writer.join()
+        self._writer_conn.close()
+        while True:
+            try:
+                self._readers.get_nowait().close()
+            except queue.Empty:
+                break
+
+    def __str__(self):
+        """
+        Returns a string representation of the ResultsStore instance.
+        """
+        return f"ResultsStore(path={self.path}, batch_size={self.batch_size}, batch_interval={self.batch_interval})"
+
+
+def get_shared_results_store() -> ResultsStore:
+    """
+    Get the process-wide ResultsStore, creating it on first use.
+
+    Returns:
+    - ResultsStore: The shared store.
+    """
+    global _shared_store
+    with _shared_store_lock:
+        if _shared_store is None:
+            _shared_store = ResultsStore()
+        return _shared_store
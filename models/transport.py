@@ -0,0 +1,315 @@
+"""
+Yue Yu
+CS 5001, Fall 2023
+Final Project -- models.transport
+
+This program contains the transports ArtistInfo sends its HTTP requests through.
+A transport has the same get(url, timeout=...) method as requests.Session and returns requests.Response objects,
+so the rest of the code does not care whether a response came from MusicBrainz, memory or a recording.
+
+- LiveTransport: sends requests over a pooled session.
+- FakeTransport: answers from in-memory responses, for tests.
+- RecordingTransport: sends requests through another transport and saves every response to a file.
+- ReplayTransport: answers from a recording, with no network, for reproducible load tests and an offline demo.
+
+Set MUSICMUSTARD_RECORD=<path> or MUSICMUSTARD_REPLAY=<path> to record or replay the app's MusicBrainz traffic.
+"""
+
+import gzip
+import json
+import os
+import threading
+import time
+from datetime import timedelta
+import requests
+from models.http_session import get_shared_session
+
+RECORDING_VERSION = 2
+
+_shared_transport = None
+_shared_transport_lock = threading.Lock()
+
+
+def make_response(url: str, status_code: int = 200, content: bytes = b"", headers: dict = None, elapsed: float = 0.0) -> requests.Response:
+    """
+    Build a requests.Response without sending a request.
+
+    Parameters:
+    - url (str): The request URL.
+    - status_code (int): The HTTP status code.
+    - content (bytes): The response body.
+    - headers (dict): The response headers.
+    - elapsed (float): Seconds the response took.
+
+    Returns:
+    - requests.Response: The response.
+    """
+    response = requests.Response()
+    response.url = url
+    response.status_code = status_code
+    response._content = content
+    response.headers.update(headers or {"Content-Type": "application/json"})
+    response.encoding = "utf-8"
+    response.elapsed = timedelta(seconds=elapsed)
+    return response
+
+
+class Transport:
+    """
+    This Transport class represents the interface every transport implements.
+
+    Attributes:
+    - remote (bool): Whether requests reach a remote server, and so should be rate limited.
+
+    Methods:
+    - get(self, url, timeout=None) -> requests.Response: Send a GET request.
+    """
+
+    remote = True
+
+    def get(self, url: str, timeout=None) -> requests.Response:
+        """
+        Send a GET request.
+
+        Parameters:
+        - url (str): The URL to fetch.
+        - timeout (float or tuple): The request timeout.
+
+        Returns:
+        - requests.Response: The response.
+
+        Raises:
+        - requests.exceptions.RequestException: If the request fails.
+        """
+        raise NotImplementedError
+
+
+class LiveTransport(Transport):
+    """
+    This LiveTransport class represents a transport that sends requests over a requests.Session.
+
+    Attributes:
+    - session (requests.Session): The session requests are sent over.
+    """
+
+    def __init__(self, session: requests.Session = None):
+        """
+        Constructor method.
+
+        Parameters:
+        - session (requests.Session): The session to use. Defaults to the process-wide pooled session.
+        """
+        self.session = session if session is not None else get_shared_session()
+
+    def get(self, url: str, timeout=None) -> requests.Response:
+        return self.session.get(url, timeout=timeout)
+
+
+class FakeTransport(Transport):
+    """
+    This FakeTransport class represents an in-memory transport for tests.
+
+    Responses are looked up by exact URL, then handed to the fallback handler; anything else is a 404.
+
+    Attributes:
+    - responses (dict): URL mapped to a (status code, JSON body) tuple, or to an exception to raise.
+    - handler (callable): Fallback handler(url) returning a (status code, JSON body) tuple, or None.
+    - latency (float): Seconds every response is delayed by.
+    - calls (list): Every URL requested, in order.
+
+    Methods:
+    - add(self, url, body=None, status_code=200): Register a response.
+    - get(self, url, timeout=None) -> requests.Response: Answer a GET request.
+    """
+
+    remote = False
+
+    def __init__(self, responses: dict = None, handler=None, latency: float = 0.0):
+        """
+        Constructor method.
+
+        Parameters:
+        - responses (dict): URL mapped to a (status code, JSON body) tuple, or to an exception to raise.
+        - handler (callable): Fallback handler(url) returning a (status code, JSON body) tuple, or None.
+        - latency (float): Seconds every response is delayed by.
+        """
+        self.responses = dict(responses or {})
+        self.handler = handler
+        self.latency = latency
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def add(self, url: str, body=None, status_code: int = 200):
+        """
+        Register a response, or an exception to raise, for a URL.
+
+        Parameters:
+        - url (str): The exact request URL.
+        - body (object): The JSON body, or an exception instance.
+        - status_code (int): The HTTP status code.
+        """
+        self.responses[url] = body if isinstance(body, Exception) else (status_code, body)
+
+    def get(self, url: str, timeout=None) -> requests.Response:
+        with self._lock:
+            self.calls.append(url)
+        if self.latency:
+            time.sleep(self.latency)
+
+        answer = self.responses.get(url)
+        if answer is None and self.handler is not None:
+            answer = self.handler(url)
+        if answer is None:
+            answer = (404, {"error": "Not Found"})
+        if isinstance(answer, Exception):
+            raise answer
+        status_code, body = answer
+        return make_response(url, status_code, json.dumps(body).encode("utf-8"), elapsed=self.latency)
+
+
+class RecordingTransport(Transport):
+    """
+    This RecordingTransport class represents a transport that saves every response it passes on.
+
+    Recordings are gzip-compressed JSON lines: a {"version": ...} header, then one line per response with its URL,
+    status code, content type, body and elapsed time. Each response is appended to the file as its own small gzip
+    member, so recording costs the same however long the file has grown. Failed requests (exceptions) are not recorded.
+
+    Attributes:
+    - inner (Transport): The transport requests are sent through.
+    - path (str): The recording file, appended to after every response.
+    """
+
+    def __init__(self, path: str, inner: Transport = None):
+        """
+        Constructor method.
+
+        Parameters:
+        - path (str): The recording file. Responses already in it are kept.
+        - inner (Transport): The transport to send requests through. Defaults to a LiveTransport.
+        """
+        self.path = path
+        self.inner = inner if inner is not None else LiveTransport()
+        self.remote = self.inner.remote
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            load_recording(path)  # only appends to a recording of the current version
+        else:
+            append_recording(path, [{"version": RECORDING_VERSION}])
+
+    def get(self, url: str, timeout=None) -> requests.Response:
+        start = time.perf_counter()
+        response = self.inner.get(url, timeout=timeout)
+        entry = {
+            "url": url,
+            "status": response.status_code,
+            "content_type": response.headers.get("Content-Type", "application/json"),
+            "body": response.content.decode("utf-8", errors="replace"),
+            "elapsed": round(time.perf_counter() - start, 4),
+        }
+        with self._lock:
+            append_recording(self.path, [entry])
+        return response
+
+
+class ReplayTransport(Transport):
+    """
+    This ReplayTransport class represents a transport that answers from a recording, without the network.
+
+    Attributes:
+    - path (str): The recording file.
+    - latency (float or str): Seconds every response is delayed by, "recorded" to reproduce the recorded
+      elapsed times, or None for no delay.
+    - misses (int): Number of requests with no recorded response.
+    """
+
+    remote = False
+
+    def __init__(self, path: str, latency=None):
+        """
+        Constructor method.
+
+        Parameters:
+        - path (str): The recording file.
+        - latency (float or str): Fixed delay in seconds, "recorded", or None for no delay.
+        """
+        self.path = path
+        self.latency = latency
+        self.misses = 0
+        self._entries = load_recording(path)
+
+    def get(self, url: str, timeout=None) -> requests.Response:
+        entry = self._entries.get(url)
+        if entry is None:
+            self.misses += 1
+            raise requests.exceptions.ConnectionError(f"No recorded response for {url}")
+
+        delay = entry["elapsed"] if self.latency == "recorded" else self.latency or 0.0
+        if delay:
+            time.sleep(delay)
+        return make_response(url, entry["status"], entry["body"].encode("utf-8"), {"Content-Type": entry["content_type"]}, delay)
+
+
+def load_recording(path: str) -> dict:
+    """
+    Read a recording file. A later response for the same URL replaces an earlier one, and a response cut
+    short by a crash while recording is ignored.
+
+    Parameters:
+    - path (str): The recording file.
+
+    Returns:
+    - dict: URL mapped to its recorded response.
+
+    Raises:
+    - ValueError: If the file is not a recording of a supported version.
+    """
+    entries = {}
+    with gzip.open(path, "rt", encoding="utf-8") as recording_file:
+        header = json.loads(recording_file.readline() or "{}")
+        if header.get("version") != RECORDING_VERSION:
+            raise ValueError(f"{path} is not a version {RECORDING_VERSION} recording")
+        try:
+            for line in recording_file:
+                entry = json.loads(line)
+                entries[entry.pop("url")] = entry
+        except EOFError:
+            pass  # the last gzip member was cut short
+    return entries
+
+
+def append_recording(path: str, lines: list):
+    """
+    Append lines to a recording file as a new gzip member; gzip readers read the members as one stream.
+
+    Parameters:
+    - path (str): The recording file.
+    - lines (list): The dicts to write, one JSON line each.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with gzip.open(path, "at", encoding="utf-8") as recording_file:
+        recording_file.write("".join(json.dumps(line, separators=(",", ":"), sort_keys=True) + "\n" for line in lines))
+
+
+def get_shared_transport() -> Transport:
+    """
+    Get the process-wide transport, creating it on first use.
+
+    MUSICMUSTARD_REPLAY=<path> replays a recording, MUSICMUSTARD_RECORD=<path> records live traffic,
+    and otherwise requests go over the shared pooled session.
+
+    Returns:
+    - Transport: The shared transport.
+    """
+    global _shared_transport
+    with _shared_transport_lock:
+        if _shared_transport is None:
+            if os.environ.get("MUSICMUSTARD_REPLAY"):
+                _shared_transport = ReplayTransport(os.environ["MUSICMUSTARD_REPLAY"])
+            elif os.environ.get("MUSICMUSTARD_RECORD"):
+                _shared_transport = RecordingTransport(os.environ["MUSICMUSTARD_RECORD"])
+            else:
+                _shared_transport = LiveTransport()
+        return _shared_transport
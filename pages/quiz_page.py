@@ -10,9 +10,8 @@ It contains a key feature: Music Quiz.
 
 import streamlit as st
 import random
-from models.artist_info import ArtistInfo
-from models.artist_quiz import ArtistQuiz
-from helpers import display_header, display_animation, display_page_title, redirect_link_with_data, display_link
+from helpers import display_header, display_animation, render_pending_animations, display_page_title, redirect_link_with_data, display_link, get_quiz_builder, rerun_timer, escape_markdown
+from models.profiling import profile_run
 
 
 # 1. Initialize the Page:
@@ -27,8 +26,10 @@ def initialize_quiz_page():
     # Initialize session state if not present
     if "quiz_started" not in st.session_state:
         st.session_state.quiz_started = False
+    if "quiz_token" not in st.session_state:
+        st.session_state.quiz_token = None  # a random mode quiz is kept in the session by its token only
     if "questions" not in st.session_state:
-        st.session_state.questions = []
+        st.session_state.questions = []  # personal mode questions, which cannot be rebuilt from a token
     if "user_answers" not in st.session_state:
         st.session_state.user_answers = [None] * 3  # only display 3 questions
 
@@ -40,6 +41,9 @@ def take_music_quiz():
     """
     quiz_mode = st.radio("✅Select Quiz Mode:", ["🤔 Random Mode", "🥰 Personal Mode"])
 
+    if not st.session_state.quiz_started:
+        load_shared_quiz()
+
     if not st.session_state.quiz_started:
         start_quiz(quiz_mode)
 
@@ -48,6 +52,29 @@ def take_music_quiz():
 
 
 # (1) Before quiz starts
+def load_shared_quiz():
+    """
+    Start the random mode quiz given by the "quiz" query parameter of a shared link, if there is one.
+    """
+    token = st.experimental_get_query_params().get("quiz", [None])[0]
+    if token is None or token == st.session_state.get("shared_quiz_token"):
+        return
+    st.session_state.shared_quiz_token = token  # a link is only loaded once, so the user can start another quiz
+
+    from models.quiz_token import QuizTokenError
+
+    try:
+        questions = get_quiz_builder().load_quiz(token)
+    except QuizTokenError as error:
+        st.warning(f"The shared quiz could not be loaded: {error}")
+        return
+
+    st.session_state.quiz_token = token
+    st.session_state.questions = []
+    st.session_state.user_answers = [None] * len(questions)
+    st.session_state.quiz_started = True
+
+
 def start_quiz(quiz_mode: str):
     """
     Start the quiz based on the selected mode.
@@ -69,12 +96,11 @@ def start_random_mode_quiz():
     """
     if st.button("💪 I am ready!"):
         st.caption("Please wait a sec. Generating Quiz...")
-        st.session_state.quiz_started = True
 
-        for _ in range(3):
-            artist_quiz = ArtistQuiz()
-            current_artist, options, correct_answer = artist_quiz.generate_question_random_mode()
-            st.session_state.questions.append({"artist": current_artist, "options": options, "correct_answer": correct_answer})
+        # All three questions are generated at once on the shared thread pool
+        quiz_builder = get_quiz_builder()
+        results = quiz_builder.build_random_mode(3)
+        store_quiz_questions(results, quiz_builder.quiz_token(results))
 
 
 # Personal mode quiz initialization
@@ -128,22 +154,54 @@ def generate_quiz_questions(chosen_artists: list):
     Parameters:
     - chosen_artists (list): A list of artists input chosen for the quiz.
     """
-    artist_info = ArtistInfo()
-    artist_quiz = ArtistQuiz()
+    # Imported here rather than at the top, so a page run that builds no quiz does not load the quiz models
+    from models.quiz_builder import ArtistNotFoundError
+
+    # Each distinct artist is looked up once and the questions are built from the fetched works
+    results = get_quiz_builder().build_personal_mode(chosen_artists)
+
+    if any(isinstance(result.error, ArtistNotFoundError) for result in results):
+        st.warning("Invalid Artist's Name Detected! Please Try Again!")
+        st.session_state.quiz_started = False
+        return
+
+    store_quiz_questions(results)
+
+
+# Store the built questions, or report the ones that failed
+def store_quiz_questions(results: list, token: str = None):
+    """
+    Store built quiz questions in the session state and start the quiz if every question was built.
+
+    Parameters:
+    - results (list): QuestionResult objects in question order.
+    - token (str): The quiz token of a random mode quiz. Only the token is stored for such a quiz.
+    """
+    failed = [result for result in results if not result.ok]
+    if failed:
+        for result in failed:
+            st.warning(f"Question {result.index + 1} could not be generated: {escape_markdown(result.error)}")
+        st.warning("Please Try Again!")
+        st.session_state.quiz_started = False
+        return
+
+    st.session_state.quiz_token = token
+    st.session_state.questions = [] if token is not None else [result.question for result in results]
+    st.session_state.user_answers = [None] * len(results)
+    st.session_state.quiz_started = True
 
-    for artist in chosen_artists:
-        artist_id = artist_info.fetch_artist_id(artist)
-        artist_works = artist_info.fetch_artist_works(artist_id)
 
-        if artist_id and artist_works:
-            options, correct_answer = artist_quiz.generate_question_personal_mode(artist)
-            st.session_state.questions.append({"artist": artist, "options": options, "correct_answer": correct_answer})
-            st.session_state.quiz_started = True
+# Get the questions of the current quiz
+def current_questions() -> list:
+    """
+    Get the questions of the current quiz, from the quiz builder's shared cache for a random mode quiz.
 
-        else:
-            st.warning("Invalid Artist's Name Detected! Please Try Again!")
-            st.session_state.quiz_started = False
-            break
+    Returns:
+    - list: The questions, as dicts with artist, options and correct_answer.
+    """
+    if st.session_state.quiz_token is None:
+        return st.session_state.questions
+    return get_quiz_builder().load_quiz(st.session_state.quiz_token)
 
 
 # (2) After quiz starts, display questions
@@ -151,14 +209,33 @@ def display_quiz_questions():
     """
     Display quiz questions after the quiz has started.
     """
-    for i, question in enumerate(st.session_state.questions, start=1):
-        display_question(i, question)
+    from models.quiz_token import QuizTokenError
 
-    if st.button("🤫Cheatsheet"):
-        display_cheatsheet()
+    try:
+        questions = current_questions()
+    except QuizTokenError as error:
+        st.warning(f"This quiz could not be loaded: {error}. Please take a new one!")
+        st.session_state.quiz_started = False
+        st.session_state.quiz_token = None
+        return
 
-    if st.button("🎈Submit"):
-        submit_quiz()
+    # Inside a form, choosing an answer is handled by the browser and does not rerun the page;
+    # the answers are sent to the server together when one of the form's buttons is clicked
+    with st.form("quiz_form"):
+        for i, question in enumerate(questions, start=1):
+            display_question(i, question)
+
+        show_cheatsheet = st.form_submit_button("🤫Cheatsheet")
+        submitted = st.form_submit_button("🎈Submit")
+
+    if show_cheatsheet:
+        display_cheatsheet(questions)
+
+    if st.session_state.quiz_token is not None:
+        display_share_link(st.session_state.quiz_token)
+
+    if submitted:
+        submit_quiz(questions)
 
 
 # Display individual quiz question
@@ -171,50 +248,71 @@ def display_question(question_number: int, question: dict):
     - question (dict): Dictionary containing question details (artist, options, correct_answer).
     """
     st.header(f"Question {question_number}")
-    st.subheader(f"{question['artist']} released:")
-
-    for j, option in enumerate(question['options'], start=1):
-        if j == 1:
-            j = "A. "
-        elif j == 2:
-            j = "B. "
-        elif j == 3:
-            j = "C. "
-        st.write(f"{j}{option}")
-
-    user_answer = st.radio(f"Your choice for Question {question_number}:", question['options'], format_func=lambda x: str(x), key=f"question_{question_number}")  # ensures that options are all converted to strings before being displayed as radio button labels
+    st.subheader(f"{escape_markdown(question['artist'])} released:")
+
+    # One element for all options keeps reruns of long quizzes cheap; titles are escaped so they show as typed
+    st.markdown("  \n".join(f"{letter}. {escape_markdown(option)}" for letter, option in zip("ABC", question['options'])))
+
+    user_answer = st.radio(f"Your choice for Question {question_number}:", question['options'], format_func=escape_markdown, key=f"question_{question_number}")  # radio labels are Markdown too
     st.session_state.user_answers[question_number - 1] = user_answer  # e.g. the first question's answer would be at index 0
 
 
 # Display the cheatsheet
-def display_cheatsheet():
+def display_cheatsheet(questions: list):
     """
     Display the cheatsheet with correct answers.
+
+    Parameters:
+    - questions (list): The questions of the quiz.
     """
     st.title("Hush! This is a cheatsheet 😃")
-    for i, question in enumerate(st.session_state.questions, start=1):
+    for i, question in enumerate(questions, start=1):
         st.write(f"Question {i}")
-        st.caption(f"Correct Answer: {question['correct_answer']}")
+        st.caption(f"Correct Answer: {escape_markdown(question['correct_answer'])}")
         st.write("---")
 
 
+# Display the link to share a random mode quiz
+def display_share_link(token: str):
+    """
+    Display a link that opens the same quiz for someone else.
+
+    Parameters:
+    - token (str): The quiz token.
+    """
+    st.caption("🔗 Challenge a friend with the same questions:")
+    redirect_link_with_data("/quiz_page", "Share this quiz", {"quiz": token})
+
+
 # Submit the quiz and calculate score
-def submit_quiz():
+def submit_quiz(questions: list):
     """
-    Submit the quiz and calculate the score.
+    Submit the quiz. A random mode quiz is sent as its token and the answers, and graded by the result page;
+    a personal mode quiz is graded here.
+
+    Parameters:
+    - questions (list): The questions of the quiz.
     """
     st.balloons()
     st.session_state.page = "quiz_result"
 
-    answer_question_pairs = zip(st.session_state.user_answers, st.session_state.questions)
+    next_page_url = "/quiz_result"
+    link_text = "🥳 Quiz Result"
+
+    if st.session_state.quiz_token is not None:
+        from models.quiz_token import encode_answers
+
+        data_to_pass = {"quiz": st.session_state.quiz_token, "answers": encode_answers(questions, st.session_state.user_answers)}
+        redirect_link_with_data(next_page_url, link_text, data_to_pass)
+        return
+
+    answer_question_pairs = zip(st.session_state.user_answers, questions)
 
     total_score = 0
     for user_answer, question in answer_question_pairs:
         if user_answer == question['correct_answer']:
             total_score += 1
 
-    next_page_url = "/quiz_result"
-    link_text = "🥳 Quiz Result"
     data_to_pass = {"score": total_score}
     redirect_link_with_data(next_page_url, link_text, data_to_pass)
 
@@ -234,9 +332,12 @@ def quiz_page():
     """
     This is the main function of quiz_page.
     """
-    initialize_quiz_page()
-    take_music_quiz()
-    navigate_to_other_pages()
+    with profile_run("quiz_page"):
+        with rerun_timer("Quiz page"):
+            initialize_quiz_page()
+            take_music_quiz()
+            navigate_to_other_pages()
+        render_pending_animations()
 
 
 quiz_page()
@@ -7,8 +7,9 @@ This program represents the result page of MusicMustard web application.
 It contains a key feature: Quiz Result.
 '''
 
+import time
 import streamlit as st
-from helpers import display_header, display_animation, display_page_title, display_link
+from helpers import display_header, display_animation, render_pending_animations, display_page_title, display_link, get_quiz_builder, get_results_store, escape_markdown
 
 
 # 1. Initialize the Page:
@@ -24,23 +25,98 @@ def initialize_result_page():
 # 2. Key Feature: Quiz Result
 def display_quiz_result():
     """
-    Display the quiz result based on the score retrieved from the URL parameters.
+    Display the quiz result based on the URL parameters: a random mode quiz's token and answers,
+    which are graded here, or the score of a personal mode quiz.
     """
     params = st.experimental_get_query_params()
 
-    if "score" in params:
+    if "quiz" in params and "answers" in params:
+        from models.quiz_token import QuizTokenError, grade_answers
 
-        score = int(params["score"][0])
+        try:
+            questions = get_quiz_builder().load_quiz(params["quiz"][0])
+        except QuizTokenError as error:
+            st.warning(f"This quiz could not be graded: {error}")
+            return
+        score = grade_answers(questions, params["answers"][0])
+        display_score(score, len(questions))
+        save_result(params["quiz"][0], score, len(questions))
+
+    elif "score" in params:
 
-        if score != 0:
-            st.success(f"Congratulations! You were correct in {score}/3 questions!")
-        st.subheader(f"Your latest score is {score}!")
+        score = int(params["score"][0])
+        display_score(score, 3)
 
     else:
         st.warning("You haven't taken the quiz yet. Take a quiz to see your result.")
 
 
-# 3. Navigate to Other Pages
+def display_score(score: int, num_questions: int):
+    """
+    Display a score.
+
+    Parameters:
+    - score (int): The number of correct answers.
+    - num_questions (int): The number of questions in the quiz.
+    """
+    if score != 0:
+        st.success(f"Congratulations! You were correct in {score}/{num_questions} questions!")
+    st.subheader(f"Your latest score is {score}!")
+
+
+def save_result(token: str, score: int, num_questions: int):
+    """
+    Let the user save a graded result to the leaderboard under their name.
+    Only quizzes graded here are saved, and a name's result for a quiz is only kept once.
+
+    Parameters:
+    - token (str): The quiz token.
+    - score (int): The number of correct answers.
+    - num_questions (int): The number of questions in the quiz.
+    """
+    with st.form("save_result_form"):
+        player = st.text_input("Your name for the leaderboard:", value=st.session_state.get("player", ""), max_chars=30)
+        saved = st.form_submit_button("🏆 Save my score")
+
+    if saved:
+        try:
+            # The result is written by the store's background thread, so saving never waits for the database
+            queued = get_results_store().record(player, score, num_questions, quiz=token)
+        except ValueError as error:
+            st.warning(str(error))
+            return
+        st.session_state.player = player
+        if queued:
+            st.success("Saved! Your score will be on the leaderboard in a moment.")
+        else:
+            st.warning("Too many scores are being saved right now. Please try again!")
+
+
+# 3. Leaderboard and History
+def display_leaderboard():
+    """
+    Display the players with the most correct answers, and the latest scores of the player who saved last.
+    """
+    results_store = get_results_store()
+
+    st.markdown("---")
+    st.subheader("🏆 Leaderboard")
+    leaders = results_store.leaderboard(limit=10)
+    if leaders:
+        st.table([{"Player": leader["player"], "Correct answers": f"{leader['correct']}/{leader['questions']}", "Quizzes": leader["quizzes"]}
+                  for leader in leaders])
+    else:
+        st.caption("No scores saved yet. Be the first!")
+
+    player = st.session_state.get("player")
+    history = results_store.history(player, limit=10) if player else []
+    if history:
+        st.subheader(f"{escape_markdown(player)}'s latest scores")
+        st.table([{"Score": f"{result['score']}/{result['num_questions']}", "Date": time.strftime("%Y-%m-%d %H:%M", time.localtime(result["created_at"]))}
+                  for result in history])
+
+
+# 4. Navigate to Other Pages
 def navigate_to_other_pages():
     """
     Navigate to other pages with links to the quiz.
@@ -57,7 +133,9 @@ def result_page():
     """
     initialize_result_page()
     display_quiz_result()
+    display_leaderboard()
     navigate_to_other_pages()
+    render_pending_animations()
 
 
 result_page()
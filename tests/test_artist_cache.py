@@ -0,0 +1,131 @@
+'''
+Yue Yu
+CS 5001, Fall 2023
+Final Project -- test.test_artist_cache
+
+This program contains pytest for models.artist_cache.
+'''
+
+import time
+import pytest
+from models.artist_cache import LRUCache, SQLiteCache, TwoTierCache
+
+
+@pytest.fixture
+def lru():
+    return LRUCache(maxsize=2, default_ttl=60)
+
+
+@pytest.fixture
+def disk(tmp_path):
+    cache = SQLiteCache(str(tmp_path / "cache.sqlite3"), max_entries=2)
+    yield cache
+    cache.close()
+
+
+def test_lru_hit_and_miss(lru):
+    lru.set("a", 1)
+    assert lru.get("a") == (True, 1)
+    assert lru.get("b") == (False, None)
+    assert lru.stats()["hits"] == 1
+    assert lru.stats()["misses"] == 1
+
+
+def test_lru_evicts_least_recently_used(lru):
+    lru.set("a", 1)
+    lru.set("b", 2)
+    lru.get("a")
+    lru.set("c", 3)
+    assert lru.get("b") == (False, None)
+    assert lru.get("a") == (True, 1)
+    assert lru.stats()["evictions"] == 1
+
+
+def test_lru_ttl_expiry(lru):
+    lru.set("a", 1, ttl=-1)
+    assert lru.get("a") == (False, None)
+
+
+def test_sqlite_roundtrip(disk):
+    disk.set("works", ["Song 1", "Song 2"])
+    assert disk.get("works") == (True, ["Song 1", "Song 2"])
+
+
+def test_sqlite_ttl_expiry(disk):
+    disk.set("a", 1, ttl=-1)
+    assert disk.get("a") == (False, None)
+    assert disk.get("a", allow_stale=True) == (True, 1)
+    disk.purge_expired()
+    assert disk.stats()["size"] == 0
+
+
+def test_two_tier_get_stale(disk):
+    cache = TwoTierCache(LRUCache(), disk)
+    cache.set("a", 1, ttl=-1)
+    assert cache.get("a") == (False, None)
+    assert cache.get_stale("a") == (True, 1)
+
+
+def test_sqlite_size_eviction(disk):
+    disk.set("a", 1)
+    time.sleep(0.01)
+    disk.set("b", 2)
+    time.sleep(0.01)
+    disk.set("c", 3)
+    assert disk.stats()["size"] == 2
+    assert disk.get("a") == (False, None)
+
+
+def test_sqlite_survives_reopen(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    first = SQLiteCache(path)
+    first.set("artist_id:Oasis", "123")
+    first.close()
+    second = SQLiteCache(path)
+    assert second.get("artist_id:Oasis") == (True, "123")
+    second.close()
+
+
+def test_two_tier_promotes_disk_hits(disk):
+    cache = TwoTierCache(LRUCache(), disk)
+    disk.set("a", 1)
+    assert cache.get("a") == (True, 1)
+    assert cache.memory.get("a") == (True, 1)
+
+
+def test_two_tier_memory_only():
+    cache = TwoTierCache()
+    cache.set("a", 1)
+    assert cache.get("a") == (True, 1)
+    assert cache.stats()["disk"] is None
+
+
+def test_two_tier_promotes_with_remaining_ttl(disk):
+    cache = TwoTierCache(LRUCache(default_ttl=3600), disk)
+    disk.set("negative", None, ttl=0.05)
+    assert cache.get("negative") == (True, None)
+    time.sleep(0.06)
+    assert cache.memory.get("negative") == (False, None)
+
+
+def test_sqlite_batches_access_times(disk):
+    disk.set("a", 1)
+    time.sleep(0.01)
+    disk.set("b", 2)
+    # Reading "a" makes it the most recently used, even before its access time is written
+    assert disk.get("a") == (True, 1)
+    assert disk._conn.execute("SELECT accessed_at FROM cache WHERE key = 'a'").fetchone()[0] < \
+        disk._conn.execute("SELECT accessed_at FROM cache WHERE key = 'b'").fetchone()[0]
+    disk.set("c", 3)
+    assert disk.get("b") == (False, None)
+    assert disk.get("a") == (True, 1)
+    assert disk.stats()["size"] == 2
+
+
+def test_sqlite_tracks_size(disk):
+    disk.set("a", 1)
+    disk.set("a", 2)
+    assert disk.stats()["size"] == 1
+    disk.delete("a")
+    disk.delete("missing")
+    assert disk.stats()["size"] == 0
@@ -0,0 +1,208 @@
+'''
+Yue Yu
+CS 5001, Fall 2023
+Final Project -- test.test_artist_catalog
+
+This program contains pytest for models.artist_catalog.
+'''
+
+import os
+import random
+import re
+import pytest
+from models.artist_catalog import (ArtistCatalog, CatalogEntry, build_alias_table, build_catalog, read_catalog, write_catalog,
+                                   DEFAULT_CATALOG_PATH)
+from models.artist_info import ArtistInfo
+from models.distractor_engine import DistractorEngine
+from models.random_mode_artists import random_mode_artists
+from models.transport import FakeTransport
+
+ENTRIES = [
+    CatalogEntry("Slowdive", "7a2a4e8c-0000-0000-0000-000000000001", 3, ["rock", "shoegaze"]),
+    CatalogEntry("Oasis", "7a2a4e8c-0000-0000-0000-000000000002", 1, ["rock", "britpop"]),
+    CatalogEntry("Pulp", None, 1, ["rock", "britpop"]),
+]
+
+
+@pytest.fixture
+def catalog_path(tmp_path):
+    path = str(tmp_path / "artist_catalog.tsv")
+    write_catalog(path, ENTRIES)
+    return path
+
+
+def test_write_and_read_round_trip(catalog_path):
+    assert read_catalog(catalog_path) == ENTRIES
+    catalog = ArtistCatalog.load(catalog_path)
+    assert catalog.names == ("Slowdive", "Oasis", "Pulp")
+    assert catalog.artist_id("Oasis") == ENTRIES[1].mbid
+    assert catalog.artist_id("Pulp") is None
+    assert catalog.artist_id("Blur") is None
+    assert catalog.tags("Slowdive") == ("rock", "shoegaze")
+    assert catalog.with_tag("britpop") == ["Oasis", "Pulp"]
+    assert "Pulp" in catalog and "Blur" not in catalog
+
+
+def test_version_depends_on_contents(tmp_path):
+    first = write_catalog(str(tmp_path / "a.tsv"), ENTRIES)
+    assert write_catalog(str(tmp_path / "b.tsv"), ENTRIES) == first
+    assert write_catalog(str(tmp_path / "c.tsv"), ENTRIES[:2]) != first
+    assert ArtistCatalog.load(str(tmp_path / "a.tsv")).version == first
+
+
+def test_malformed_line_is_reported(tmp_path):
+    path = tmp_path / "bad.tsv"
+    path.write_text("# name\tmbid\tweight\ttags\nOasis\t\t1\n", encoding="utf-8")
+    with pytest.raises(ValueError, match="bad.tsv:2"):
+        read_catalog(str(path))
+
+
+def test_choice_excludes_current_artist():
+    catalog = ArtistCatalog.from_names(["A", "B"])
+    rng = random.Random(1)
+    assert {catalog.choice(rng, exclude="A") for _ in range(50)} == {"B"}
+    assert {catalog.choice(rng, exclude="A", weighted=True) for _ in range(50)} == {"B"}
+    with pytest.raises(ValueError):
+        ArtistCatalog.from_names(["A"]).choice(rng, exclude="A")
+
+
+def test_sample_is_distinct_and_uniform():
+    catalog = ArtistCatalog.from_names([f"Artist {number}" for number in range(10)])
+    rng = random.Random(2)
+    counts = {name: 0 for name in catalog.names}
+    for _ in range(5000):
+        drawn = catalog.sample(3, rng, exclude=("Artist 0",))
+        assert len(set(drawn)) == 3 and "Artist 0" not in drawn
+        for name in drawn:
+            counts[name] += 1
+    assert counts["Artist 0"] == 0
+    assert all(abs(count / 15000 - 1 / 9) < 0.02 for name, count in counts.items() if name != "Artist 0")
+    with pytest.raises(ValueError):
+        catalog.sample(10, rng, exclude=("Artist 0",))
+
+
+def test_weighted_choice_follows_weights():
+    catalog = ArtistCatalog(ENTRIES)
+    rng = random.Random(3)
+    draws = [catalog.choice(rng, weighted=True) for _ in range(20000)]
+    assert draws.count("Slowdive") / len(draws) == pytest.approx(0.6, abs=0.02)
+    excluded = [catalog.choice(rng, exclude="Slowdive", weighted=True) for _ in range(2000)]
+    assert "Slowdive" not in excluded
+
+
+def test_alias_table_is_exact():
+    weights = [5, 1, 1, 3, 0.5]
+    probability, alias = build_alias_table(weights)
+    size = len(weights)
+    implied = [probability[i] / size for i in range(size)]
+    for i in range(size):
+        implied[alias[i]] += (1 - probability[i]) / size
+    assert implied == pytest.approx([weight / sum(weights) for weight in weights])
+
+
+def test_reload_picks_up_changes(catalog_path):
+    catalog = ArtistCatalog.load(catalog_path, reload_interval=0)
+    old_version = catalog.version
+    write_catalog(catalog_path, ENTRIES + [CatalogEntry("Blur", None, 1, ["britpop"])])
+    assert "Blur" in catalog
+    assert catalog.version != old_version
+    assert catalog.stats()["reloads"] == 1
+
+
+def test_reload_keeps_serving_after_a_bad_file(catalog_path):
+    catalog = ArtistCatalog.load(catalog_path, reload_interval=0)
+    with open(catalog_path, "w", encoding="utf-8") as catalog_file:
+        catalog_file.write("not a catalog\n")
+    assert catalog.names == ("Slowdive", "Oasis", "Pulp")
+
+
+def test_reload_waits_for_interval(catalog_path):
+    catalog = ArtistCatalog.load(catalog_path, reload_interval=60)
+    write_catalog(catalog_path, ENTRIES[:2])
+    assert len(catalog) == 3
+    assert catalog.reload()
+    assert len(catalog) == 2
+
+
+def test_shipped_catalog_matches_seed_list():
+    catalog = ArtistCatalog.load(DEFAULT_CATALOG_PATH)
+    assert list(catalog.names) == random_mode_artists
+    assert catalog.with_tag("rock") == random_mode_artists
+
+
+def test_shipped_catalog_mbids_are_well_formed():
+    # An empty MBID is resolved by name at run time; a filled-in one must be a MusicBrainz UUID
+    mbid = re.compile(r"^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$")
+    assert [entry.name for entry in read_catalog(DEFAULT_CATALOG_PATH) if entry.mbid and not mbid.match(entry.mbid)] == []
+
+
+def test_pre_resolved_id_skips_request():
+    transport = FakeTransport()
+    ai = ArtistInfo(transport=transport, catalog=ArtistCatalog(ENTRIES))
+    assert ai.fetch_artist_id("Oasis") == ENTRIES[1].mbid
+    resolved, misses = ai.resolve_many(["Slowdive", "Oasis"])
+    assert resolved == {"Slowdive": ENTRIES[0].mbid, "Oasis": ENTRIES[1].mbid}
+    assert misses == []
+    assert transport.calls == []
+
+
+def test_choose_current_artist_uses_catalog():
+    ai = ArtistInfo(transport=FakeTransport(), catalog=ArtistCatalog(ENTRIES))
+    assert ai.choose_current_artist() in {"Slowdive", "Oasis", "Pulp"}
+
+
+def test_distractors_from_large_catalog():
+    catalog = ArtistCatalog.from_names([f"Artist {number}" for number in range(50000)])
+    ai = ArtistInfo(transport=FakeTransport(), catalog=catalog)
+    looked_up = []
+
+    async def fetch_works_async(artist_name):
+        looked_up.append(artist_name)
+        return [f"{artist_name} song"]
+
+    engine = DistractorEngine(ai, candidates=catalog, rng=random.Random(4))
+    engine._fetch_works_async = fetch_works_async
+    false_works = engine.select("Artist 0", k=2)
+    assert len(set(false_works)) == 2
+    assert len(looked_up) == 2 and "Artist 0" not in looked_up
+
+
+def test_iter_artists_by_tag():
+    pages = {
+        0: {"count": 3, "artists": [{"id": "1", "name": "Slowdive", "tags": [{"name": "rock", "count": 2}, {"name": "shoegaze", "count": 9}]},
+                                    {"id": "2", "name": "Ride", "tags": [{"name": "shoegaze", "count": 4}]}]},
+        2: {"count": 3, "artists": [{"id": "3", "name": "Lush"}]},
+    }
+    transport = FakeTransport(handler=lambda url: (200, pages[int(url.split("offset=")[1].split("&")[0])]))
+    ai = ArtistInfo(transport=transport, catalog=ArtistCatalog(ENTRIES))
+    artists = list(ai.iter_artists_by_tag("shoegaze", page_size=2))
+    assert [artist["name"] for artist in artists] == ["Slowdive", "Ride", "Lush"]
+    assert artists[0]["tags"] == ["shoegaze", "rock"]
+    assert artists[0]["votes"] == 9 and artists[2]["votes"] == 0
+    assert "tag%3A%22shoegaze%22" in transport.calls[0]
+
+
+def test_build_catalog_resolves_and_adds_tagged_artists(capsys):
+    class StubArtistInfo:
+        def resolve_many(self, names):
+            return {"Pulp": "pulp-id"}, []
+
+        def iter_artists_by_tag(self, tag):
+            yield {"id": "7a2a4e8c-0000-0000-0000-000000000002", "name": "Oasis", "tags": ["britpop"], "votes": 5}
+            yield {"id": "blur-id", "name": "Blur", "tags": ["britpop", "rock"], "votes": 7}
+            yield {"id": "suede-id", "name": "Suede", "tags": ["britpop"], "votes": 0}
+
+    entries = build_catalog(StubArtistInfo(), [CatalogEntry(entry.name, entry.mbid, entry.weight, entry.tags) for entry in ENTRIES],
+                            tag="britpop", limit=1)
+    by_name = {entry.name: entry for entry in entries}
+    assert by_name["Pulp"].mbid == "pulp-id"
+    assert by_name["Blur"] == CatalogEntry("Blur", "blur-id", 7, ["britpop", "rock"])
+    assert "Suede" not in by_name
+    assert len(entries) == 4
+
+
+def test_names_with_separators_are_written_safely(tmp_path):
+    path = str(tmp_path / "catalog.tsv")
+    write_catalog(path, [CatalogEntry("Tab\tBand", None, 1, ["a,b"])])
+    assert read_catalog(path) == [CatalogEntry("Tab Band", None, 1, ["a b"])]
+    assert os.path.exists(path) and not os.path.exists(f"{path}.tmp")
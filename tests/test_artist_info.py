@@ -6,11 +6,14 @@ Final Project -- test.test_artist_info
 This program contains pytest for models.artist_info.
 '''
 
+import random
 import pytest
 import requests
-from models.artist_info import ArtistInfo
+from models.artist_info import ArtistInfo, normalize_artist_name, build_artist_link
 from models.random_mode_artists import random_mode_artists
-from unittest.mock import patch
+from models.artist_cache import TwoTierCache, LRUCache, SQLiteCache
+from models.circuit_breaker import CircuitBreaker
+from unittest.mock import patch, MagicMock
 
 
 @pytest.fixture
@@ -29,7 +32,7 @@ def test_choose_current_artist(ai):
 
 def test_fetch_artist_id_success(ai):
     artist_name = "TestArtist"
-    with patch('models.artist_info.requests.get') as mock_get:
+    with patch.object(ai.session, 'get') as mock_get:
         # return a mock JSON response
         mock_get.return_value.json.return_value = {'artists': [{'id': '123'}]}
         artist_id = ai.fetch_artist_id(artist_name)
@@ -38,7 +41,7 @@ def test_fetch_artist_id_success(ai):
 
 def test_fetch_artist_id_empty_result(ai):
     artist_name = "NonExistentArtist"
-    with patch('models.artist_info.requests.get') as mock_get:
+    with patch.object(ai.session, 'get') as mock_get:
         mock_get.return_value.json.return_value = {'artists': []}
         artist_id = ai.fetch_artist_id(artist_name)
         assert artist_id is None
@@ -46,7 +49,7 @@ def test_fetch_artist_id_empty_result(ai):
 
 def test_fetch_artist_id_no_artists_key(ai):
     artist_name = "NonExistentArtist"
-    with patch('models.artist_info.requests.get') as mock_get:
+    with patch.object(ai.session, 'get') as mock_get:
         mock_get.return_value.json.return_value = {}
         artist_id = ai.fetch_artist_id(artist_name)
         assert artist_id is None
@@ -54,7 +57,7 @@ def test_fetch_artist_id_no_artists_key(ai):
 
 def test_fetch_artist_id_exception(ai):
     artist_name = "TestArtist"
-    with patch('models.artist_info.requests.get') as mock_get:
+    with patch.object(ai.session, 'get') as mock_get:
         # Configures the mock get method to raise a requests.exceptions.ConnectionError when it is called
         mock_get.side_effect = requests.exceptions.ConnectionError
         artist_id = ai.fetch_artist_id(artist_name)
@@ -63,7 +66,7 @@ def test_fetch_artist_id_exception(ai):
 
 def test_fetch_artist_works_success(ai):
     artist_id = '123'
-    with patch('models.artist_info.requests.get') as mock_get:
+    with patch.object(ai.session, 'get') as mock_get:
         mock_get.return_value.json.return_value = {'works': [{'title': 'Song 1'}, {'title': 'Song 2'}]}
         artist_works = ai.fetch_artist_works(artist_id)
         assert artist_works == ['Song 1', 'Song 2']
@@ -71,7 +74,7 @@ def test_fetch_artist_works_success(ai):
 
 def test_fetch_artist_works_empty_result(ai):
     artist_id = '123'
-    with patch('models.artist_info.requests.get') as mock_get:
+    with patch.object(ai.session, 'get') as mock_get:
         mock_get.return_value.json.return_value = {'works': []}
         artist_works = ai.fetch_artist_works(artist_id)
         assert artist_works == []
@@ -79,7 +82,7 @@ def test_fetch_artist_works_empty_result(ai):
 
 def test_fetch_artist_works_no_works_key(ai):
     artist_id = '123'
-    with patch('models.artist_info.requests.get') as mock_get:
+    with patch.object(ai.session, 'get') as mock_get:
         mock_get.return_value.json.return_value = {}
         artist_works = ai.fetch_artist_works(artist_id)
         assert artist_works is None
@@ -87,7 +90,7 @@ def test_fetch_artist_works_no_works_key(ai):
 
 def test_fetch_artist_works_exception(ai):
     artist_id = '123'
-    with patch('models.artist_info.requests.get') as mock_get:
+    with patch.object(ai.session, 'get') as mock_get:
         mock_get.side_effect = requests.exceptions.ConnectionError
         artist_works = ai.fetch_artist_works(artist_id)
         assert artist_works is None
@@ -131,3 +134,200 @@ def test_eq_method_different_instance_type(ai):
 def test_str_method(ai):
     str_representation = str(ai)
     assert str_representation == "ArtistInfo(base_url=https://beta.musicbrainz.org/ws/2/)"
+
+
+def test_artist_info_uses_shared_session():
+    assert ArtistInfo().session is ArtistInfo().session
+
+
+def test_artist_info_injected_session():
+    session = MagicMock()
+    session.get.return_value.json.return_value = {'artists': [{'id': '123'}]}
+    ai = ArtistInfo(session=session, timeout=(1, 2))
+    assert ai.fetch_artist_id("TestArtist") == "123"
+    assert session.get.call_args.kwargs['timeout'] == (1, 2)
+
+
+def test_fetch_artist_works_timeout(ai):
+    with patch.object(ai.session, 'get') as mock_get:
+        mock_get.side_effect = requests.exceptions.ReadTimeout
+        assert ai.fetch_artist_works('123') is None
+
+
+def test_fetch_artist_id_uses_cache():
+    ai = ArtistInfo(cache=TwoTierCache())
+    with patch.object(ai.session, 'get') as mock_get:
+        mock_get.return_value.json.return_value = {'artists': [{'id': '123'}]}
+        assert ai.fetch_artist_id("TestArtist") == "123"
+        assert ai.fetch_artist_id("TestArtist") == "123"
+        assert mock_get.call_count == 1
+
+
+def test_fetch_artist_works_uses_cache():
+    ai = ArtistInfo(cache=TwoTierCache())
+    with patch.object(ai.session, 'get') as mock_get:
+        mock_get.return_value.json.return_value = {'works': [{'title': 'Song 1'}]}
+        assert ai.fetch_artist_works('123') == ['Song 1']
+        assert ai.fetch_artist_works('123') == ['Song 1']
+        assert mock_get.call_count == 1
+
+
+def test_fetch_artist_id_failure_not_cached():
+    ai = ArtistInfo(cache=TwoTierCache())
+    with patch.object(ai.session, 'get') as mock_get:
+        mock_get.side_effect = requests.exceptions.ConnectionError
+        assert ai.fetch_artist_id("TestArtist") is None
+        assert ai.fetch_artist_id("TestArtist") is None
+        assert mock_get.call_count == 2
+
+
+def test_fetch_artist_id_through_scheduler():
+    scheduler = MagicMock()
+    scheduler.get.return_value.json.return_value = {'artists': [{'id': '123'}]}
+    ai = ArtistInfo(scheduler=scheduler)
+    assert ai.fetch_artist_id("TestArtist") == "123"
+    scheduler.get.assert_called_once()
+
+
+def test_fetch_artist_id_stale_fallback():
+    ai = ArtistInfo(cache=TwoTierCache(LRUCache(), SQLiteCache(":memory:")))
+    ai.cache.disk.set("artist_id:TestArtist", "123", ttl=-1)
+    with patch.object(ai.session, 'get') as mock_get:
+        mock_get.side_effect = requests.exceptions.ConnectionError
+        assert ai.fetch_artist_id("TestArtist") == "123"
+
+
+def test_open_circuit_skips_network():
+    breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=60)
+    ai = ArtistInfo(circuit_breaker=breaker)
+    with patch.object(ai.session, 'get') as mock_get:
+        mock_get.side_effect = requests.exceptions.Timeout
+        assert ai.fetch_artist_id("TestArtist") is None
+        assert ai.fetch_artist_works("123") is None
+        assert mock_get.call_count == 1
+
+
+def make_works_page(titles, work_count):
+    return {'work-count': work_count, 'works': [{'title': title} for title in titles]}
+
+
+def test_iter_artist_works_pages_lazily(ai):
+    pages = [make_works_page(['Song 1', 'Song 2'], 3), make_works_page(['Song 3'], 3)]
+    with patch.object(ai.session, 'get') as mock_get:
+        mock_get.return_value.json.side_effect = pages
+        works = ai.iter_artist_works('123', page_size=2)
+        assert next(works) == 'Song 1'
+        assert mock_get.call_count == 1
+        assert list(works) == ['Song 2', 'Song 3']
+        assert mock_get.call_count == 2
+        assert 'offset=2' in mock_get.call_args.args[0]
+
+
+def test_iter_artist_works_page_budget(ai):
+    with patch.object(ai.session, 'get') as mock_get:
+        mock_get.return_value.json.return_value = make_works_page(['Song 1', 'Song 2'], 1000)
+        assert len(list(ai.iter_artist_works('123', page_size=2, max_pages=3))) == 6
+        assert mock_get.call_count == 3
+
+
+def test_iter_artist_works_stops_on_error(ai):
+    with patch.object(ai.session, 'get') as mock_get:
+        mock_get.side_effect = requests.exceptions.ConnectionError
+        assert list(ai.iter_artist_works('123')) == []
+
+
+def test_sample_artist_works(ai):
+    titles = [f'Song {i}' for i in range(250)]
+    pages = [make_works_page(titles[i:i + 100], 250) for i in range(0, 250, 100)]
+    with patch.object(ai.session, 'get') as mock_get:
+        mock_get.return_value.json.side_effect = pages
+        sample = ai.sample_artist_works('123', k=5, rng=random.Random(1))
+        assert len(sample) == 5
+        assert len(set(sample)) == 5
+        assert set(sample) <= set(titles)
+        assert mock_get.call_count == 3
+
+
+def test_sample_artist_works_small_catalog(ai):
+    with patch.object(ai.session, 'get') as mock_get:
+        mock_get.return_value.json.return_value = make_works_page(['Song 1', 'Song 2'], 2)
+        assert sorted(ai.sample_artist_works('123', k=5)) == ['Song 1', 'Song 2']
+
+
+def test_resolve_many_single_request(ai):
+    data = {'artists': [
+        {'id': '1', 'name': 'Radiohead', 'sort-name': 'Radiohead'},
+        {'id': '2', 'name': 'The Beatles', 'sort-name': 'Beatles, The'},
+        {'id': '3', 'name': 'Björk', 'sort-name': 'Björk'},
+    ]}
+    with patch.object(ai.session, 'get') as mock_get:
+        mock_get.return_value.json.return_value = data
+        resolved, misses = ai.resolve_many(['Radiohead', 'the beatles', 'Bjork', 'Nobody'])
+        assert resolved == {'Radiohead': '1', 'the beatles': '2', 'Bjork': '3'}
+        assert misses == ['Nobody']
+        assert mock_get.call_count == 1
+        assert 'OR' in mock_get.call_args.args[0]
+
+
+def test_resolve_many_prefers_exact_match(ai):
+    data = {'artists': [
+        {'id': '1', 'name': 'Oasis!', 'sort-name': 'Oasis!'},
+        {'id': '2', 'name': 'Oasis', 'sort-name': 'Oasis'},
+    ]}
+    with patch.object(ai.session, 'get') as mock_get:
+        mock_get.return_value.json.return_value = data
+        assert ai.resolve_many(['Oasis'])[0] == {'Oasis': '2'}
+
+
+def test_resolve_many_uses_cache():
+    ai = ArtistInfo(cache=TwoTierCache())
+    ai.cache.set('artist_id:Pulp', '9')
+    with patch.object(ai.session, 'get') as mock_get:
+        mock_get.return_value.json.return_value = {'artists': [{'id': '1', 'name': 'Oasis'}]}
+        assert ai.resolve_many(['Pulp', 'Oasis']) == ({'Pulp': '9', 'Oasis': '1'}, [])
+        assert 'Pulp' not in mock_get.call_args.args[0]
+        assert ai.cache.get('artist_id:Oasis') == (True, '1')
+
+
+def test_resolve_many_connection_error(ai):
+    with patch.object(ai.session, 'get') as mock_get:
+        mock_get.side_effect = requests.exceptions.ConnectionError
+        assert ai.resolve_many(['Oasis', 'Oasis']) == ({}, ['Oasis'])
+
+
+def test_normalize_artist_name():
+    assert normalize_artist_name("The Beatles") == normalize_artist_name("beatles")
+    assert normalize_artist_name("Björk") == "bjork"
+
+
+def test_fetch_artist_details(ai):
+    data = {
+        'id': '123', 'name': 'Radiohead', 'type': 'Group', 'country': 'GB', 'disambiguation': '',
+        'life-span': {'begin': '1991', 'end': None},
+        'genres': [{'name': 'alternative rock'}],
+        'tags': [{'name': 'rock', 'count': 1}, {'name': 'british', 'count': 5}],
+        'works': [{'title': 'Creep'}],
+        'relations': [{'type': 'main performer', 'event': {'name': 'Glastonbury 1997', 'life-span': {'begin': '1997-06-27'}}},
+                      {'type': 'member of band', 'artist': {'name': 'Thom Yorke'}}],
+    }
+    with patch.object(ai.session, 'get') as mock_get:
+        mock_get.return_value.json.return_value = data
+        details = ai.fetch_artist_details('123')
+        assert mock_get.call_count == 1
+        assert 'inc=' in mock_get.call_args.args[0]
+    assert details['name'] == 'Radiohead'
+    assert details['genres'] == ['alternative rock']
+    assert details['tags'] == ['british', 'rock']
+    assert details['works'] == ['Creep']
+    assert details['events'] == [{'name': 'Glastonbury 1997', 'date': '1997-06-27', 'role': 'main performer'}]
+
+
+def test_fetch_artist_details_not_found(ai):
+    with patch.object(ai.session, 'get') as mock_get:
+        mock_get.return_value.json.return_value = {'error': 'Not Found'}
+        assert ai.fetch_artist_details('123') is None
+
+
+def test_build_artist_link():
+    assert build_artist_link('123', 'events') == "https://beta.musicbrainz.org/artist/123/events"
+    assert build_artist_link('123', 'unknown') is None
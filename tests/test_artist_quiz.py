@@ -6,11 +6,14 @@ Final Project -- test.test_artist_quiz
 This program contains pytest for models.artist_quiz.
 '''
 
+import asyncio
+import time
 from unittest.mock import patch
 import pytest
 from models.random_mode_artists import random_mode_artists
 from models.artist_info import ArtistInfo
-from models.artist_quiz import ArtistQuiz
+from models.artist_quiz import ArtistQuiz, QuizGenerationError, QuizTimeoutError
+from models.distractor_engine import DistractorError
 
 
 @pytest.fixture
@@ -18,6 +21,11 @@ def aq():
     return ArtistQuiz()
 
 
+def works_of(self, artist_id):
+    # Every artist has its own works, as the quiz needs three different options
+    return [f'{artist_id} Song 1', f'{artist_id} Song 2']
+
+
 def test_artist_quiz_init(aq):
     assert aq.base_url == 'https://beta.musicbrainz.org/ws/2/'
 
@@ -44,22 +52,22 @@ def test_generate_false_answers_remove_artist(aq):
 
 def test_generate_question_random_mode(aq):
     with patch.object(ArtistInfo, 'choose_current_artist', return_value='TestArtist'), \
-            patch.object(ArtistInfo, 'fetch_artist_id', return_value='123'), \
-            patch.object(ArtistInfo, 'fetch_artist_works', return_value=['Song 1', 'Song 2']):
+            patch.object(ArtistInfo, 'fetch_artist_id', lambda self, name: name), \
+            patch.object(ArtistInfo, 'fetch_artist_works', works_of):
         question = aq.generate_question_random_mode()
         current_artist, options, correct_work = question
         assert current_artist == 'TestArtist'
-        assert len(options) == 3
+        assert len(set(options)) == 3
         assert correct_work in options
 
 
 def test_generate_question_personal_mode(aq):
     current_artist = "TestArtist"
-    with patch.object(ArtistInfo, 'fetch_artist_id', return_value='123'), \
-            patch.object(ArtistInfo, 'fetch_artist_works', return_value=['Song 1', 'Song 2']):
+    with patch.object(ArtistInfo, 'fetch_artist_id', lambda self, name: name), \
+            patch.object(ArtistInfo, 'fetch_artist_works', works_of):
         question = aq.generate_question_personal_mode(current_artist)
         options, correct_work = question
-        assert len(options) == 3
+        assert len(set(options)) == 3
         assert correct_work in options
 
 
@@ -74,3 +82,89 @@ def test_eq_method_different_instance_type(aq):
 def test_str_method(aq):
     str_representation = str(aq)
     assert str_representation.startswith("ArtistQuiz(base_url=")
+
+
+def test_artist_quiz_injected_artist_info():
+    artist_info = ArtistInfo()
+    aq = ArtistQuiz(artist_info=artist_info)
+    assert aq.artist_info is artist_info
+
+
+def test_generate_question_random_mode_async(aq):
+    with patch.object(ArtistInfo, 'choose_current_artist', return_value='TestArtist'), \
+            patch.object(ArtistInfo, 'fetch_artist_id', lambda self, name: name), \
+            patch.object(ArtistInfo, 'fetch_artist_works', works_of):
+        current_artist, options, correct_work = asyncio.run(aq.generate_question_random_mode_async())
+        assert current_artist == 'TestArtist'
+        assert len(set(options)) == 3
+        assert correct_work in options
+
+
+def test_generate_quiz_random_mode_runs_concurrently(aq):
+    def slow_fetch_artist_id(self, artist_name):
+        time.sleep(0.1)
+        return artist_name
+
+    with patch.object(ArtistInfo, 'fetch_artist_id', slow_fetch_artist_id), \
+            patch.object(ArtistInfo, 'fetch_artist_works', works_of):
+        start = time.perf_counter()
+        quiz = aq.generate_quiz_random_mode(3)
+        elapsed = time.perf_counter() - start
+        assert len(quiz) == 3
+        # 9 sequential id lookups would take 0.9 s
+        assert elapsed < 0.6
+
+
+def test_generate_question_personal_mode_with_prefetched_works(aq):
+    with patch.object(ArtistInfo, 'fetch_artist_id', return_value='123') as mock_fetch_artist_id, \
+            patch.object(ArtistInfo, 'fetch_artist_works', return_value=['Song 1', 'Song 2']):
+        options, correct_work = aq.generate_question_personal_mode("TestArtist", ['Prefetched'])
+        assert correct_work == 'Prefetched'
+        assert len(options) == 3
+        # Only the two false artists are looked up
+        assert mock_fetch_artist_id.call_count == 2
+
+
+def test_generate_question_refuses_repeated_options(aq):
+    # Both false artists only have the correct work, or titles the other false artist already gave
+    for works in (['Yesterday'], ['Karma Police', 'Yesterday']):
+        with patch.object(ArtistInfo, 'fetch_artist_id', lambda self, name: name), \
+                patch.object(ArtistInfo, 'fetch_artist_works', return_value=works):
+            with pytest.raises(DistractorError):
+                aq.generate_question_personal_mode("Radiohead", ['Yesterday'])
+
+
+def test_generate_question_random_mode_gives_up(aq):
+    async def select_candidates_async(current_artist, k=2, rng=None):
+        return [['False 1'], ['False 2']]
+
+    with patch.object(ArtistInfo, 'fetch_artist_id', return_value=None), \
+            patch.object(aq.distractor_engine, 'select_candidates_async', side_effect=select_candidates_async):
+        with pytest.raises(QuizGenerationError):
+            aq.generate_question_random_mode()
+
+
+def test_generate_question_timeout(aq):
+    def slow_fetch(self, artist_name):
+        time.sleep(0.5)
+        return '123'
+
+    with patch.object(ArtistInfo, 'fetch_artist_id', slow_fetch):
+        start = time.monotonic()
+        with pytest.raises(QuizTimeoutError):
+            aq.generate_question_personal_mode("TestArtist", timeout=0.1)
+        assert time.monotonic() - start < 0.5
+
+
+def test_generate_question_random_mode_keeps_distractors_between_tries(aq):
+    async def select_candidates_async(current_artist, k=2, rng=None):
+        return [['False 1'], ['False 2']]
+
+    with patch.object(ArtistInfo, 'choose_current_artist', side_effect=['Missing', 'Found']), \
+            patch.object(ArtistInfo, 'fetch_artist_id', side_effect=lambda artist_name: None if artist_name == 'Missing' else '123'), \
+            patch.object(ArtistInfo, 'fetch_artist_works', return_value=['Song 1']), \
+            patch.object(aq.distractor_engine, 'select_candidates_async', side_effect=select_candidates_async) as mock_select:
+        current_artist, options, correct_work = aq.generate_question_random_mode()
+        assert current_artist == 'Found'
+        assert sorted(options) == ['False 1', 'False 2', 'Song 1']
+        assert mock_select.call_count == 1
@@ -0,0 +1,88 @@
+'''
+Yue Yu
+CS 5001, Fall 2023
+Final Project -- test.test_asset_cache
+
+This program contains pytest for models.asset_cache.
+'''
+
+import hashlib
+import json
+import os
+import threading
+from unittest.mock import MagicMock
+import pytest
+import requests
+from models.asset_cache import AssetCache, AssetStore
+
+URL = "https://lottie.host/test/animation.json"
+ANIMATION = {"v": "5.7.4", "layers": []}
+
+
+def make_session(content=json.dumps(ANIMATION).encode("utf-8")):
+    session = MagicMock()
+    session.get.return_value.content = content
+    return session
+
+
+@pytest.fixture
+def asset_cache(tmp_path):
+    return AssetCache(directory=str(tmp_path / "cache"), session=make_session())
+
+
+def test_store_is_content_addressed(tmp_path):
+    store = AssetStore(str(tmp_path))
+    content = json.dumps(ANIMATION).encode("utf-8")
+    digest = store.write(URL, content)
+    assert digest == hashlib.sha256(content).hexdigest()
+    assert os.path.exists(tmp_path / f"{digest}.json")
+    assert AssetStore(str(tmp_path)).read(URL) == ANIMATION
+
+
+def test_store_rejects_corrupt_file(tmp_path):
+    store = AssetStore(str(tmp_path))
+    digest = store.write(URL, json.dumps(ANIMATION).encode("utf-8"))
+    (tmp_path / f"{digest}.json").write_text('{"tampered": true}')
+    assert store.read(URL) is None
+
+
+def test_get_never_downloads(asset_cache):
+    assert asset_cache.get(URL) is None
+    asset_cache.session.get.assert_not_called()
+
+
+def test_load_downloads_once(asset_cache):
+    assert asset_cache.load(URL).result(timeout=5) == ANIMATION
+    assert asset_cache.get(URL) == ANIMATION
+    assert asset_cache.load(URL).result(timeout=5) == ANIMATION
+    assert asset_cache.session.get.call_count == 1
+
+
+def test_disk_cache_survives_restart(asset_cache, tmp_path):
+    asset_cache.fetch(URL)
+    restarted = AssetCache(directory=str(tmp_path / "cache"), session=make_session())
+    assert restarted.get(URL) == ANIMATION
+    restarted.session.get.assert_not_called()
+
+
+def test_concurrent_loads_share_one_download(asset_cache):
+    release = threading.Event()
+    content = json.dumps(ANIMATION).encode("utf-8")
+
+    def slow_get(url, timeout):
+        release.wait(5)
+        return MagicMock(content=content)
+
+    asset_cache.session.get.side_effect = slow_get
+    futures = [asset_cache.load(URL) for _ in range(5)]
+    release.set()
+    assert all(future.result(timeout=5) == ANIMATION for future in futures)
+    assert asset_cache.session.get.call_count == 1
+
+
+def test_failed_download_is_not_retried_immediately(asset_cache):
+    asset_cache.session.get.side_effect = requests.exceptions.ConnectionError
+    assert asset_cache.load(URL).result(timeout=5) is None
+    assert asset_cache.load(URL).result(timeout=5) is None
+    assert asset_cache.session.get.call_count == 1
+    assert asset_cache.stats()["failures"] == 1
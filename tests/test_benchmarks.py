@@ -0,0 +1,117 @@
+'''
+Yue Yu
+CS 5001, Fall 2023
+Final Project -- test.test_benchmarks
+
+This program contains pytest for benchmarks.fake_musicbrainz, benchmarks.quiz_benchmark, benchmarks.import_benchmark
+and benchmarks.results_benchmark.
+'''
+
+import pytest
+from models.artist_info import ArtistInfo
+from models.http_session import create_session
+from benchmarks.fake_musicbrainz import FakeMusicBrainz, fake_artist_id
+from benchmarks.quiz_benchmark import percentile, summarize, compare_results, run_benchmarks
+from benchmarks.import_benchmark import parse_importtime, measure_import, MARKER
+from benchmarks.results_benchmark import fill_results, measure_reads
+from models.metrics import MetricsRegistry
+from models.results_store import ResultsStore
+
+
+@pytest.fixture
+def fake_server():
+    with FakeMusicBrainz(artists=["Radiohead", "Guns N' Roses", "Oasis"], works_per_artist=150) as server:
+        yield server
+
+
+@pytest.fixture
+def fake_artist_info(fake_server):
+    session = create_session()
+    session.trust_env = False
+    return ArtistInfo(base_url=fake_server.base_url, session=session)
+
+
+def test_percentile():
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 95) == 95
+    assert percentile(values, 99) == 99
+    assert percentile([3.0], 99) == 3.0
+    assert percentile([], 50) is None
+
+
+def test_summarize():
+    summary = summarize([0.1, 0.2, 0.3], errors=1, http_calls=8, http_bytes=400, iterations=4)
+    assert summary["p50_ms"] == 200.0
+    assert summary["errors"] == 1
+    assert summary["http_calls_per_op"] == 2.0
+    assert summary["bytes_per_op"] == 100.0
+
+
+def test_fake_server_serves_artist_info(fake_server, fake_artist_info):
+    assert fake_artist_info.fetch_artist_id("Radiohead") == fake_artist_id("Radiohead")
+    assert fake_artist_info.fetch_artist_id("Unknown Artist") is None
+    works = fake_artist_info.fetch_artist_works(fake_artist_id("Oasis"))
+    assert len(works) == 100
+    assert len(list(fake_artist_info.iter_artist_works(fake_artist_id("Oasis")))) == 150
+    assert fake_server.stats()["requests"] == 5
+
+
+def test_fake_server_batch_search(fake_artist_info):
+    resolved, misses = fake_artist_info.resolve_many(["Radiohead", "Guns N' Roses", "Unknown Artist"])
+    assert resolved == {"Radiohead": fake_artist_id("Radiohead"), "Guns N' Roses": fake_artist_id("Guns N' Roses")}
+    assert misses == ["Unknown Artist"]
+
+
+def test_fake_server_error_rate():
+    with FakeMusicBrainz(artists=["Oasis"], error_rate=1.0) as server:
+        session = create_session()
+        session.trust_env = False
+        artist_info = ArtistInfo(base_url=server.base_url, session=session)
+        assert artist_info.fetch_artist_id("Oasis") is None
+        assert server.stats()["errors"] == 1
+
+
+def test_compare_results_flags_regressions():
+    baseline = {"results": {"quiz": {"p50_ms": 100.0, "p95_ms": 200.0, "http_calls_per_op": 6.0}}}
+    current = {"results": {"quiz": {"p50_ms": 105.0, "p95_ms": 300.0, "http_calls_per_op": 6.0}}}
+    rows, regressions = compare_results(current, baseline, max_regression=0.2)
+    assert len(rows) == 3
+    assert [(row[0], row[1]) for row in regressions] == [("quiz", "p95_ms")]
+
+
+def test_run_benchmarks_smoke():
+    results = run_benchmarks(iterations=2, warmup=0, latency=0, jitter=0)
+    assert set(results["results"]) == {"generate_question_random_mode", "generate_question_personal_mode", "generate_quiz_random_mode"}
+    quiz = results["results"]["generate_quiz_random_mode"]
+    assert quiz["errors"] == 0
+    assert quiz["http_calls_per_op"] > 0
+    assert quiz["p50_ms"] <= quiz["p99_ms"]
+
+
+def test_parse_importtime_reads_after_marker():
+    stderr = "\n".join([
+        "import time: self [us] | cumulative | imported package",
+        "import time:       100 |        100 | streamlit",
+        MARKER,
+        "import time: self [us] | cumulative | imported package",
+        "import time:       250 |        250 |   models.metrics",
+        "import time:        40 |        290 | helpers",
+    ])
+    assert parse_importtime(stderr) == {"models.metrics": (250, 250), "helpers": (40, 290)}
+
+
+def test_helpers_import_is_lazy():
+    summary = measure_import("helpers", repeats=1)
+    assert summary["lazy_modules_imported"] == []
+    assert summary["imported_modules"] > 0
+    assert summary["slowest_modules"][0]["module"] == "helpers"
+
+
+def test_results_reads_stay_fast(tmp_path):
+    results_store = ResultsStore(str(tmp_path / "results.sqlite3"), batch_size=5000, metrics=MetricsRegistry())
+    assert fill_results(results_store, rows=20000, players=2000) > 0
+    reads = measure_reads(results_store, players=2000, iterations=100)
+    results_store.close()
+    assert reads["leaderboard"]["p99_ms"] < 10
+    assert reads["history"]["p99_ms"] < 10
@@ -0,0 +1,72 @@
+'''
+Yue Yu
+CS 5001, Fall 2023
+Final Project -- test.test_bulk_quiz
+
+This program contains pytest for models.bulk_quiz.
+'''
+
+import io
+import json
+import random
+import pytest
+from models.bulk_quiz import generate_quizzes, offline_artist_quiz, quiz_seed
+from models.question_bank import QuestionBank, write_question_bank
+
+
+@pytest.fixture
+def bank_path(tmp_path):
+    path = str(tmp_path / "question_bank.bin")
+    snapshot = [(f"Artist {number}", f"00000000-0000-0000-0000-{number:012d}", [f"Song {number}-{work}" for work in range(number % 4 * 5)])
+                for number in range(12)]
+    write_question_bank(path, snapshot)
+    return path
+
+
+def run(bank_path, tmp_path, **kwargs):
+    output = io.StringIO()
+    summary = generate_quizzes(output, bank_path=bank_path, catalog_path=str(tmp_path / "missing.tsv"), **kwargs)
+    return [json.loads(line) for line in output.getvalue().splitlines()], summary
+
+
+def test_quiz_seed_is_stable():
+    assert quiz_seed(42, 7) == quiz_seed(42, 7)
+    assert len({quiz_seed(42, index) for index in range(1000)}) == 1000
+    assert quiz_seed(42, 7) != quiz_seed(43, 7)
+
+
+def test_offline_quiz_sends_no_requests(bank_path, tmp_path):
+    artist_quiz = offline_artist_quiz(QuestionBank(bank_path), str(tmp_path / "missing.tsv"))
+    # Artists without works are left out of the catalog
+    assert len(artist_quiz.artist_info.catalog) == 9
+    questions = artist_quiz.generate_quiz_random_mode(3, rng=random.Random(1))
+    assert len(questions) == 3
+    assert artist_quiz.artist_info.transport.calls == []
+
+
+def test_generate_quizzes(bank_path, tmp_path):
+    quizzes, summary = run(bank_path, tmp_path, count=25, seed=3, workers=1, chunk_size=10)
+    assert [quiz["index"] for quiz in quizzes] == list(range(25))
+    for quiz in quizzes:
+        assert quiz["seed"] == quiz_seed(3, quiz["index"])
+        assert len(quiz["questions"]) == 3
+        for question in quiz["questions"]:
+            assert question["correct_answer"] in question["options"]
+            assert question["correct_answer"].startswith(f"Song {question['artist'].split()[1]}-")
+    assert summary["quizzes"] == 25 and summary["errors"] == 0
+    assert sum(summary["answer_positions"].values()) == pytest.approx(1)
+
+
+def test_same_seed_same_quizzes(bank_path, tmp_path):
+    first, _ = run(bank_path, tmp_path, count=10, seed=5, workers=1)
+    second, _ = run(bank_path, tmp_path, count=10, seed=5, workers=1, chunk_size=3)
+    other, _ = run(bank_path, tmp_path, count=10, seed=6, workers=1)
+    assert first == second
+    assert first != other
+
+
+def test_process_pool_matches_single_process(bank_path, tmp_path):
+    single, _ = run(bank_path, tmp_path, count=12, seed=9, workers=1)
+    pooled, summary = run(bank_path, tmp_path, count=12, seed=9, workers=2, chunk_size=4)
+    assert pooled == single
+    assert summary["workers"] == 2
@@ -0,0 +1,98 @@
+'''
+Yue Yu
+CS 5001, Fall 2023
+Final Project -- test.test_circuit_breaker
+
+This program contains pytest for models.circuit_breaker.
+'''
+
+import time
+from unittest.mock import MagicMock
+import pytest
+import requests
+from models.circuit_breaker import CircuitBreaker, CircuitOpenError, CLOSED, OPEN, HALF_OPEN
+
+
+def failing_call():
+    raise requests.exceptions.ConnectionError
+
+
+def test_opens_after_threshold():
+    breaker = CircuitBreaker(failure_threshold=2, recovery_timeout=60)
+    for _ in range(2):
+        with pytest.raises(requests.exceptions.ConnectionError):
+            breaker.call(failing_call)
+    assert breaker.state == OPEN
+    func = MagicMock()
+    with pytest.raises(CircuitOpenError):
+        breaker.call(func)
+    func.assert_not_called()
+    assert breaker.retry_after() > 0
+    assert breaker.stats()["rejected"] == 1
+
+
+def test_success_resets_failures():
+    breaker = CircuitBreaker(failure_threshold=2)
+    with pytest.raises(requests.exceptions.ConnectionError):
+        breaker.call(failing_call)
+    breaker.call(lambda: MagicMock(status_code=200))
+    with pytest.raises(requests.exceptions.ConnectionError):
+        breaker.call(failing_call)
+    assert breaker.state == CLOSED
+
+
+def test_server_errors_count_as_failures():
+    breaker = CircuitBreaker(failure_threshold=1)
+    response = breaker.call(lambda: MagicMock(status_code=503))
+    assert response.status_code == 503
+    assert breaker.state == OPEN
+
+
+def test_half_open_trial():
+    breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=0.05)
+    with pytest.raises(requests.exceptions.ConnectionError):
+        breaker.call(failing_call)
+    time.sleep(0.06)
+    assert breaker.state == HALF_OPEN
+    breaker.call(lambda: MagicMock(status_code=200))
+    assert breaker.state == CLOSED
+
+
+def test_half_open_failure_reopens():
+    breaker = CircuitBreaker(failure_threshold=3, recovery_timeout=0.05)
+    for _ in range(3):
+        with pytest.raises(requests.exceptions.ConnectionError):
+            breaker.call(failing_call)
+    time.sleep(0.06)
+    with pytest.raises(requests.exceptions.ConnectionError):
+        breaker.call(failing_call)
+    assert breaker.state == OPEN
+    assert breaker.stats()["times_opened"] == 2
+
+
+def test_other_errors_do_not_count():
+    breaker = CircuitBreaker(failure_threshold=1)
+
+    def bad_json():
+        raise ValueError("not JSON")
+
+    with pytest.raises(ValueError):
+        breaker.call(bad_json)
+    assert breaker.state == CLOSED
+    assert breaker.stats()["consecutive_failures"] == 0
+
+
+def test_half_open_trial_with_other_error_allows_next_trial():
+    breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=0.05)
+    with pytest.raises(requests.exceptions.ConnectionError):
+        breaker.call(failing_call)
+    time.sleep(0.06)
+
+    def http_error():
+        raise requests.exceptions.HTTPError("404")
+
+    with pytest.raises(requests.exceptions.HTTPError):
+        breaker.call(http_error)
+    assert breaker.state == HALF_OPEN
+    breaker.call(lambda: MagicMock(status_code=200))
+    assert breaker.state == CLOSED
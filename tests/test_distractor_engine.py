@@ -0,0 +1,88 @@
+'''
+Yue Yu
+CS 5001, Fall 2023
+Final Project -- test.test_distractor_engine
+
+This program contains pytest for models.distractor_engine.
+'''
+
+import time
+from unittest.mock import MagicMock
+import pytest
+from models.distractor_engine import DistractorEngine, DistractorError
+
+CANDIDATES = ["A", "B", "C", "D", "E"]
+
+
+def make_artist_info(works_by_artist):
+    artist_info = MagicMock()
+
+    async def fetch_artist_id_async(artist_name):
+        return artist_name
+
+    async def fetch_artist_works_async(artist_id):
+        return works_by_artist.get(artist_id)
+
+    artist_info.fetch_artist_id_async.side_effect = fetch_artist_id_async
+    artist_info.fetch_artist_works_async.side_effect = fetch_artist_works_async
+    return artist_info
+
+
+def test_select_returns_distinct_works():
+    artist_info = make_artist_info({artist: [f"{artist} song"] for artist in CANDIDATES})
+    engine = DistractorEngine(artist_info, candidates=CANDIDATES)
+    false_works = engine.select("A", k=2)
+    assert len(false_works) == 2
+    assert len(set(false_works)) == 2
+    assert "A song" not in false_works
+
+
+def test_select_keeps_partial_results():
+    artist_info = make_artist_info({"B": ["B song"], "C": [], "D": [], "E": ["E song"]})
+    engine = DistractorEngine(artist_info, candidates=CANDIDATES)
+    assert sorted(engine.select("A", k=2)) == ["B song", "E song"]
+    # Each candidate is looked up at most once
+    assert artist_info.fetch_artist_works_async.call_count <= 4
+
+
+def test_select_remembers_artists_without_works():
+    artist_info = make_artist_info({"B": ["B song"], "C": ["C song"], "D": [], "E": []})
+    engine = DistractorEngine(artist_info, candidates=CANDIDATES, max_attempts=10)
+    engine.select("A", k=2)
+    engine.mark_no_works("E")
+    assert engine.has_no_works("E")
+    artist_info.fetch_artist_works_async.reset_mock()
+    engine.select("A", k=2)
+    looked_up = {call.args[0] for call in artist_info.fetch_artist_works_async.call_args_list}
+    assert "E" not in looked_up
+
+
+def test_select_attempt_budget():
+    artist_info = make_artist_info({})
+    engine = DistractorEngine(artist_info, candidates=CANDIDATES, max_attempts=3)
+    with pytest.raises(DistractorError):
+        engine.select("A", k=2)
+    assert artist_info.fetch_artist_id_async.call_count == 3
+
+
+def test_select_time_budget():
+    artist_info = make_artist_info({})
+
+    async def slow_fetch_artist_id_async(artist_name):
+        import asyncio
+        await asyncio.sleep(1)
+        return artist_name
+
+    artist_info.fetch_artist_id_async.side_effect = slow_fetch_artist_id_async
+    engine = DistractorEngine(artist_info, candidates=CANDIDATES, time_budget=0.1)
+    start = time.perf_counter()
+    with pytest.raises(DistractorError):
+        engine.select("A", k=2)
+    assert time.perf_counter() - start < 0.5
+
+
+def test_select_not_enough_candidates():
+    artist_info = make_artist_info({"B": ["B song"]})
+    engine = DistractorEngine(artist_info, candidates=["A", "B"])
+    with pytest.raises(DistractorError):
+        engine.select("A", k=2)
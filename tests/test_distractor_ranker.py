@@ -0,0 +1,77 @@
+'''
+Yue Yu
+CS 5001, Fall 2023
+Final Project -- test.test_distractor_ranker
+
+This program contains pytest for models.distractor_ranker.
+'''
+
+import random
+import time
+import pytest
+from models.distractor_ranker import DistractorRanker, normalize_titles
+
+
+@pytest.fixture
+def ranker():
+    return DistractorRanker()
+
+
+def test_normalize_titles():
+    titles = ["Wonderwall (Live)", "Café del Mar - 2009 Remaster", "  Don't Look Back in Anger [Demo] ", "", "Tab\x1fSeparated"]
+    assert normalize_titles(titles) == [" wonderwall ", " cafe del mar ", " don t look back in anger ", "  ", " tab separated "]
+
+
+def test_versions_score_as_duplicates(ranker):
+    scores = ranker.similarities("Wonderwall", ["Wonderwall (live)", "Wonderwall - Remastered", "Wonderful Life", "Hey Jude", ""])
+    assert scores[0] == pytest.approx(1) and scores[1] == pytest.approx(1)
+    assert 0 < scores[2] < ranker.near_duplicate
+    assert scores[3] == 0 and scores[4] == 0
+
+
+def test_pick_drops_near_duplicates(ranker):
+    picks = ranker.pick("Wonderwall", [["Wonderwall (Live)", "Wonderwall [Demo]", "Wonderful Life"], ["Wonderwall - Remastered", "Hey Jude"]])
+    assert picks == ["Wonderful Life", "Hey Jude"]
+
+
+def test_pick_prefers_the_band(ranker):
+    rng = random.Random(0)
+    group = ["Wander", "Wonderful Life", "Hey Jude", "Let It Be"]
+    picks = {ranker.pick("Wonderwall", [group], rng)[0] for _ in range(50)}
+    assert picks == {"Wander", "Wonderful Life"}
+
+
+def test_pick_keeps_options_apart(ranker):
+    picks = ranker.pick("Hey Jude", [["Champagne Supernova"], ["Champagne Supernova (Live)", "Live Forever"]])
+    assert picks == ["Champagne Supernova", "Live Forever"]
+
+
+def test_pick_excludes_titles(ranker):
+    assert ranker.pick("Song 1", [["Song 2", "Other"]], exclude=["Song 2"]) == ["Other"]
+    # A group with only excluded titles or earlier picks gives no option
+    assert ranker.pick("Yesterday", [["Yesterday"], ["Help"]], exclude=["Yesterday"]) == ["Help"]
+    assert ranker.pick("Creep", [["Karma Police"], ["Karma Police", "Creep"]]) == ["Karma Police"]
+    assert ranker.pick("A", [[], ["B"]]) == ["B"]
+    assert ranker.pick("A", []) == []
+
+
+def test_dimensions_must_be_power_of_two():
+    with pytest.raises(ValueError):
+        DistractorRanker(dimensions=1000)
+
+
+def test_ranks_thousands_of_titles_quickly(ranker):
+    rng = random.Random(1)
+    words = ["love", "night", "blue", "song", "heart", "river", "dream", "fire", "light", "road"]
+    titles = [" ".join(rng.choice(words) for _ in range(rng.randint(1, 5))) for _ in range(5000)]
+    ranker.pick("Blue River", [titles[:2500], titles[2500:]], rng)
+    start = time.perf_counter()
+    picks = ranker.pick("Blue River", [titles[:2500], titles[2500:]], rng)
+    assert len(picks) == 2
+    assert time.perf_counter() - start < 0.1
+
+
+def test_titles_without_ngrams(ranker):
+    # "[untitled]" is a common MusicBrainz work title and normalizes to nothing
+    assert ranker.pick("[untitled]", [["(Intro)"], ["[Demo]"]]) == ["(Intro)", "[Demo]"]
+    assert list(ranker.similarities("[untitled]", ["(Intro)"])) == [0]
@@ -0,0 +1,26 @@
+'''
+Yue Yu
+CS 5001, Fall 2023
+Final Project -- test.test_http_session
+
+This program contains pytest for models.http_session.
+'''
+
+from models.http_session import create_session, get_shared_session, close_shared_session, USER_AGENT
+
+
+def test_create_session_pool_size():
+    session = create_session(pool_size=4)
+    adapter = session.get_adapter("https://beta.musicbrainz.org/ws/2/")
+    assert adapter._pool_maxsize == 4
+    assert session.headers["User-Agent"] == USER_AGENT
+
+
+def test_get_shared_session_is_reused():
+    assert get_shared_session() is get_shared_session()
+
+
+def test_close_shared_session_creates_new_one():
+    first = get_shared_session()
+    close_shared_session()
+    assert get_shared_session() is not first
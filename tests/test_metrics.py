@@ -0,0 +1,116 @@
+'''
+Yue Yu
+CS 5001, Fall 2023
+Final Project -- test.test_metrics
+
+This program contains pytest for models.metrics.
+'''
+
+import requests
+import pytest
+from unittest.mock import patch
+from models.metrics import (MetricsRegistry, Histogram, endpoint_of, format_labels, start_metrics_server,
+                            HTTP_REQUEST_DURATION, HTTP_RESPONSE_BYTES, QUIZ_STAGE_DURATION)
+from models.artist_info import ArtistInfo
+from models.artist_quiz import ArtistQuiz
+from models.transport import FakeTransport
+
+
+@pytest.fixture
+def metrics():
+    return MetricsRegistry()
+
+
+def test_histogram_buckets():
+    histogram = Histogram(buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value)
+    assert histogram.cumulative_counts() == [2, 3, 4]
+    assert histogram.count == 4
+    assert histogram.total == pytest.approx(3.65)
+
+
+def test_render_prometheus_text(metrics):
+    metrics.inc(HTTP_RESPONSE_BYTES, 120, endpoint="artist_search", status="200")
+    metrics.observe(HTTP_REQUEST_DURATION, 0.2, endpoint="artist_search", status="200")
+    text = metrics.render()
+    assert f"# TYPE {HTTP_REQUEST_DURATION} histogram" in text
+    assert f'{HTTP_REQUEST_DURATION}_bucket{{endpoint="artist_search",le="0.25",status="200"}} 1' in text
+    assert f'{HTTP_REQUEST_DURATION}_bucket{{endpoint="artist_search",le="0.1",status="200"}} 0' in text
+    assert f'{HTTP_REQUEST_DURATION}_count{{endpoint="artist_search",status="200"}} 1' in text
+    assert f'{HTTP_RESPONSE_BYTES}{{endpoint="artist_search",status="200"}} 120' in text
+
+
+def test_stats_gauges(metrics):
+    metrics.add_stats("cache", lambda: {"memory": {"hits": 3, "size": 1}, "disk": None})
+    metrics.add_stats("circuit_breaker", lambda: {"state": "open", "rejected": 2})
+    gauges = metrics.gauges()
+    assert ("musicmustard_cache_hits", {"group": "memory"}, 3) in gauges
+    assert ("musicmustard_circuit_breaker_state", {"value": "open"}, 1) in gauges
+    assert ("musicmustard_circuit_breaker_rejected", {}, 2) in gauges
+    assert 'musicmustard_cache_hits{group="memory"} 3' in metrics.render()
+
+
+def test_failing_stats_are_skipped(metrics):
+    metrics.add_stats("broken", lambda: 1 / 0)
+    assert metrics.gauges() == []
+
+
+def test_endpoint_of():
+    base = "https://beta.musicbrainz.org/ws/2/"
+    assert endpoint_of(f'{base}artist/?query=artist:"Oasis"&limit=1&fmt=json') == "artist_search"
+    assert endpoint_of(f"{base}artist/123?inc=works&fmt=json") == "artist_lookup"
+    assert endpoint_of(f"{base}work/?artist=123&limit=100&fmt=json") == "work_browse"
+
+
+def test_format_labels_escapes():
+    assert format_labels({"name": 'Guns "N" Roses'}) == '{name="Guns \\"N\\" Roses"}'
+
+
+def test_artist_info_records_calls(metrics):
+    transport = FakeTransport(handler=lambda url: (200, {"artists": [{"id": "123"}]}))
+    ai = ArtistInfo(transport=transport, metrics=metrics)
+    ai.fetch_artist_id("Oasis")
+    [summary] = metrics.summarize(HTTP_REQUEST_DURATION)
+    assert (summary["endpoint"], summary["status"], summary["count"]) == ("artist_search", "200", 1)
+    assert metrics.snapshot()["counters"][HTTP_RESPONSE_BYTES][(("endpoint", "artist_search"), ("status", "200"))] > 0
+
+
+def test_snapshot_is_a_copy(metrics):
+    metrics.inc("calls", endpoint="x")
+    metrics.observe("latency", 0.02, endpoint="x")
+    snapshot = metrics.snapshot()
+    metrics.inc("calls", endpoint="x")
+    metrics.observe("latency", 0.02, endpoint="x")
+    assert snapshot["counters"]["calls"][(("endpoint", "x"),)] == 1
+    assert snapshot["histograms"]["latency"][(("endpoint", "x"),)][3] == 1
+
+
+def test_artist_info_records_errors(metrics):
+    transport = FakeTransport(handler=lambda url: requests.exceptions.ConnectionError())
+    ArtistInfo(transport=transport, metrics=metrics).fetch_artist_id("Oasis")
+    assert metrics.summarize(HTTP_REQUEST_DURATION)[0]["status"] == "error"
+
+
+def test_artist_quiz_records_stages(metrics):
+    quiz = ArtistQuiz(metrics=metrics)
+    with patch.object(ArtistInfo, 'fetch_artist_id', lambda self, name: name), \
+            patch.object(ArtistInfo, 'fetch_artist_works', lambda self, artist_id: [f'{artist_id} Song 1', f'{artist_id} Song 2']):
+        quiz.generate_question_random_mode()
+    stages = {summary["stage"] for summary in metrics.summarize(QUIZ_STAGE_DURATION)}
+    assert {"question_random_mode", "id_resolution", "works_fetch", "distractor_selection", "distractor_ranking"} <= stages
+
+
+def test_metrics_server(metrics):
+    metrics.inc(HTTP_RESPONSE_BYTES, 5, endpoint="work_browse", status="200")
+    server = start_metrics_server(metrics, port=0)
+    try:
+        port = server.server_address[1]
+        session = requests.Session()
+        session.trust_env = False
+        response = session.get(f"http://127.0.0.1:{port}/metrics", timeout=5)
+        assert response.status_code == 200
+        assert HTTP_RESPONSE_BYTES in response.text
+    finally:
+        server.shutdown()
+        server.server_close()
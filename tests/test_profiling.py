@@ -0,0 +1,143 @@
+'''
+Yue Yu
+CS 5001, Fall 2023
+Final Project -- test.test_profiling
+
+This program contains pytest for models.profiling.
+'''
+
+import json
+import os
+import pstats
+import time
+import pytest
+from unittest.mock import patch
+from models.profiling import Profiler, profiled
+
+
+def busy(milliseconds: float):
+    end = time.perf_counter() + milliseconds / 1000
+    while time.perf_counter() < end:
+        pass
+
+
+def dumps_in(directory) -> list:
+    return sorted(os.listdir(directory))
+
+
+def test_disabled_profiler_writes_nothing(tmp_path):
+    profiler = Profiler(enabled=False, directory=str(tmp_path))
+    with profiler.profile("quiz_page"):
+        busy(1)
+    assert dumps_in(tmp_path) == []
+
+
+def test_profile_dumps_pstats(tmp_path):
+    profiler = Profiler(enabled=True, directory=str(tmp_path))
+    with profiler.profile("quiz_page"):
+        busy(5)
+
+    (name,) = dumps_in(tmp_path)
+    assert "quiz_page" in name and name.endswith(".prof")
+    stats = pstats.Stats(str(tmp_path / name))
+    assert any(function_name == "busy" for _, _, function_name in stats.stats)
+
+
+def test_profile_dumps_speedscope(tmp_path):
+    profiler = Profiler(enabled=True, directory=str(tmp_path), output_format="speedscope")
+
+    def render():
+        busy(5)
+
+    with profiler.profile("app"):
+        render()
+
+    (name,) = dumps_in(tmp_path)
+    assert name.endswith(".speedscope.json")
+    with open(tmp_path / name, encoding="utf-8") as profile_file:
+        document = json.load(profile_file)
+    frames = document["shared"]["frames"]
+    profile = document["profiles"][0]
+    assert profile["type"] == "sampled"
+    assert len(profile["samples"]) == len(profile["weights"])
+    assert all(0 <= index < len(frames) for sample in profile["samples"] for index in sample)
+    busy_index = next(index for index, frame in enumerate(frames) if frame["name"] == "busy")
+    # busy's own time sits under its caller
+    busy_sample = next(sample for sample in profile["samples"] if sample[-1] == busy_index)
+    assert frames[busy_sample[-2]]["name"] == "render"
+
+
+def test_only_slow_runs_are_dumped(tmp_path):
+    profiler = Profiler(enabled=True, directory=str(tmp_path), min_duration=0.05)
+    with profiler.profile("fast"):
+        pass
+    with profiler.profile("slow"):
+        time.sleep(0.06)
+
+    (name,) = dumps_in(tmp_path)
+    assert "slow" in name
+
+
+def test_retention_keeps_newest(tmp_path):
+    profiler = Profiler(enabled=True, directory=str(tmp_path), keep=2)
+    for number in range(4):
+        with profiler.profile(f"run{number}"):
+            pass
+        time.sleep(0.01)  # distinct modification times
+
+    names = dumps_in(tmp_path)
+    assert len(names) == 2
+    assert any("run3" in name for name in names)
+    assert not any("run0" in name for name in names)
+
+
+def test_nested_runs_are_part_of_outer_profile(tmp_path):
+    profiler = Profiler(enabled=True, directory=str(tmp_path))
+
+    @profiler.profiled("inner")
+    def inner():
+        busy(1)
+
+    with profiler.profile("outer"):
+        inner()
+
+    (name,) = dumps_in(tmp_path)
+    assert "outer" in name
+
+
+def test_profile_dumps_when_run_raises(tmp_path):
+    profiler = Profiler(enabled=True, directory=str(tmp_path))
+    with pytest.raises(ValueError):
+        with profiler.profile("failing"):
+            raise ValueError("boom")
+    assert len(dumps_in(tmp_path)) == 1
+
+
+def test_unsupported_format():
+    with pytest.raises(ValueError):
+        Profiler(output_format="callgrind")
+
+
+def test_from_env(tmp_path):
+    environment = {"MUSICMUSTARD_PROFILE": "1", "MUSICMUSTARD_PROFILE_DIR": str(tmp_path),
+                   "MUSICMUSTARD_PROFILE_FORMAT": "speedscope", "MUSICMUSTARD_PROFILE_KEEP": "7",
+                   "MUSICMUSTARD_PROFILE_MIN_MS": "250"}
+    with patch.dict(os.environ, environment):
+        profiler = Profiler.from_env()
+    assert profiler.enabled
+    assert profiler.directory == str(tmp_path)
+    assert profiler.output_format == "speedscope"
+    assert profiler.keep == 7
+    assert profiler.min_duration == pytest.approx(0.25)
+
+
+def test_shared_decorator_uses_shared_profiler(tmp_path):
+    profiler = Profiler(enabled=True, directory=str(tmp_path))
+
+    @profiled("generate")
+    def generate():
+        return 42
+
+    with patch("models.profiling.get_shared_profiler", return_value=profiler):
+        assert generate() == 42
+    assert len(dumps_in(tmp_path)) == 1
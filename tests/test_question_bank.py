@@ -0,0 +1,111 @@
+'''
+Yue Yu
+CS 5001, Fall 2023
+Final Project -- test.test_question_bank
+
+This program contains pytest for models.question_bank.
+'''
+
+import random
+from unittest.mock import MagicMock
+import pytest
+from models.question_bank import QuestionBank, write_question_bank, load_question_bank, build_question_bank
+from models.quiz_builder import QuizBuilder
+
+SNAPSHOT = [
+    ("Oasis", "39ab1aed-75e0-4140-bd47-540276886b60", ["Wonderwall", "Live Forever"]),
+    ("Pulp", "b3ae82c2-e60b-4551-a76d-6620f1b456aa", ["Common People"]),
+    ("Björk", "87c5dedd-371d-4a53-9f7f-80522fb7f3cb", ["Jóga", "Hyperballad", "Army of Me"]),
+    ("Nobody", None, []),
+]
+
+
+@pytest.fixture
+def bank_path(tmp_path):
+    path = str(tmp_path / "bank.bin")
+    write_question_bank(path, SNAPSHOT)
+    return path
+
+
+@pytest.fixture
+def bank(bank_path):
+    bank = QuestionBank(bank_path, rng=random.Random(0))
+    yield bank
+    bank.close()
+
+
+def test_bank_roundtrip(bank):
+    assert bank.artist_count == 4
+    assert bank.work_count == 6
+    assert bank.artist_name(2) == "Björk"
+    assert bank.artist_id(0) == "39ab1aed-75e0-4140-bd47-540276886b60"
+    assert bank.artist_id(3) is None
+    assert bank.artist_works(2) == ["Jóga", "Hyperballad", "Army of Me"]
+    assert bank.artist_works(3) == []
+
+
+def test_bank_snapshot_version_is_stable(tmp_path, bank):
+    assert write_question_bank(str(tmp_path / "other.bin"), SNAPSHOT) == bank.snapshot_version
+
+
+def test_generate_question_random_mode(bank):
+    current_artist, options, correct_work = bank.generate_question_random_mode()
+    assert current_artist in ("Oasis", "Pulp", "Björk")
+    assert len(options) == 3
+    assert correct_work in options
+
+
+def test_generate_question_needs_three_artists(tmp_path):
+    path = str(tmp_path / "small.bin")
+    write_question_bank(path, SNAPSHOT[:2])
+    with pytest.raises(ValueError):
+        QuestionBank(path).generate_question_random_mode()
+
+
+def test_generate_question_skips_shared_titles(tmp_path):
+    path = str(tmp_path / "shared.bin")
+    write_question_bank(path, [("Nirvana", None, ["Smells Like Teen Spirit", "Heart-Shaped Box"]),
+                               ("Tori Amos", None, ["Smells Like Teen Spirit", "Cornflake Girl"]),
+                               ("Patti Smith", None, ["Smells Like Teen Spirit", "Because the Night"]),
+                               ("Paul Anka", None, ["Smells Like Teen Spirit"])])
+    bank = QuestionBank(path)
+    works = {bank.artist_name(i): set(bank.artist_works(i)) for i in range(bank.artist_count)}
+    for seed in range(50):
+        current_artist, options, correct_work = bank.generate_question_random_mode(random.Random(seed))
+        assert len(set(options)) == 3
+        assert correct_work in options
+        assert not (set(options) - {correct_work}) & works[current_artist]
+    bank.close()
+
+
+def test_generate_question_refuses_only_shared_titles(tmp_path):
+    path = str(tmp_path / "shared.bin")
+    write_question_bank(path, [(name, None, ["Yesterday"]) for name in ("The Beatles", "Ray Charles", "Marianne Faithfull")])
+    with pytest.raises(ValueError):
+        QuestionBank(path).generate_question_random_mode()
+
+
+def test_load_question_bank_missing_file(tmp_path):
+    assert load_question_bank(str(tmp_path / "missing.bin")) is None
+
+
+def test_load_question_bank_wrong_format(tmp_path):
+    path = tmp_path / "garbage.bin"
+    path.write_bytes(b"not a question bank at all")
+    assert load_question_bank(str(path)) is None
+
+
+def test_build_question_bank(tmp_path):
+    artist_info = MagicMock()
+    artist_info.resolve_many.return_value = ({"A": "1", "B": "2", "C": "3"}, [])
+    artist_info.iter_artist_works.side_effect = lambda artist_id: iter(["Song 1", "Song 2"])
+    path = str(tmp_path / "bank.bin")
+    build_question_bank(artist_info, artists=["A", "B", "C"], output=path)
+    assert QuestionBank(path).artist_works(1) == ["Song 1", "Song 2"]
+
+
+def test_quiz_builder_uses_bank(bank):
+    builder = QuizBuilder(question_bank=bank)
+    results = builder.build_random_mode(3)
+    builder.shutdown()
+    assert all(result.ok for result in results)
@@ -0,0 +1,114 @@
+'''
+Yue Yu
+CS 5001, Fall 2023
+Final Project -- test.test_question_pool
+
+This program contains pytest for models.question_pool.
+'''
+
+import time
+from unittest.mock import MagicMock
+import pytest
+from models.question_pool import QuestionPool
+from models.quiz_builder import QuizBuilder
+
+QUESTION = ['TestArtist', ['A', 'B', 'C'], 'A']
+
+
+@pytest.fixture
+def artist_quiz():
+    artist_quiz = MagicMock()
+    artist_quiz.generate_question_random_mode.return_value = QUESTION
+    return artist_quiz
+
+
+def wait_until_ready(pool, ready, timeout=2):
+    deadline = time.monotonic() + timeout
+    while pool.stats()["ready"] < ready and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_pool_fills_to_depth(artist_quiz):
+    pool = QuestionPool(artist_quiz, depth=4, refill_workers=2)
+    pool.start()
+    wait_until_ready(pool, 4)
+    assert pool.stats()["ready"] == 4
+    pool.stop()
+
+
+def test_take_from_warm_pool(artist_quiz):
+    pool = QuestionPool(artist_quiz, depth=3, refill_workers=1)
+    pool.start()
+    wait_until_ready(pool, 3)
+    assert pool.take(3) == [QUESTION] * 3
+    assert pool.stats()["starved"] == 0
+    assert pool.stats()["served"] == 3
+    pool.stop()
+
+
+def test_take_refills_in_background(artist_quiz):
+    pool = QuestionPool(artist_quiz, depth=3, refill_workers=1)
+    pool.start()
+    wait_until_ready(pool, 3)
+    pool.take(3)
+    wait_until_ready(pool, 3)
+    assert pool.stats()["ready"] == 3
+    pool.stop()
+
+
+def test_take_from_cold_pool_counts_starvation(artist_quiz):
+    pool = QuestionPool(artist_quiz, depth=3, refill_workers=1)
+    assert pool.take(2) == [QUESTION] * 2
+    assert pool.stats()["starved"] == 1
+
+
+def test_producer_errors_are_counted(artist_quiz):
+    artist_quiz.generate_question_random_mode.side_effect = RuntimeError
+    pool = QuestionPool(artist_quiz, depth=3, refill_workers=1)
+    pool.start()
+    time.sleep(0.05)
+    assert pool.stats()["errors"] >= 1
+    pool.stop()
+
+
+def test_quiz_builder_uses_pool(artist_quiz):
+    pool = QuestionPool(artist_quiz, depth=3, refill_workers=1)
+    builder = QuizBuilder(artist_quiz=artist_quiz, question_pool=pool)
+    results = builder.build_random_mode(3)
+    builder.shutdown()
+    assert [result.question["artist"] for result in results] == ['TestArtist'] * 3
+
+
+def test_take_ready_never_generates(artist_quiz):
+    pool = QuestionPool(artist_quiz, depth=3, refill_workers=1)
+    assert pool.take_ready(3) == []
+    artist_quiz.generate_question_random_mode.assert_not_called()
+    assert pool.stats()["starved"] == 1
+
+
+def test_quiz_builder_builds_pool_shortfall_in_parallel(artist_quiz):
+    def slow_question(timeout=None, rng=None):
+        time.sleep(0.2)
+        return QUESTION
+
+    artist_quiz.generate_question_random_mode.side_effect = slow_question
+    pool = QuestionPool(artist_quiz, depth=3, refill_workers=1)
+    pool._queue.put((7, ['PooledArtist', ['A', 'B', 'C'], 'A']))
+    builder = QuizBuilder(artist_quiz=artist_quiz, question_pool=pool, max_workers=4, question_timeout=1)
+    start = time.perf_counter()
+    results = builder.build_random_mode(3)
+    elapsed = time.perf_counter() - start
+    builder.shutdown()
+    assert [result.index for result in results] == [0, 1, 2]
+    assert [result.question["artist"] for result in results] == ['PooledArtist', 'TestArtist', 'TestArtist']
+    assert results[0].seed == 7 and all(result.seed is not None for result in results)
+    assert elapsed < 0.35
+
+
+def test_quiz_builder_pool_shortfall_has_deadline(artist_quiz):
+    artist_quiz.generate_question_random_mode.side_effect = lambda timeout=None, rng=None: time.sleep(0.5) or QUESTION
+    pool = QuestionPool(artist_quiz, depth=3, refill_workers=1)
+    builder = QuizBuilder(artist_quiz=artist_quiz, question_pool=pool, question_timeout=0.1)
+    results = builder.build_random_mode(2)
+    builder.shutdown()
+    assert all(isinstance(result.error, TimeoutError) for result in results)
@@ -0,0 +1,177 @@
+'''
+Yue Yu
+CS 5001, Fall 2023
+Final Project -- test.test_quiz_builder
+
+This program contains pytest for models.quiz_builder.
+'''
+
+import time
+from unittest.mock import patch
+import pytest
+from models.artist_info import ArtistInfo
+from models.artist_quiz import ArtistQuiz, QuizGenerationError, QuizTimeoutError
+from models.distractor_engine import DistractorEngine
+from models.question_bank import QuestionBank, write_question_bank
+from models.quiz_builder import QuizBuilder, ArtistNotFoundError
+from models.quiz_token import QuizToken, QuizTokenError
+
+SECRET = b"test secret"
+
+
+@pytest.fixture
+def qb():
+    builder = QuizBuilder(max_workers=4, question_timeout=1)
+    yield builder
+    builder.shutdown()
+
+
+def test_build_preserves_order(qb):
+    def make_factory(i):
+        def factory():
+            time.sleep(0.05 * (3 - i))
+            return {"artist": str(i), "options": [], "correct_answer": None}
+        return factory
+
+    results = qb.build([make_factory(i) for i in range(3)])
+    assert [result.question["artist"] for result in results] == ["0", "1", "2"]
+    assert all(result.ok for result in results)
+
+
+def test_build_runs_in_parallel(qb):
+    start = time.perf_counter()
+    qb.build([lambda: time.sleep(0.2) or {}] * 3)
+    assert time.perf_counter() - start < 0.5
+
+
+def test_build_reports_failures(qb):
+    def broken():
+        raise ValueError("no works")
+
+    results = qb.build([lambda: {"artist": "A"}, broken])
+    assert results[0].ok
+    assert not results[1].ok
+    assert isinstance(results[1].error, ValueError)
+
+
+def test_build_deadline():
+    qb = QuizBuilder(max_workers=2, question_timeout=0.1)
+    results = qb.build([lambda: time.sleep(0.5)])
+    qb.shutdown()
+    assert isinstance(results[0].error, TimeoutError)
+
+
+def test_build_random_mode(qb):
+    with patch.object(ArtistQuiz, 'generate_question_random_mode', return_value=['TestArtist', ['A', 'B', 'C'], 'A']):
+        results = qb.build_random_mode(3)
+        assert len(results) == 3
+        assert results[0].question == {"artist": "TestArtist", "options": ['A', 'B', 'C'], "correct_answer": 'A'}
+
+
+def test_build_personal_mode(qb):
+    with patch.object(ArtistInfo, 'resolve_many', return_value=({"Oasis": "1", "Pulp": "2"}, [])), \
+            patch.object(ArtistInfo, 'fetch_artist_works', return_value=['Song 1']), \
+            patch.object(ArtistQuiz, 'generate_question_personal_mode', return_value=[['A', 'B', 'C'], 'A']):
+        results = qb.build_personal_mode(["Oasis", "Pulp"])
+        assert [result.question["artist"] for result in results] == ["Oasis", "Pulp"]
+
+
+def test_build_personal_mode_fetches_each_artist_once(qb):
+    with patch.object(ArtistInfo, 'resolve_many', return_value=({"Oasis": "1"}, [])) as mock_resolve, \
+            patch.object(ArtistInfo, 'fetch_artist_works', return_value=['Song 1']) as mock_works, \
+            patch.object(ArtistInfo, 'fetch_artist_id') as mock_id, \
+            patch.object(DistractorEngine, 'select_candidates_async', return_value=[['Song 2'], ['Song 3']]):
+        results = qb.build_personal_mode(["Oasis", "Oasis", "Oasis"])
+        assert all(result.ok for result in results)
+        assert all(result.question["correct_answer"] == 'Song 1' for result in results)
+        mock_resolve.assert_called_once_with(["Oasis"])
+        mock_works.assert_called_once_with("1")
+        mock_id.assert_not_called()
+
+
+def test_build_personal_mode_unknown_artist(qb):
+    with patch.object(ArtistInfo, 'resolve_many', return_value=({"Oasis": "1"}, ["Nobody"])), \
+            patch.object(ArtistInfo, 'fetch_artist_works', return_value=['Song 1']), \
+            patch.object(ArtistQuiz, 'generate_question_personal_mode', return_value=[['A', 'B', 'C'], 'A']):
+        results = qb.build_personal_mode(["Oasis", "Nobody"])
+        assert results[0].ok
+        assert isinstance(results[1].error, ArtistNotFoundError)
+
+
+def test_build_personal_mode_outage_is_not_an_unknown_artist(qb):
+    def slow_works(self, artist_id):
+        if artist_id == "2":
+            time.sleep(1.5)
+        return None
+
+    with patch.object(ArtistInfo, 'resolve_many', return_value=({"Oasis": "1", "Blur": "2"}, [])), \
+            patch.object(ArtistInfo, 'fetch_artist_works', slow_works):
+        results = qb.build_personal_mode(["Oasis", "Blur"])
+    # Works that failed to arrive, or did not arrive in time, are not a sign of a wrong name
+    assert isinstance(results[0].error, QuizGenerationError)
+    assert isinstance(results[1].error, QuizTimeoutError)
+    assert not any(isinstance(result.error, ArtistNotFoundError) for result in results)
+
+
+@pytest.fixture
+def question_bank(tmp_path):
+    path = str(tmp_path / "question_bank.bin")
+    write_question_bank(path, [(f"Artist {number}", None, [f"Song {number}-{work}" for work in range(6)]) for number in range(8)])
+    bank = QuestionBank(path)
+    yield bank
+    bank.close()
+
+
+def test_quiz_token_rebuilds_bank_quiz(question_bank):
+    qb = QuizBuilder(question_bank=question_bank, question_timeout=1, secret=SECRET)
+    results = qb.build_random_mode(3)
+    token = qb.quiz_token(results)
+    assert token is not None and len(token) < 40
+    assert qb.load_quiz(token) == [result.question for result in results]
+
+    # A builder without the quiz in its cache rebuilds it from the seeds in the token
+    other = QuizBuilder(question_bank=question_bank, question_timeout=1, secret=SECRET)
+    assert other.load_quiz(token) == [result.question for result in results]
+    qb.shutdown()
+    other.shutdown()
+
+
+def test_quiz_token_rebuilds_live_quiz(qb):
+    def generate(timeout=None, rng=None):
+        artist = f"Artist {rng.randrange(100)}"
+        options = rng.sample(["A", "B", "C"], 3)
+        return [artist, options, options[0]]
+
+    with patch.object(ArtistQuiz, 'generate_question_random_mode', side_effect=generate):
+        results = qb.build_random_mode(3)
+        token = qb.quiz_token(results)
+        other = QuizBuilder(artist_quiz=qb.artist_quiz, question_timeout=1, secret=qb._secret)
+        assert other.load_quiz(token) == [result.question for result in results]
+        other.shutdown()
+
+
+def test_load_quiz_rejects_bad_tokens(question_bank):
+    qb = QuizBuilder(question_bank=question_bank, question_timeout=1, secret=SECRET)
+    token = QuizToken.decode(qb.quiz_token(qb.build_random_mode(3)), SECRET)
+    with pytest.raises(QuizTokenError):
+        qb.load_quiz("not a token")
+    with pytest.raises(QuizTokenError):
+        qb.load_quiz(QuizToken(token.source, token.version + 1, token.seeds, token.checksum).encode(SECRET))
+    with pytest.raises(QuizTokenError):
+        qb.load_quiz(QuizToken(token.source, token.version, token.seeds, token.checksum ^ 1).encode(SECRET))
+    qb.shutdown()
+
+
+def test_no_token_for_failed_quiz(qb):
+    with patch.object(ArtistQuiz, 'generate_question_random_mode', side_effect=ValueError("no works")):
+        assert qb.quiz_token(qb.build_random_mode(3)) is None
+
+
+def test_load_quiz_refuses_unsigned_tokens_before_rebuilding(question_bank):
+    qb = QuizBuilder(question_bank=question_bank, question_timeout=1, secret=SECRET)
+    forged = QuizToken(b"b", question_bank.snapshot_version, [1, 2, 3], 0).encode(b"guessed secret")
+    with patch.object(QuizBuilder, 'build_random_mode') as mock_build:
+        with pytest.raises(QuizTokenError):
+            qb.load_quiz(forged)
+        mock_build.assert_not_called()
+    qb.shutdown()
@@ -0,0 +1,84 @@
+'''
+Yue Yu
+CS 5001, Fall 2023
+Final Project -- test.test_quiz_token
+
+This program contains pytest for models.quiz_token.
+'''
+
+import base64
+import os
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from models.quiz_token import QuizToken, QuizTokenError, SOURCE_BANK, SOURCE_CATALOG, encode_answers, grade_answers, load_secret, new_seed
+
+SECRET = b"test secret"
+
+QUESTIONS = [{"artist": "Oasis", "options": ["Wonderwall", "Creep", "Hey Jude"], "correct_answer": "Wonderwall"},
+             {"artist": "Radiohead", "options": ["Wonderwall", "Creep", "Hey Jude"], "correct_answer": "Creep"},
+             {"artist": "The Beatles", "options": ["Wonderwall", "Creep", "Hey Jude"], "correct_answer": "Hey Jude"}]
+
+
+def test_round_trip():
+    token = QuizToken.for_questions(SOURCE_CATALOG, 0xDEADBEEF, [new_seed() for _ in range(3)], QUESTIONS)
+    encoded = token.encode(SECRET)
+    assert len(encoded) == 38
+    assert encoded.replace("-", "").replace("_", "").isalnum()
+    assert QuizToken.decode(encoded, SECRET) == token
+
+
+def test_checksum_depends_on_answers():
+    changed = [dict(QUESTIONS[0], correct_answer="Creep")] + QUESTIONS[1:]
+    assert QuizToken.for_questions(SOURCE_BANK, 1, [1, 2, 3], QUESTIONS) != QuizToken.for_questions(SOURCE_BANK, 1, [1, 2, 3], changed)
+
+
+@pytest.mark.parametrize("encoded", ["", "not a token", "!!!!", QuizToken(SOURCE_BANK, 1, [1, 2], 0).encode(SECRET)[:-2], "eAEAAAAAAAA"])
+def test_decode_rejects_malformed_tokens(encoded):
+    with pytest.raises(QuizTokenError):
+        QuizToken.decode(encoded, SECRET)
+
+
+def test_decode_rejects_tokens_not_signed_with_the_secret():
+    token = QuizToken(SOURCE_BANK, 1, [1, 2, 3], 0)
+    with pytest.raises(QuizTokenError, match="not made here"):
+        QuizToken.decode(token.encode(b"other secret"), SECRET)
+    # Changing a seed without the secret keeps the token's length but breaks the signature
+    encoded = token.encode(SECRET)
+    packed = bytearray(base64.urlsafe_b64decode(encoded + "=" * (-len(encoded) % 4)))
+    packed[6] ^= 1
+    with pytest.raises(QuizTokenError, match="not made here"):
+        QuizToken.decode(base64.urlsafe_b64encode(bytes(packed)).decode().rstrip("="), SECRET)
+
+
+def test_load_secret(tmp_path, monkeypatch):
+    monkeypatch.delenv("MUSICMUSTARD_QUIZ_SECRET", raising=False)
+    path = str(tmp_path / "keys" / "quiz_token.key")
+    secret = load_secret(path)
+    assert len(secret) == 32 and load_secret(path) == secret
+    assert os.listdir(tmp_path / "keys") == ["quiz_token.key"]  # no temporary file is left behind
+    monkeypatch.setenv("MUSICMUSTARD_QUIZ_SECRET", "configured")
+    assert load_secret(path) == b"configured"
+
+
+def test_load_secret_refuses_short_key(tmp_path, monkeypatch):
+    monkeypatch.delenv("MUSICMUSTARD_QUIZ_SECRET", raising=False)
+    path = tmp_path / "quiz_token.key"
+    path.write_bytes(b"")
+    with pytest.raises(ValueError):
+        load_secret(str(path))
+
+
+def test_load_secret_is_shared_by_concurrent_callers(tmp_path, monkeypatch):
+    monkeypatch.delenv("MUSICMUSTARD_QUIZ_SECRET", raising=False)
+    path = str(tmp_path / "quiz_token.key")
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        secrets = set(executor.map(lambda _: load_secret(path), range(32)))
+    assert secrets == {load_secret(path)}
+
+
+def test_grade_answers():
+    encoded = encode_answers(QUESTIONS, ["Wonderwall", None, "Creep"])
+    assert encoded == "0-1"
+    assert grade_answers(QUESTIONS, encoded) == 1
+    assert grade_answers(QUESTIONS, "012") == 3
+    assert grade_answers(QUESTIONS, "9x") == 0
@@ -0,0 +1,119 @@
+'''
+Yue Yu
+CS 5001, Fall 2023
+Final Project -- test.test_request_scheduler
+
+This program contains pytest for models.request_scheduler.
+'''
+
+import threading
+import time
+from unittest.mock import MagicMock
+import pytest
+from models.request_scheduler import TokenBucket, RequestScheduler, SchedulerBusyError, parse_retry_after
+from models.circuit_breaker import CircuitBreaker, CLOSED
+
+
+def make_response(status_code=200, headers=None):
+    response = MagicMock()
+    response.status_code = status_code
+    response.headers = headers or {}
+    return response
+
+
+@pytest.fixture
+def session():
+    session = MagicMock()
+    session.get.return_value = make_response()
+    return session
+
+
+def test_token_bucket_burst_then_throttle():
+    bucket = TokenBucket(rate=20, capacity=2)
+    assert bucket.acquire() == 0
+    assert bucket.acquire() == 0
+    assert bucket.acquire() > 0
+
+
+def test_scheduler_rate_limits(session):
+    scheduler = RequestScheduler(session, rate=20, burst=1)
+    start = time.perf_counter()
+    for i in range(3):
+        scheduler.get(f"https://example.org/{i}")
+    assert time.perf_counter() - start >= 0.09
+    assert scheduler.stats()["requests"] == 3
+    assert scheduler.stats()["max_wait"] > 0
+
+
+def test_scheduler_coalesces_identical_requests(session):
+    def slow_get(url, timeout=None):
+        time.sleep(0.1)
+        return make_response()
+
+    session.get.side_effect = slow_get
+    scheduler = RequestScheduler(session, rate=100, burst=10)
+    threads = [threading.Thread(target=scheduler.get, args=("https://example.org/radiohead",)) for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert session.get.call_count == 1
+    assert scheduler.stats()["coalesced"] == 9
+
+
+def test_scheduler_coalesced_callers_see_errors(session):
+    session.get.side_effect = ConnectionError
+    scheduler = RequestScheduler(session, rate=100, burst=10)
+    with pytest.raises(ConnectionError):
+        scheduler.get("https://example.org/")
+    assert scheduler.stats()["in_flight"] == 0
+
+
+def test_scheduler_retries_503_with_retry_after(session):
+    session.get.side_effect = [make_response(503, {"Retry-After": "0"}), make_response(200)]
+    scheduler = RequestScheduler(session, rate=100, burst=10)
+    response = scheduler.get("https://example.org/")
+    assert response.status_code == 200
+    assert scheduler.stats()["retries"] == 1
+
+
+def test_scheduler_gives_up_after_max_retries(session):
+    session.get.return_value = make_response(503)
+    scheduler = RequestScheduler(session, rate=100, burst=10, max_retries=2, backoff_base=0.001)
+    assert scheduler.get("https://example.org/").status_code == 503
+    assert session.get.call_count == 3
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("5") == 5
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("garbage") is None
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0
+
+
+def test_token_bucket_max_wait():
+    bucket = TokenBucket(rate=1, capacity=1)
+    assert bucket.acquire(max_wait=0) == 0
+    assert bucket.acquire(max_wait=0.5) is None
+    # A refused caller does not take a token, so it does not push back the callers after it
+    assert 0 < bucket.acquire(max_wait=2) <= 1
+
+
+def test_scheduler_refuses_long_waits(session):
+    scheduler = RequestScheduler(session, rate=1, burst=1, max_wait=0.5)
+    scheduler.get("https://example.org/a")
+    start = time.perf_counter()
+    with pytest.raises(SchedulerBusyError):
+        scheduler.get("https://example.org/b")
+    assert time.perf_counter() - start < 0.1
+    assert scheduler.stats()["rejected"] == 1
+    assert session.get.call_count == 1
+
+
+def test_scheduler_busy_does_not_trip_the_breaker(session):
+    scheduler = RequestScheduler(session, rate=1, burst=1, max_wait=0)
+    breaker = CircuitBreaker(failure_threshold=1)
+    breaker.call(scheduler.get, "https://example.org/a")
+    with pytest.raises(SchedulerBusyError):
+        breaker.call(scheduler.get, "https://example.org/b")
+    assert breaker.state == CLOSED
@@ -0,0 +1,98 @@
+'''
+Yue Yu
+CS 5001, Fall 2023
+Final Project -- test.test_results_store
+
+This program contains pytest for models.results_store.
+'''
+
+import sqlite3
+import threading
+import pytest
+from models.metrics import MetricsRegistry
+from models.results_store import ResultsStore, normalize_player
+
+
+@pytest.fixture
+def results_store(tmp_path):
+    store = ResultsStore(str(tmp_path / "results.sqlite3"), batch_interval=0.01, metrics=MetricsRegistry())
+    yield store
+    store.close()
+
+
+def test_normalize_player():
+    assert normalize_player("  Ada   Lovelace ") == "Ada Lovelace"
+    assert len(normalize_player("x" * 100)) == 30
+    with pytest.raises(ValueError):
+        normalize_player("   ")
+
+
+def test_uses_wal(results_store):
+    conn = sqlite3.connect(results_store.path)
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    conn.close()
+
+
+def test_history_newest_first(results_store):
+    for score in (1, 3, 2):
+        assert results_store.record("Ada", score, 3)
+    results_store.record("Bob", 0, 3)
+    assert results_store.flush(timeout=5)
+    assert [result["score"] for result in results_store.history(" Ada ")] == [2, 3, 1]
+    assert len(results_store.history("Ada", limit=2)) == 2
+    assert results_store.history("Nobody") == [] and results_store.history("") == []
+
+
+def test_leaderboard(results_store):
+    results_store.record("Ada", 3, 3, quiz="q1")
+    results_store.record("Ada", 2, 3, quiz="q2")
+    results_store.record("Bob", 3, 3, quiz="q1")
+    results_store.record("Cat", 2, 3, quiz="q1")
+    results_store.record("Cat", 3, 3, quiz="q2")
+    results_store.flush(timeout=5)
+    leaders = results_store.leaderboard(limit=2)
+    # Ada and Cat both have 5 correct answers in 6 questions; Ada got there first
+    assert [leader["player"] for leader in leaders] == ["Ada", "Cat"]
+    assert leaders[0] == {"player": "Ada", "quizzes": 2, "correct": 5, "questions": 6, "best_score": 3}
+
+
+def test_same_quiz_saved_once(results_store):
+    for _ in range(3):
+        results_store.record("Ada", 3, 3, quiz="q1")
+    results_store.record("Ada", 1, 3)
+    results_store.record("Ada", 1, 3)
+    results_store.flush(timeout=5)
+    assert len(results_store.history("Ada")) == 3
+    assert results_store.leaderboard()[0]["correct"] == 5
+    stats = results_store.stats()
+    assert stats["written"] == 3 and stats["duplicates"] == 2
+
+
+def test_concurrent_records_are_batched(results_store):
+    def record_many(thread):
+        for index in range(200):
+            results_store.record(f"Player {thread}", index % 4, 3, quiz=f"q{index}")
+
+    threads = [threading.Thread(target=record_many, args=(thread,)) for thread in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    results_store.flush(timeout=10)
+    stats = results_store.stats()
+    assert stats["written"] == 1600 and stats["errors"] == 0
+    assert stats["batches"] < 1600
+    assert sum(leader["quizzes"] for leader in results_store.leaderboard(limit=8)) == 1600
+
+
+def test_close_writes_queued_results(tmp_path):
+    path = str(tmp_path / "results.sqlite3")
+    store = ResultsStore(path, batch_interval=10, metrics=MetricsRegistry())
+    store.record("Ada", 3, 3)
+    store.close()
+    with pytest.raises(RuntimeError):
+        store.record("Ada", 3, 3)
+
+    reopened = ResultsStore(path, metrics=MetricsRegistry())
+    assert reopened.history("Ada")[0]["score"] == 3
+    reopened.close()
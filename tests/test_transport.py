@@ -0,0 +1,109 @@
+'''
+Yue Yu
+CS 5001, Fall 2023
+Final Project -- test.test_transport
+
+This program contains pytest for models.transport.
+'''
+
+import gzip
+import os
+import time
+import pytest
+import requests
+from models.artist_info import ArtistInfo
+from models.request_scheduler import RequestScheduler
+from models.transport import FakeTransport, RecordingTransport, ReplayTransport, make_response, load_recording
+
+BASE_URL = 'https://beta.musicbrainz.org/ws/2/'
+ID_URL = f'{BASE_URL}artist/?query=artist:"Oasis"&limit=1&fmt=json'
+WORKS_URL = f'{BASE_URL}work/?artist=123&limit=100&fmt=json'
+
+
+@pytest.fixture
+def fake_transport():
+    transport = FakeTransport()
+    transport.add(ID_URL, {'artists': [{'id': '123'}]})
+    transport.add(WORKS_URL, {'works': [{'title': 'Wonderwall'}, {'title': 'Live Forever'}]})
+    return transport
+
+
+def test_make_response():
+    response = make_response('http://example.com', 503, b'{"error": "down"}')
+    assert response.status_code == 503
+    assert response.json() == {'error': 'down'}
+    with pytest.raises(requests.exceptions.HTTPError):
+        response.raise_for_status()
+
+
+def test_artist_info_uses_transport(fake_transport):
+    ai = ArtistInfo(transport=fake_transport)
+    assert ai.fetch_artist_id('Oasis') == '123'
+    assert ai.fetch_artist_works('123') == ['Wonderwall', 'Live Forever']
+    assert fake_transport.calls == [ID_URL, WORKS_URL]
+
+
+def test_fake_transport_errors():
+    transport = FakeTransport()
+    transport.add(ID_URL, requests.exceptions.Timeout())
+    ai = ArtistInfo(transport=transport)
+    assert ai.fetch_artist_id('Oasis') is None
+    assert ai.fetch_artist_id('Unknown') is None  # unregistered URLs are 404s
+
+
+def test_fake_transport_handler():
+    transport = FakeTransport(handler=lambda url: (200, {'artists': [{'id': 'from-handler'}]}))
+    assert ArtistInfo(transport=transport).fetch_artist_id('Anyone') == 'from-handler'
+
+
+def test_record_then_replay(fake_transport, tmp_path):
+    path = str(tmp_path / 'recording.json.gz')
+    recorder = ArtistInfo(transport=RecordingTransport(path, inner=fake_transport))
+    assert recorder.fetch_artist_works(recorder.fetch_artist_id('Oasis')) == ['Wonderwall', 'Live Forever']
+
+    with gzip.open(path, 'rt') as recording_file:
+        assert len(recording_file.read().splitlines()) == 3  # the header and one line per response
+    assert set(load_recording(path)) == {ID_URL, WORKS_URL}
+
+    replay = ReplayTransport(path)
+    ai = ArtistInfo(transport=replay)
+    for _ in range(2):
+        assert ai.fetch_artist_works(ai.fetch_artist_id('Oasis')) == ['Wonderwall', 'Live Forever']
+    assert ai.fetch_artist_id('Blur') is None
+    assert replay.misses == 1
+
+
+def test_recording_appends(fake_transport, tmp_path):
+    path = str(tmp_path / 'recording.json.gz')
+    RecordingTransport(path, inner=fake_transport).get(ID_URL)
+    before = (tmp_path / 'recording.json.gz').read_bytes()
+    RecordingTransport(path, inner=fake_transport).get(WORKS_URL)
+    assert (tmp_path / 'recording.json.gz').read_bytes().startswith(before)  # earlier responses are never rewritten
+    assert set(load_recording(path)) == {ID_URL, WORKS_URL}
+
+
+def test_recording_ignores_cut_short_response(fake_transport, tmp_path):
+    path = str(tmp_path / 'recording.json.gz')
+    recorder = RecordingTransport(path, inner=fake_transport)
+    recorder.get(ID_URL)
+    size = os.path.getsize(path)
+    recorder.get(WORKS_URL)
+    with open(path, 'r+b') as recording_file:
+        recording_file.truncate(size + 10)
+    assert set(load_recording(path)) == {ID_URL}
+
+
+def test_replay_latency(fake_transport, tmp_path):
+    path = str(tmp_path / 'recording.json.gz')
+    RecordingTransport(path, inner=fake_transport).get(ID_URL)
+    transport = ReplayTransport(path, latency=0.05)
+    start = time.perf_counter()
+    transport.get(ID_URL)
+    assert time.perf_counter() - start >= 0.05
+
+
+def test_scheduler_over_transport(fake_transport):
+    scheduler = RequestScheduler(session=fake_transport, rate=1000, burst=10)
+    ai = ArtistInfo(scheduler=scheduler)
+    assert ai.fetch_artist_id('Oasis') == '123'
+    assert fake_transport.calls == [ID_URL]